@@ -0,0 +1,127 @@
+"""
+Redis round-trips of auth flows: one call per token vs batched calls
+
+runs the Redis part of `logout`, `renew_tokens` and re-`login` (with an
+old refresh-token in cookies) `--iterations` times in two ways:
+_ "per-token" : `JWTHandler.get_token_payload` for each token and then
+                `TokenRevocation.put_in_blacklist` for each of them
+_ "batched"   : one `JWTHandler.get_tokens_payloads(..., revoke=True)`
+and reports Redis round-trips (commands/pipelines sent) and latency of
+each flow. keys written by the benchmark are deleted afterwards.
+
+usage (from project's root):
+    python -m benchmarks.auth_round_trips \
+        --redis-url redis://localhost:6379/15 --iterations 2000
+
+NOTE: `verified_token_cache` is disabled here (every token is checked in
+Redis), like the first use of each token on a worker
+"""
+
+import os
+import time
+import asyncio
+import argparse
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+parser.add_argument("--iterations", type=int, default=2000)
+args = parser.parse_args()
+
+# settings need these values; only Redis is used in this benchmark
+os.environ["REDIS_URL"] = args.redis_url
+for name in ("PG_SERVER", "PG_DB", "PG_USER", "PG_PASSWORD"):
+    os.environ.setdefault(name, "unused")
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+
+from redis.asyncio import Redis  # noqa: E402
+from redis.asyncio.connection import Connection  # noqa: E402
+
+from src.core.config import settings  # noqa: E402
+from src.auth import (  # noqa: E402
+    JWTHandler, TokenRevocation, verified_token_cache
+)
+
+
+class RoundTripCounter:
+    """ counts requests written to Redis connections (1 per round-trip) """
+
+    count = 0
+
+    @classmethod
+    def install(cls) -> None:
+        send_packed_command = Connection.send_packed_command
+
+        async def counted(self, *args, **kwargs):
+            cls.count += 1
+            return await send_packed_command(self, *args, **kwargs)
+
+        Connection.send_packed_command = counted
+
+
+async def per_token(
+    tokens: list[tuple[str, str]], redis: Redis
+) -> None:
+    payloads = [
+        await JWTHandler.get_token_payload(token, token_type, redis)
+        for token, token_type in tokens
+    ]
+    for payload in payloads:
+        await TokenRevocation.put_in_blacklist(payload, redis)
+
+
+async def batched(tokens: list[tuple[str, str]], redis: Redis) -> None:
+    await JWTHandler.get_tokens_payloads(tokens, redis, revoke=True)
+
+
+def flow_tokens(flow: str, user_id: int) -> list[tuple[str, str]]:
+    refresh = JWTHandler.generate_token(user_id, "refresh")
+    if flow == "logout":
+        return [(refresh, "refresh"),
+                (JWTHandler.generate_token(user_id, "access"), "access")]
+    return [(refresh, "refresh")]  # renew_tokens / login (old cookie)
+
+
+async def run(flow: str, mode: str, redis: Redis) -> None:
+    run_flow = per_token if mode == "per-token" else batched
+    tokens = [flow_tokens(flow, i) for i in range(args.iterations)]
+
+    RoundTripCounter.count = 0
+    started_at = time.perf_counter()
+    for flow_tokens_ in tokens:
+        await run_flow(flow_tokens_, redis)
+    elapsed = time.perf_counter() - started_at
+
+    print(
+        f"{flow:>7} | {mode:>9}: "
+        f"{RoundTripCounter.count / args.iterations:.1f} round-trips | "
+        f"{elapsed / args.iterations * 1000:.3f} ms/request"
+    )
+
+
+async def cleanup(redis: Redis) -> None:
+    for prefix in (TokenRevocation.KEY_PREFIX,
+                   TokenRevocation.BUCKET_KEY_PREFIX):
+        async for key in redis.scan_iter(match=f"{prefix}*", count=1000):
+            await redis.unlink(key)
+
+
+async def main() -> None:
+    settings.TOKEN_BLACKLIST_LOCAL_MIRROR = False
+    settings.TOKEN_GENERATION_CACHE_SECONDS = 0  # always asked from Redis
+    verified_token_cache.max_size = 0
+    RoundTripCounter.install()
+
+    redis = Redis.from_url(args.redis_url, decode_responses=True)
+    try:
+        await redis.ping()
+        for flow in ("logout", "renew", "login"):
+            for mode in ("per-token", "batched"):
+                await run(flow, mode, redis)
+    finally:
+        await cleanup(redis)
+        await redis.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
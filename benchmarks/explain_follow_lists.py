@@ -0,0 +1,160 @@
+"""
+EXPLAIN check of followers/followings pages (`FollowCrud._page_query`)
+
+seeds `--users` users and `--follows` follow-relations (one "celebrity"
+gets `--celebrity-followers` of them) in a scratch schema whose tables are
+copies of the real ones (`CREATE TABLE ... (LIKE public.<table> INCLUDING
+ALL)` -> same indexes as the migrated database), runs VACUUM ANALYZE, and
+then EXPLAINs first & deep (cursor) pages of both lists. it fails (exit
+code 1) unless 'follows' is read by an *Index Only Scan* of the keyset
+indexes, without any Sort node.
+
+usage (from project's root; the database must be migrated to head):
+    python -m benchmarks.explain_follow_lists --users 50000 --follows 500000
+
+NOTE: use a development/staging database (the scratch schema is dropped
+at the end)
+"""
+
+import sys
+import asyncio
+import argparse
+from datetime import datetime
+from typing import Any, Iterator
+
+import orjson
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.core.database import engine
+from src.crud.user import FollowCrud
+from src.models import follows
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--schema", default="explain_check")
+parser.add_argument("--users", type=int, default=50_000)
+parser.add_argument("--follows", type=int, default=500_000)
+parser.add_argument("--celebrity-followers", type=int, default=40_000)
+parser.add_argument("--page-size", type=int, default=20)
+args = parser.parse_args()
+
+CELEBRITY_ID = 1
+EXPECTED_INDEXES = {
+    "followers": "ix_follows_followed_follow_at",
+    "followings": "ix_follows_followed_by_follow_at",
+}
+
+
+async def seed(conn: AsyncConnection) -> None:
+    schema = args.schema
+    await conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+    await conn.exec_driver_sql(f"CREATE SCHEMA {schema}")
+    for table in ("users", "follows"):
+        # NOTE: no foreign-keys are copied by LIKE (not needed here)
+        await conn.exec_driver_sql(
+            f"CREATE TABLE {schema}.{table} "
+            f"(LIKE public.{table} INCLUDING ALL)"
+        )
+    await conn.exec_driver_sql(
+        f'INSERT INTO {schema}.users ("ID", username, password, email) '
+        f"SELECT g, 'user_' || g, '-', 'user_' || g || '@example.com' "
+        f"FROM generate_series(1, {args.users}) AS g"
+    )
+    # celebrity's followers + random relations (newest rows are random)
+    await conn.exec_driver_sql(
+        f"INSERT INTO {schema}.follows (followed_by, followed, follow_at) "
+        f"SELECT g + 1, {CELEBRITY_ID}, "
+        f"now() - (random() * interval '365 days') "
+        f"FROM generate_series(1, {args.celebrity_followers}) AS g"
+    )
+    await conn.exec_driver_sql(
+        f"INSERT INTO {schema}.follows (followed_by, followed, follow_at) "
+        f"SELECT 1 + (random() * ({args.users} - 1))::bigint, "
+        f"1 + (random() * ({args.users} - 1))::bigint, "
+        f"now() - (random() * interval '365 days') "
+        f"FROM generate_series(1, {args.follows}) "
+        f"ON CONFLICT DO NOTHING"
+    )
+    # visibility-map must be set for index-only scans
+    for table in ("users", "follows"):
+        await conn.exec_driver_sql(f"VACUUM ANALYZE {schema}.{table}")
+
+
+async def explain(conn: AsyncConnection, query: Any) -> dict:
+    compiled = query.compile(dialect=conn.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    result = await conn.exec_driver_sql(
+        f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {compiled}", params
+    )
+    plan = result.scalar()
+    return (orjson.loads(plan) if isinstance(plan, str) else plan)[0]
+
+
+def walk(node: dict) -> Iterator[dict]:
+    yield node
+    for child in node.get("Plans", []):
+        yield from walk(child)
+
+
+def check(kind: str, label: str, plan: dict) -> bool:
+    nodes = list(walk(plan["Plan"]))
+    follows_nodes = [n for n in nodes if n.get("Relation Name") == "follows"]
+    sorts = [n for n in nodes if "Sort" in n["Node Type"]]
+    ok = (
+        bool(follows_nodes) and not sorts
+        and all(
+            n["Node Type"] == "Index Only Scan"
+            and n.get("Index Name") == EXPECTED_INDEXES[kind]
+            for n in follows_nodes
+        )
+    )
+    scans = ", ".join(
+        f"{n['Node Type']} using {n.get('Index Name')} "
+        f"(heap fetches: {n.get('Heap Fetches')})"
+        for n in follows_nodes
+    )
+    print(
+        f"{'OK  ' if ok else 'FAIL'} {kind:>10} | {label:<10} | "
+        f"{plan['Execution Time']:.3f} ms | {scans}"
+        + (" | has Sort node!" if sorts else "")
+    )
+    return ok
+
+
+async def main() -> int:
+    all_ok = True
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        try:
+            await seed(conn)
+            await conn.exec_driver_sql(f"SET search_path TO {args.schema}")
+            for kind, owner, listed, user_id in (
+                ("followers", follows.c.followed, follows.c.followed_by,
+                 CELEBRITY_ID),
+                ("followings", follows.c.followed_by, follows.c.followed,
+                 CELEBRITY_ID + 1),
+            ):
+                first = FollowCrud._page_query(
+                    owner, listed, user_id, args.page_size + 1, None
+                )
+                all_ok &= check(kind, "first page", await explain(conn, first))
+
+                # a deep page: cursor from the middle of the list
+                row = (await conn.execute(
+                    first.with_only_columns(follows.c.follow_at, listed)
+                    .limit(1).offset(args.celebrity_followers // 2)
+                )).first() or (datetime.now(), 0)
+                deep = FollowCrud._page_query(
+                    owner, listed, user_id, args.page_size + 1, tuple(row)
+                )
+                all_ok &= check(kind, "deep page", await explain(conn, deep))
+        finally:
+            await conn.exec_driver_sql("SET search_path TO public")
+            await conn.exec_driver_sql(
+                f"DROP SCHEMA IF EXISTS {args.schema} CASCADE"
+            )
+    await engine.dispose()
+    return 0 if all_ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,100 @@
+"""
+memory benchmark of token-revocation backends ("keys" vs "buckets")
+
+blacklists `--tokens` fake tokens (with "exp"s spread over the lifetime
+of a refresh-token) using each backend of `TokenRevocation`, and reports
+Redis memory used per revoked token. keys written by the benchmark are
+deleted afterwards.
+
+usage (from project's root):
+    python -m benchmarks.token_revocation_memory \
+        --redis-url redis://localhost:6379/15 --tokens 100000
+
+NOTE: use an empty (non-production) Redis DB -> memory is measured by
+`used_memory` of the whole server
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import argparse
+import random
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+parser.add_argument("--tokens", type=int, default=100_000)
+args = parser.parse_args()
+
+# settings need these values; only Redis is used in this benchmark
+os.environ["REDIS_URL"] = args.redis_url
+for name in ("PG_SERVER", "PG_DB", "PG_USER", "PG_PASSWORD"):
+    os.environ.setdefault(name, "unused")
+os.environ.setdefault("JWT_SECRET_KEY", "unused")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+
+from redis.asyncio import Redis  # noqa: E402
+
+from src.core.config import settings  # noqa: E402
+from src.auth import TokenRevocation  # noqa: E402
+
+
+CONCURRENCY = 200
+
+
+async def used_memory(redis: Redis) -> int:
+    return (await redis.info("memory"))["used_memory"]
+
+
+async def cleanup(redis: Redis) -> None:
+    for prefix in (TokenRevocation.KEY_PREFIX,
+                   TokenRevocation.BUCKET_KEY_PREFIX):
+        async for key in redis.scan_iter(match=f"{prefix}*", count=1000):
+            await redis.unlink(key)
+
+
+async def run_backend(redis: Redis, backend: str) -> None:
+    settings.TOKEN_REVOCATION_BACKEND = backend
+    settings.TOKEN_BLACKLIST_LOCAL_MIRROR = False
+    await cleanup(redis)
+    before = await used_memory(redis)
+
+    now = int(time.time())
+    lifetime = settings.REFRESH_TOKEN_EXPIRE_MINUTES * 60
+    payloads = [
+        {
+            "jti": str(uuid.uuid4()),
+            "user_id": random.randint(1, 1_000_000),
+            "exp": now + random.randint(60, lifetime),
+        }
+        for _ in range(args.tokens)
+    ]
+    started_at = time.perf_counter()
+    for i in range(0, len(payloads), CONCURRENCY):
+        await asyncio.gather(*(
+            TokenRevocation.put_in_blacklist(payload, redis)
+            for payload in payloads[i:i + CONCURRENCY]
+        ))
+    elapsed = time.perf_counter() - started_at
+
+    used = await used_memory(redis) - before
+    keys = await redis.dbsize()
+    print(
+        f"{backend:>8}: {args.tokens} tokens | {keys} keys | "
+        f"{used / 1024 / 1024:.1f} MiB | {used / args.tokens:.1f} B/token "
+        f"| {args.tokens / elapsed:.0f} revocations/s"
+    )
+    await cleanup(redis)
+
+
+async def main() -> None:
+    redis = Redis.from_url(args.redis_url, decode_responses=True)
+    try:
+        for backend in ("keys", "buckets"):
+            await run_backend(redis, backend)
+    finally:
+        await redis.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
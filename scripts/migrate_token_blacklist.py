@@ -0,0 +1,29 @@
+"""
+move blacklisted tokens of the "keys" revocation-backend (one Redis key
+per token) into expiry-buckets of the "buckets" backend.
+
+steps:
+1-  set `TOKEN_REVOCATION_BACKEND=buckets` (and keep the default
+    `TOKEN_REVOCATION_LEGACY_FALLBACK=True`) and restart the app
+2-  run this script (from project's root):
+        python -m scripts.migrate_token_blacklist
+3-  set `TOKEN_REVOCATION_LEGACY_FALLBACK=False` and restart the app
+"""
+
+import asyncio
+
+from src.core.redis import init_redis, close_redis
+from src.auth import TokenRevocation
+
+
+async def main() -> None:
+    redis = await init_redis()
+    try:
+        moved = await TokenRevocation.migrate_legacy_keys(redis)
+        print(f"{moved} blacklisted token(s) moved into expiry-buckets.")
+    finally:
+        await close_redis(redis)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,5 +1,12 @@
 from .jwt_ import JWTHandler
 from .token_revocation import TokenRevocation
+from .token_cache import verified_token_cache
+from .rate_limit import LoginRateLimiter
 
 
-__all__ = ["JWTHandler", "TokenRevocation"]
+__all__ = [
+    "JWTHandler",
+    "TokenRevocation",
+    "verified_token_cache",
+    "LoginRateLimiter",
+]
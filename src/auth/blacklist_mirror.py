@@ -0,0 +1,196 @@
+import time
+import asyncio
+import logging
+from typing import Optional
+
+from redis.asyncio import Redis
+from redis.asyncio.client import PubSub
+
+from src.core.metrics import metrics
+from .token_generation import user_token_generation
+
+
+logger = logging.getLogger(__name__)
+
+
+class BlacklistMirror:
+    """
+    in-memory mirror (per worker) of revoked tokens (blacklisted jti's)
+    to answer `TokenRevocation.is_token_blacklisted` without a Redis
+    round-trip. (opt-in: `TOKEN_BLACKLIST_LOCAL_MIRROR=True`)
+
+    how it's kept in sync:
+        _ at app's startup (lifespan) the worker subscribes to `CHANNEL`
+          and then loads a snapshot of all blacklisted tokens from Redis
+          (subscribing first -> no revocation is missed during loading)
+        _ `TokenRevocation.put_in_blacklist` publishes "jti:exp" to
+          `CHANNEL`, and every worker adds it to its own mirror
+        _ entries are dropped when their "exp" passes (exp of a snapshot
+          entry is calculated from TTL of its key/bucket in Redis)
+        _ bumped token-generations of users (`UserTokenGeneration.CHANNEL`)
+          are received on the same connection and applied to local cache
+
+    methods:
+        start()  : subscribe, load snapshot and start listening (startup)
+        stop()   : stop listening (shutdown)
+        add()    : add a revoked jti (with its exp) to the mirror
+        lookup() : True/False if the mirror can answer for sure,
+                   None if it can't (not synced) -> ask Redis itself
+    """
+
+    CHANNEL = "jwt-bl:events"
+    SNAPSHOT_MATCH = "jwt-bl:*"  # TokenRevocation.KEY_PREFIX
+    BUCKETS_SNAPSHOT_MATCH = "jwt-blb:*"  # TokenRevocation.BUCKET_KEY_PREFIX
+    PURGE_INTERVAL_SECONDS = 60
+    RESYNC_DELAY_SECONDS = 1
+
+    def __init__(self):
+        self._revoked: dict[str, float] = {}  # jti -> exp (timestamp)
+        self._synced = False
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_synced(self) -> bool:
+        return self._synced
+
+    async def start(self, redis: Redis) -> None:
+        try:
+            pubsub = await self._subscribe_and_load(redis)
+        except Exception as err:  # e.g. Redis is down -> sync in background
+            logger.warning("token-blacklist mirror isn't synced: %r", err)
+            pubsub = None
+        self._task = asyncio.create_task(self._listen(redis, pubsub))
+
+    async def stop(self) -> None:
+        self._synced = False
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def add(self, jti: str, exp: float) -> None:
+        if exp > time.time():
+            self._revoked[jti] = exp
+            metrics.set_gauge("blacklist_mirror.size", len(self._revoked))
+
+    def lookup(self, jti: str) -> bool | None:
+        exp = self._revoked.get(jti)
+        if exp is not None:
+            if exp > time.time():
+                return True
+            del self._revoked[jti]  # expired (so it's not in Redis either)
+        return False if self._synced else None
+
+    # ----------------------------------------------------------------
+    # private methods:
+
+    async def _subscribe_and_load(self, redis: Redis) -> PubSub:
+        pubsub = redis.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(self.CHANNEL, user_token_generation.CHANNEL)
+        user_token_generation.clear_local()  # bumps may be missed before
+        await self._load_snapshot(redis)
+        self._synced = True
+        return pubsub
+
+    async def _load_snapshot(self, redis: Redis) -> None:
+        revoked: dict[str, float] = {}
+        for pattern in (self.SNAPSHOT_MATCH, self.BUCKETS_SNAPSHOT_MATCH):
+            is_bucket = pattern == self.BUCKETS_SNAPSHOT_MATCH
+            batch: list[str] = []
+            keys = redis.scan_iter(match=pattern, count=1000)
+            async for key in keys:
+                batch.append(key)
+                if len(batch) >= 1000:
+                    await self._load_batch(redis, batch, is_bucket, revoked)
+                    batch.clear()
+            if batch:
+                await self._load_batch(redis, batch, is_bucket, revoked)
+
+        # keep entries which are published while loading the snapshot:
+        revoked.update(self._revoked)
+        self._revoked = revoked
+        metrics.set_gauge("blacklist_mirror.size", len(self._revoked))
+
+    @staticmethod
+    async def _load_batch(
+        redis: Redis,
+        keys: list[str],
+        is_bucket: bool,
+        revoked: dict[str, float]
+    ) -> None:
+        now = time.time()
+        async with redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.ttl(key)
+                if is_bucket:
+                    pipe.smembers(key)
+            results = await pipe.execute()
+
+        step = 2 if is_bucket else 1
+        for i, key in enumerate(keys):
+            ttl = results[i * step]
+            if ttl <= 0:  # -2: already expired / -1: no TTL (not ours)
+                continue
+            if is_bucket:  # NOTE: bucket's end is >= exp of its members
+                for jti in results[i * step + 1]:
+                    revoked[jti] = now + ttl
+            else:
+                revoked[key.split(":", 1)[1]] = now + ttl
+
+    async def _listen(self, redis: Redis, pubsub: Optional[PubSub]) -> None:
+        if pubsub is None:
+            pubsub = await self._resubscribe(redis)
+        while True:
+            try:
+                await self._consume(pubsub)
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:
+                # events may be lost while disconnected -> resync from Redis
+                self._synced = False
+                metrics.incr("blacklist_mirror.resyncs")
+                logger.warning("token-blacklist mirror lost sync: %r", err)
+            finally:
+                await pubsub.aclose()
+            pubsub = await self._resubscribe(redis)
+
+    async def _consume(self, pubsub: PubSub) -> None:
+        last_purge = time.monotonic()
+        while True:
+            message = await pubsub.get_message(timeout=1.0)
+            if message is not None:
+                self._handle_message(message["channel"], message["data"])
+            if time.monotonic() - last_purge >= self.PURGE_INTERVAL_SECONDS:
+                self._purge_expired()
+                last_purge = time.monotonic()
+
+    async def _resubscribe(self, redis: Redis) -> PubSub:
+        while True:
+            await asyncio.sleep(self.RESYNC_DELAY_SECONDS)
+            try:
+                return await self._subscribe_and_load(redis)
+            except Exception as err:
+                logger.warning("token-blacklist mirror resync failed: %r", err)
+
+    def _handle_message(self, channel: str, data: str) -> None:
+        try:
+            if channel == user_token_generation.CHANNEL:
+                user_token_generation.handle_event(data)
+            else:
+                jti, _, exp = data.rpartition(":")
+                self.add(jti, float(exp))
+        except ValueError:
+            logger.warning("invalid token-revocation event: %r", data)
+
+    def _purge_expired(self) -> None:
+        now = time.time()
+        self._revoked = {
+            jti: exp for jti, exp in self._revoked.items() if exp > now
+        }
+        metrics.set_gauge("blacklist_mirror.size", len(self._revoked))
+
+
+blacklist_mirror = BlacklistMirror()
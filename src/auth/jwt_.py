@@ -1,4 +1,4 @@
-from typing import Literal, Any
+from typing import Literal, Any, Optional
 import uuid
 from datetime import datetime, timezone, timedelta
 
@@ -9,6 +9,7 @@ from redis.asyncio import Redis
 from src.core.config import settings
 from src.core.exceptions import UnauthenticatedException
 from .token_revocation import TokenRevocation
+from .token_cache import verified_token_cache
 
 
 class JWTHandler:
@@ -17,8 +18,19 @@ class JWTHandler:
     methods:
         generate_token()    : is used to generate an access/refresh token
         get_token_payload() : is used to extract a token's payload
+        get_tokens_payloads() : extract payloads of many tokens at once
+                                (+ revoke them) with one Redis round-trip
+        authz_claims()      : authorization claims of a user to embed in
+                              its tokens ("is_active" & "is_superuser")
+
+    NOTE: with `JWT_TRUST_AUTHZ_CLAIMS=True`, auth-dependencies trust the
+    (signed) authorization claims of access-tokens instead of querying the
+    database. so any change in these fields of a user (suspension, etc.)
+    must revoke its tokens (`AuthService.revoke_all_sessions`)
     """
 
+    AUTHZ_CLAIMS = ("is_active", "is_superuser")
+
     SECRET_KEY = settings.JWT_SECRET_KEY
     ALGORITHM = settings.JWT_ALGORITHM
     access_token_expire_minutes = settings.ACCESS_TOKEN_EXPIRE_MINUTES
@@ -26,18 +38,35 @@ class JWTHandler:
 
     @staticmethod
     def generate_token(
-        user_id: int, token_type: Literal["access", "refresh"],
+        user_id: int,
+        token_type: Literal["access", "refresh"],
+        generation: int = 0,
+        claims: Optional[dict[str, Any]] = None
     ) -> str:
         match token_type:
             case "access":
                 return JWTHandler._encode(
-                    user_id, "access", JWTHandler.access_token_expire_minutes
+                    user_id, "access",
+                    JWTHandler.access_token_expire_minutes, generation, claims
                 )
             case "refresh":
                 return JWTHandler._encode(
-                    user_id, "refresh", JWTHandler.refresh_token_expire_minutes
+                    user_id, "refresh",
+                    JWTHandler.refresh_token_expire_minutes, generation, claims
                 )
 
+    @staticmethod
+    def authz_claims(source: Any) -> dict[str, Any]:
+        """
+        `source` : a User-obj (while login) or payload of a refresh-token
+        (while renewing tokens) -> returns its authorization claims
+        """
+        if isinstance(source, dict):
+            return {
+                k: source[k] for k in JWTHandler.AUTHZ_CLAIMS if k in source
+            }
+        return {k: getattr(source, k) for k in JWTHandler.AUTHZ_CLAIMS}
+
     @staticmethod
     async def get_token_payload(
         token: str, token_type: Literal["access", "refresh"], redis: Redis
@@ -45,17 +74,44 @@ class JWTHandler:
         payload = await JWTHandler._decode(token, token_type, redis)
         return payload
 
+    @staticmethod
+    async def get_tokens_payloads(
+        tokens: list[tuple[str, Literal["access", "refresh"]]],
+        redis: Redis,
+        revoke: bool = False
+    ) -> list[dict[str, Any]]:
+        """
+        params:
+            - `tokens` : [(token, intended-type), ...] to decode
+            - `redis` : redis-client (async) to check/blacklist tokens
+            - `revoke` : blacklist all tokens too (e.g. while logout)
+        decode all tokens (same as `get_token_payload`) while revocation of
+        all of them is checked (and written if `revoke`) in a single Redis
+        round-trip -> raises if any of tokens is invalid or already revoked
+        NOTE: with `revoke=True`, tokens are verified locally (signature,
+        expiry, type) before any of them is blacklisted -> if one of them
+        is invalid, it raises and NOTHING is blacklisted; if all are valid,
+        all are blacklisted (even if one of them was revoked before, which
+        raises after that)
+        """
+        return await JWTHandler._decode_many(tokens, redis, revoke)
+
     @staticmethod
     def _encode(
         user_id: int,
         token_type: Literal["access", "refresh"],
-        token_expire_minutes: int
+        token_expire_minutes: int,
+        generation: int = 0,
+        claims: Optional[dict[str, Any]] = None
     ) -> str:
         """
         params:
             - `user_id` : id of the user-obj for token
             - `token_type` : intended type of token to generate
             - `token_expire_minutes` : refresh/access expire_minutes
+            - `generation` : current token-generation of the user (tokens
+              with older generations are revoked -> UserTokenGeneration)
+            - `claims` : extra (authorization) claims to embed in token
         steps:
         1-  generate a 'jti' (uuid4) (jti: jwtID -> Unique ID for token)
         2-  calculate 'token-expiration'
@@ -69,8 +125,10 @@ class JWTHandler:
             "jti": jti,
             "type": token_type,
             "user_id": user_id,
+            "gen": generation,
             "iat": utc_now,
-            "exp": expires_at
+            "exp": expires_at,
+            **(claims or {})
         }
         return jwt.encode(payload, JWTHandler.SECRET_KEY, JWTHandler.ALGORITHM)
 
@@ -86,38 +144,85 @@ class JWTHandler:
             - `type_must_be` : intended type of token
             - `redis` : redis-client (async) to check if token is blacklisted
         steps:
+        0-  if token is in `verified_token_cache` (verified before): skip
+            step 1 and check its type (+ re-check its blacklisting statement
+            if `TOKEN_CACHE_RECHECK_SECONDS` is passed since last check)
         1-  decode `token` to extract its "payload" -> (raise a Custom
             'JWTDecodeError') if there's a problem in decoding process
         2-  analyze extracted "payload" -> raise a Custom 'TokenError' if
-            token: "is expired" or "has not-intended type" or "is blacklisted"
-        3-  return extracted "payload" if everything is ok
+            token: "is expired" or "has not-intended type" or "is revoked"
+        3-  cache and return extracted "payload" if everything is ok
         """
-        try:
-            payload = jwt.decode(
-                token, JWTHandler.SECRET_KEY, JWTHandler.ALGORITHM
+        [payload] = await JWTHandler._decode_many(
+            [(token, type_must_be)], redis
+        )
+        return payload
+
+    @staticmethod
+    async def _decode_many(
+        tokens: list[tuple[str, Literal["access", "refresh"]]],
+        redis: Redis,
+        revoke: bool = False
+    ) -> list[dict[str, Any]]:
+        """
+        steps 0-2 of `_decode` for each token (locally), then checking
+        revocation of all tokens which need it in one Redis pipeline
+        """
+        verified = [
+            JWTHandler._verify(token, type_must_be)
+            for token, type_must_be in tokens
+        ]
+        if revoke:
+            to_check = list(range(len(verified)))
+        else:
+            to_check = [
+                i for i, (_, needs_check, _) in enumerate(verified)
+                if needs_check
+            ]
+        if to_check:
+            revoked = await TokenRevocation.are_tokens_revoked(
+                [verified[i][0] for i in to_check], redis, blacklist=revoke
             )
-            # check token expiration:
-            utc_now_ts = datetime.now(timezone.utc).timestamp()
-            token_expire_ts = payload.get("exp", None)
-            if (token_expire_ts is None) or utc_now_ts > token_expire_ts:
-                raise UnauthenticatedException(
-                    "Authentication failed: token expired."
-                )
-            # check token type:
-            token_type = payload.get("type")
-            if token_type != type_must_be:
-                raise UnauthenticatedException(
-                    "Authentication failed: invalid token type."
-                )
-            # check token is blacklisted or not:
-            jti = payload.get("jti")
-            if await TokenRevocation.is_token_blacklisted(jti, redis):
+            for i, is_revoked in zip(to_check, revoked):
+                if is_revoked:
+                    verified_token_cache.discard_jti(verified[i][0].get("jti"))
+                    raise UnauthenticatedException(
+                        "Authentication failed: token revoked."
+                    )
+
+        if not revoke:  # (revoked tokens are dropped from cache)
+            for (token, _), (payload, needs_check, is_cached) in zip(
+                tokens, verified
+            ):
+                if not is_cached:
+                    verified_token_cache.put(token, payload)
+                elif needs_check:
+                    verified_token_cache.mark_checked(token)
+        return [payload for payload, _, _ in verified]
+
+    @staticmethod
+    def _verify(
+        token: str, type_must_be: Literal["access", "refresh"]
+    ) -> tuple[dict[str, Any], bool, bool]:
+        """
+        local part of `_decode` (steps 0-2, without Redis)
+        -> returns (payload, needs_revocation_check, is_cached)
+        """
+        cached = verified_token_cache.get(token)
+        if cached is not None:
+            payload, needs_revocation_recheck = cached
+            JWTHandler._check_token_type(payload, type_must_be)
+            if TokenRevocation.is_token_revoked_locally(payload):
+                verified_token_cache.discard_jti(payload.get("jti"))
                 raise UnauthenticatedException(
-                    "Authentication failed: token revoked (blacklisted)."
+                    "Authentication failed: token revoked."
                 )
+            return payload, needs_revocation_recheck, True
 
-            return payload
-
+        try:
+            payload = jwt.decode(
+                token, JWTHandler.SECRET_KEY, JWTHandler.ALGORITHM
+            )
         except ExpiredSignatureError as err:
             raise UnauthenticatedException(
                     "Authentication failed: token expired."
@@ -128,3 +233,24 @@ class JWTHandler:
                 f"Authentication failed (unable to decode token): "
                 f"{err.__class__.__name__}: {err}"
             ) from err
+
+        # check token expiration:
+        utc_now_ts = datetime.now(timezone.utc).timestamp()
+        token_expire_ts = payload.get("exp", None)
+        if (token_expire_ts is None) or utc_now_ts > token_expire_ts:
+            raise UnauthenticatedException(
+                "Authentication failed: token expired."
+            )
+        # check token type:
+        JWTHandler._check_token_type(payload, type_must_be)
+        # revocation (blacklisted/old-generation) is checked by the caller
+        return payload, True, False
+
+    @staticmethod
+    def _check_token_type(
+        payload: dict[str, Any], type_must_be: Literal["access", "refresh"]
+    ) -> None:
+        if payload.get("type") != type_must_be:
+            raise UnauthenticatedException(
+                "Authentication failed: invalid token type."
+            )
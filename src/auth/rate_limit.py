@@ -0,0 +1,149 @@
+import math
+import time
+import hashlib
+import logging
+from typing import Optional
+
+from redis.asyncio import Redis
+from redis.commands.core import AsyncScript
+from redis.exceptions import RedisError
+
+from src.core.config import settings
+from src.core.metrics import metrics
+from src.core.exceptions import TooManyRequestsException
+
+
+logger = logging.getLogger(__name__)
+
+
+# GCRA (Generic Cell Rate Algorithm) for all KEYS at once (atomically):
+# ARGV[1] = now (ms) | ARGV[2i], ARGV[2i+1] = emission-interval & tolerance
+# of KEYS[i] (ms) -> returns 0 if allowed, otherwise retry-after (ms).
+# NOTE: an attempt is counted only if it's allowed for *all* keys
+_GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local retry_after = 0
+local new_tats = {}
+for i, key in ipairs(KEYS) do
+    local emission = tonumber(ARGV[2 * i])
+    local tolerance = tonumber(ARGV[2 * i + 1])
+    local tat = tonumber(redis.call("GET", key) or now)
+    if tat < now then tat = now end
+    new_tats[i] = tat + emission
+    local allow_at = new_tats[i] - tolerance
+    if allow_at > now then
+        retry_after = math.max(retry_after, allow_at - now)
+    end
+end
+if retry_after > 0 then return retry_after end
+for i, key in ipairs(KEYS) do
+    redis.call("SET", key, new_tats[i], "PX", new_tats[i] - now)
+end
+return 0
+"""
+
+
+class LoginRateLimiter:
+    """
+    throttle login attempts (each one costs a full bcrypt verification)
+    per identifier (username/email) and per client IP.
+
+    _ algorithm: GCRA -> `LOGIN_RATE_PER_IDENTIFIER`/`LOGIN_RATE_PER_IP`
+      attempts per `LOGIN_RATE_PERIOD_SECONDS` (bursts up to these limits)
+    _ state is kept in Redis and checked/updated atomically (Lua script)
+    _ if Redis is unavailable, an in-process limiter (per worker) is used
+    _ rejected attempts raise TooManyRequestsException (429 + Retry-After)
+
+    methods:
+        check() : count an attempt, or raise if the limit is exceeded
+    """
+
+    KEY_PREFIX = "rl:login:"
+
+    _script: Optional[AsyncScript] = None
+    _script_client: Optional[Redis] = None
+    _local_tats: dict[str, float] = {}  # key -> TAT (ms) (fallback limiter)
+    MAX_LOCAL_KEYS = 100_000
+
+    @staticmethod
+    async def check(identifier: str, client_ip: str, redis: Redis) -> None:
+        if not settings.LOGIN_RATE_LIMIT_ENABLED:
+            return
+        limits = LoginRateLimiter._limits(identifier, client_ip)
+        now_ms = int(time.time() * 1000)
+        try:
+            retry_after_ms = await LoginRateLimiter._check_in_redis(
+                limits, now_ms, redis
+            )
+        except RedisError as err:
+            logger.warning("login rate-limiter fallback to local: %r", err)
+            metrics.incr("login_rate_limit.local_fallbacks")
+            retry_after_ms = LoginRateLimiter._check_locally(limits, now_ms)
+
+        if retry_after_ms > 0:
+            metrics.incr("login_rate_limit.rejected")
+            raise TooManyRequestsException(
+                retry_after=math.ceil(retry_after_ms / 1000),
+                message="Too many login attempts. please try again later."
+            )
+
+    # ----------------------------------------------------------------
+    # private methods:
+
+    @staticmethod
+    def _limits(
+        identifier: str, client_ip: str
+    ) -> list[tuple[str, int, int]]:
+        """ returns [(key, emission_interval_ms, tolerance_ms), ...] """
+        period_ms = settings.LOGIN_RATE_PERIOD_SECONDS * 1000
+        # NOTE: hashed -> bounded key-length for any (long) identifier
+        identifier_hash = hashlib.sha1(
+            identifier.strip().lower().encode()
+        ).hexdigest()
+        limits = []
+        for key, rate in (
+            (f"id:{identifier_hash}", settings.LOGIN_RATE_PER_IDENTIFIER),
+            (f"ip:{client_ip}", settings.LOGIN_RATE_PER_IP),
+        ):
+            emission_interval = period_ms // rate
+            limits.append((
+                f"{LoginRateLimiter.KEY_PREFIX}{key}",
+                emission_interval,
+                emission_interval * rate
+            ))
+        return limits
+
+    @staticmethod
+    async def _check_in_redis(
+        limits: list[tuple[str, int, int]], now_ms: int, redis: Redis
+    ) -> int:
+        if LoginRateLimiter._script_client is not redis:
+            LoginRateLimiter._script = redis.register_script(_GCRA_SCRIPT)
+            LoginRateLimiter._script_client = redis
+        args = [now_ms]
+        for _, emission_interval, tolerance in limits:
+            args.extend((emission_interval, tolerance))
+        return int(await LoginRateLimiter._script(
+            keys=[key for key, _, _ in limits], args=args
+        ))
+
+    @staticmethod
+    def _check_locally(limits: list[tuple[str, int, int]], now_ms: int) -> int:
+        """ same algorithm as `_GCRA_SCRIPT` (for this worker only) """
+        tats = LoginRateLimiter._local_tats
+        if len(tats) >= LoginRateLimiter.MAX_LOCAL_KEYS:
+            LoginRateLimiter._local_tats = tats = {
+                key: tat for key, tat in tats.items() if tat > now_ms
+            }
+        retry_after, new_tats = 0, []
+        for key, emission_interval, tolerance in limits:
+            tat = max(tats.get(key, now_ms), now_ms)
+            new_tats.append(tat + emission_interval)
+            allow_at = new_tats[-1] - tolerance
+            if allow_at > now_ms:
+                retry_after = max(retry_after, allow_at - now_ms)
+        if retry_after > 0:
+            return retry_after
+        for (key, _, _), new_tat in zip(limits, new_tats):
+            tats[key] = new_tat
+        return 0
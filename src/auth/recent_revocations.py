@@ -0,0 +1,71 @@
+import time
+from collections import OrderedDict
+
+from src.core.config import settings
+from src.core.metrics import metrics
+
+
+class RecentRevocations:
+    """
+    bounded in-memory record (per worker) of tokens which are revoked by
+    this worker recently. it's used only while Redis is unavailable
+    (`REDIS_DEGRADED_AUTH_MODE="local"`) to answer revocation checks.
+
+    methods:
+        add()         : record revoked tokens (`pending=True` if they
+                        couldn't be written to Redis)
+        contains()    : whether a (non-expired) token is recorded
+        pop_pending() : take pending revocations to write them to Redis
+                        (they're queued in the next revocation pipeline)
+
+    NOTE: revocations of *other* workers aren't known here (unless the
+    local blacklist-mirror is enabled) -> "local" mode trades some safety
+    for availability while Redis is down
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._revoked: OrderedDict[str, float] = OrderedDict()  # jti: exp
+        self._pending: dict[str, dict] = {}  # jti: minimal payload
+
+    def add(self, payloads: list[dict], pending: bool = False) -> None:
+        for payload in payloads:
+            jti = payload.get("jti")
+            self._revoked[jti] = payload.get("exp")
+            self._revoked.move_to_end(jti)
+            if pending:
+                self._pending[jti] = {
+                    "jti": jti,
+                    "exp": payload.get("exp"),
+                    "user_id": payload.get("user_id"),
+                }
+        while len(self._revoked) > self.max_size:
+            self._revoked.popitem(last=False)
+        if len(self._pending) > self.max_size:  # keep the newest ones
+            self._pending = dict(
+                list(self._pending.items())[-self.max_size:]
+            )
+        metrics.set_gauge("recent_revocations.pending", len(self._pending))
+
+    def contains(self, jti: str) -> bool:
+        exp = self._revoked.get(jti)
+        if exp is None:
+            return False
+        if exp <= time.time():
+            del self._revoked[jti]
+            return False
+        return True
+
+    def pop_pending(self) -> list[dict]:
+        if not self._pending:
+            return []
+        now = time.time()
+        pending = [p for p in self._pending.values() if p["exp"] > now]
+        self._pending = {}
+        metrics.set_gauge("recent_revocations.pending", 0)
+        return pending
+
+
+recent_revocations = RecentRevocations(
+    max_size=settings.RECENT_REVOCATIONS_MAX_SIZE
+)
@@ -0,0 +1,127 @@
+import time
+import hashlib
+from collections import OrderedDict
+from typing import Any, Optional
+
+from src.core.config import settings
+from src.core.metrics import metrics
+
+
+class _CachedToken:
+    __slots__ = ("payload", "exp", "jti", "checked_at")
+
+    def __init__(self, payload: dict[str, Any], checked_at: float):
+        self.payload = payload
+        self.exp: float = payload["exp"]
+        self.jti: Optional[str] = payload.get("jti")
+        self.checked_at = checked_at  # last revocation-check (monotonic)
+
+
+class VerifiedTokenCache:
+    """
+    in-process (per worker) bounded LRU cache of verified tokens:
+    clients send the same access-token many times during its lifetime, so
+    after the first successful `JWTHandler._decode` its payload is cached
+    (until the token's "exp") to skip signature verification next times.
+
+    methods:
+        get()         : returns (payload, needs_revocation_recheck) or None
+        put()         : cache a verified token's payload
+        mark_checked(): reset revocation-recheck timer of a cached token
+        discard_jti() : drop a token from cache (e.g. when it's revoked)
+        stats()       : hit/miss counters and current size of the cache
+
+    NOTE:
+    _ keys are sha256 digests of tokens (raw tokens aren't kept as keys)
+    _ a revoked token may stay valid on *other* workers at most for
+      `TOKEN_CACHE_RECHECK_SECONDS`; after that its revocation
+      statement is checked again (TokenRevocation.is_token_blacklisted)
+    """
+
+    def __init__(self, max_size: int, revocation_recheck_seconds: int):
+        self.max_size = max_size
+        self.revocation_recheck_seconds = revocation_recheck_seconds
+        self._entries: OrderedDict[bytes, _CachedToken] = OrderedDict()
+        self._jti_index: dict[str, bytes] = {}  # jti -> key
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, token: str) -> tuple[dict[str, Any], bool] | None:
+        if not self.enabled:
+            return None
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self._record("misses")
+            return None
+        if time.time() >= entry.exp:  # expired -> full decode raises error
+            self._remove(key)
+            self._record("misses")
+            return None
+
+        self._entries.move_to_end(key)
+        self._record("hits")
+        needs_recheck = (
+            time.monotonic() - entry.checked_at
+        ) >= self.revocation_recheck_seconds
+        return dict(entry.payload), needs_recheck  # copy: payload is shared
+
+    def put(self, token: str, payload: dict[str, Any]) -> None:
+        if not self.enabled or payload.get("exp") is None:
+            return
+        key = self._key(token)
+        entry = _CachedToken(dict(payload), time.monotonic())
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        if entry.jti is not None:
+            self._jti_index[entry.jti] = key
+        while len(self._entries) > self.max_size:  # evict LRU entries
+            _, old_entry = self._entries.popitem(last=False)
+            self._drop_from_index(old_entry)
+            metrics.incr("token_cache.evictions")
+        metrics.set_gauge("token_cache.size", len(self._entries))
+
+    def mark_checked(self, token: str) -> None:
+        entry = self._entries.get(self._key(token))
+        if entry is not None:
+            entry.checked_at = time.monotonic()
+
+    def discard_jti(self, jti: str) -> None:
+        key = self._jti_index.get(jti)
+        if key is not None:
+            self._remove(key)
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses,
+                "size": len(self._entries), "max_size": self.max_size}
+
+    # ----------------------------------------------------------------
+    # private methods:
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def _record(self, counter: str) -> None:
+        setattr(self, counter, getattr(self, counter) + 1)
+        metrics.incr(f"token_cache.{counter}")
+
+    def _remove(self, key: bytes) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._drop_from_index(entry)
+            metrics.set_gauge("token_cache.size", len(self._entries))
+
+    def _drop_from_index(self, entry: _CachedToken) -> None:
+        if entry.jti is not None:
+            self._jti_index.pop(entry.jti, None)
+
+
+verified_token_cache = VerifiedTokenCache(
+    max_size=settings.TOKEN_CACHE_MAX_SIZE,
+    revocation_recheck_seconds=settings.TOKEN_CACHE_RECHECK_SECONDS
+)
@@ -0,0 +1,107 @@
+import time
+
+from redis.asyncio import Redis
+
+from src.core.config import settings
+
+
+class UserTokenGeneration:
+    """
+    Handle per-user token-generation:
+    every token carries the "gen" (generation) of its user at the time it
+    is generated; bumping a user's generation revokes all of its tokens
+    at once (e.g. when the user changes password or gets suspended)
+    -> one write, instead of blacklisting each token separately.
+
+    methods:
+        get()          : current generation of a user (local cache / Redis)
+        get_local()    : current generation from local cache (or None)
+        get_last_known(): last cached generation, even if it's too old
+        bump()         : increment a user's generation (revoke all tokens)
+        cache_result() : cache a generation fetched from Redis
+        handle_event() : apply a "user_id:generation" event (pub/sub)
+
+    NOTE:
+    _ generations are cached per worker for `TOKEN_GENERATION_CACHE_SECONDS`
+      (bumps are pushed to other workers via pub/sub immediately, if
+      `TOKEN_BLACKLIST_LOCAL_MIRROR=True`)
+    _ Redis key of a generation never expires: renewed refresh-tokens
+      carry their "gen" forward, so a token of any generation may still
+      be valid long after the last bump -> if the key expired, the next
+      bump would restart from 1 and revive tokens of older generations
+      (one small key per user who was ever revoked-all)
+    """
+
+    KEY_PREFIX = "jwt-gen:"
+    CHANNEL = "jwt-gen:events"
+    MAX_LOCAL_ENTRIES = 100_000
+
+    def __init__(self):
+        self._local: dict[int, tuple[int, float]] = {}  # id: (gen, fetched)
+
+    async def get(self, user_id: int, redis: Redis) -> int:
+        generation = self.get_local(user_id)
+        if generation is None:
+            value = await redis.get(self.generation_key(user_id))
+            generation = self.cache_result(user_id, value)
+        return generation
+
+    def get_local(self, user_id: int) -> int | None:
+        cached = self._local.get(user_id)
+        if cached is None:
+            return None
+        generation, fetched_at = cached
+        if time.monotonic() - fetched_at > self._cache_seconds:
+            return None  # (still kept as the last known generation)
+        return generation
+
+    def get_last_known(self, user_id: int) -> int:
+        """ cached generation regardless of its age (Redis is down) """
+        cached = self._local.get(user_id)
+        return cached[0] if cached is not None else 0
+
+    async def bump(self, user_id: int, redis: Redis) -> int:
+        # NOTE: no TTL (check the class docstring); PERSIST drops the TTL
+        # of keys which are written by older versions
+        key = self.generation_key(user_id)
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.incr(key)
+            pipe.persist(key)
+            generation, _ = await pipe.execute()
+        if settings.TOKEN_BLACKLIST_LOCAL_MIRROR:
+            await redis.publish(self.CHANNEL, f"{user_id}:{generation}")
+        self.cache_result(user_id, generation)
+        return generation
+
+    def cache_result(self, user_id: int, value: str | int | None) -> int:
+        generation = int(value) if value is not None else 0
+        if len(self._local) >= self.MAX_LOCAL_ENTRIES:
+            self._purge_expired()
+        self._local[user_id] = (generation, time.monotonic())
+        return generation
+
+    def handle_event(self, data: str) -> None:
+        user_id, _, generation = data.partition(":")
+        self.cache_result(int(user_id), int(generation))
+
+    def clear_local(self) -> None:
+        self._local.clear()
+
+    def generation_key(self, user_id: int) -> str:
+        return f"{self.KEY_PREFIX}{user_id}"
+
+    @property
+    def _cache_seconds(self) -> int:
+        return settings.TOKEN_GENERATION_CACHE_SECONDS
+
+    def _purge_expired(self) -> None:
+        now = time.monotonic()
+        self._local = {
+            user_id: cached for user_id, cached in self._local.items()
+            if now - cached[1] <= self._cache_seconds
+        }
+        if len(self._local) >= self.MAX_LOCAL_ENTRIES:  # all are fresh
+            self._local.clear()
+
+
+user_token_generation = UserTokenGeneration()
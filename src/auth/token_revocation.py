@@ -1,6 +1,16 @@
 import time
+from typing import Any, Optional
 
 from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from redis.exceptions import RedisError
+
+from src.core.config import settings
+from src.core.metrics import metrics
+from .token_cache import verified_token_cache
+from .blacklist_mirror import blacklist_mirror
+from .token_generation import user_token_generation
+from .recent_revocations import recent_revocations
 
 
 class TokenRevocation:
@@ -14,12 +24,33 @@ class TokenRevocation:
 
     methods:
         put_in_blacklist() : put non-expired but used tokens in blacklist
+        put_many_in_blacklist() : put many tokens in blacklist at once
         is_token_blacklisted() : check whether a token is blacklisted/revoked
+        migrate_legacy_keys() : move "keys" backend's tokens into buckets
+        revoke_all_user_tokens() : revoke all tokens of a user at once
+        get_user_generation() : current token-generation of a user
+        is_token_revoked() : check whether a token is blacklisted or is
+                             from an old generation (both in one round-trip)
+        are_tokens_revoked() : check (and blacklist) many tokens at once
 
-    NOTE: Token-Revocation strategy is implemented using Redis DB
+    NOTE: Token-Revocation strategy is implemented using Redis DB, with
+    one of these storage backends (`TOKEN_REVOCATION_BACKEND`):
+    _ "keys"    : one string key per token ("jwt-bl:<jti>") with TTL
+    _ "buckets" : one set per expiry-bucket of tokens ("jwt-blb:<start>"),
+                  (e.g. all tokens which expire in the same hour) with a
+                  TTL on the whole bucket -> much less per-key overhead
+                  and still O(1) checks (SISMEMBER)
+    NOTE: with `TOKEN_BLACKLIST_LOCAL_MIRROR=True` each worker keeps a
+    local mirror of the blacklist (synced via Redis pub/sub) and asks
+    Redis only if the mirror can't answer for sure (check BlacklistMirror)
+    NOTE: while Redis is unavailable, `REDIS_DEGRADED_AUTH_MODE` decides:
+    "fail" -> RedisError is raised (503), "local" -> checks are answered
+    by data of this worker (RecentRevocations, mirror, last generations)
+    and new revocations are kept as pending, to be written to Redis later
     """
 
-    KEY_PREFIX = "jwt-bl:"  # blacklist-tokens prefix
+    KEY_PREFIX = "jwt-bl:"  # blacklist-tokens prefix ("keys" backend)
+    BUCKET_KEY_PREFIX = "jwt-blb:"  # blacklist-buckets ("buckets" backend)
 
     @staticmethod
     async def put_in_blacklist(payload: dict, redis: Redis) -> None:
@@ -31,23 +62,338 @@ class TokenRevocation:
         1-  get token's "exp" (expiration timestamp) (payload["exp"]) and
             calculate TTL to save in Redis DB
         2-  get token's "jti" (payload["jti"]) -> key to blacklist a token
-        3-  set a key="KEY_PREFIX:jti" with expire="ttl" in Redis DB
+        3-  depends on `TOKEN_REVOCATION_BACKEND`:
+            "keys"    : set a key="KEY_PREFIX:jti" with expire="ttl"
+            "buckets" : add "jti" to the set of its expiry-bucket
+            (+ publish "jti:exp" to other workers if local mirror is used)
+        4-  drop the token from `verified_token_cache` of this worker
+        """
+        await TokenRevocation.put_many_in_blacklist([payload], redis)
+
+    @staticmethod
+    async def put_many_in_blacklist(
+        payloads: list[dict], redis: Redis
+    ) -> None:
+        """ same as `put_in_blacklist`, for all tokens in one round-trip """
+        to_apply: list[dict] = []
+        pending: list[dict] = []
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                to_apply = TokenRevocation._queue_blacklisting_many(
+                    pipe, payloads
+                )
+                pending = TokenRevocation._queue_pending(pipe)
+                await pipe.execute()
+        except RedisError as err:
+            TokenRevocation._degrade(err, pending)
+            TokenRevocation._apply_blacklisting_locally(to_apply, True)
+            return
+        TokenRevocation._apply_blacklisting_locally(to_apply)
+
+    @staticmethod
+    async def is_token_blacklisted(
+        jti: str, redis: Redis, exp: Optional[int] = None
+    ) -> bool:
+        """ `exp` of token is required for "buckets" backend """
+        is_blacklisted = TokenRevocation._lookup_mirror(jti)
+        if is_blacklisted is not None:
+            return is_blacklisted
+
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                TokenRevocation._queue_blacklist_check(pipe, jti, exp)
+                results = await pipe.execute()
+        except RedisError as err:
+            TokenRevocation._degrade(err)
+            return recent_revocations.contains(jti)
+        return any(results)
+
+    @staticmethod
+    async def revoke_all_user_tokens(user_id: int, redis: Redis) -> None:
+        """
+        bump user's token-generation -> every token generated before (with
+        an older "gen" in its payload) is revoked (check UserTokenGeneration)
+        """
+        await user_token_generation.bump(user_id, redis)
+
+    @staticmethod
+    async def get_user_generation(user_id: int, redis: Redis) -> int:
+        """ is used to embed user's current generation in new tokens """
+        try:
+            return await user_token_generation.get(user_id, redis)
+        except RedisError as err:
+            TokenRevocation._degrade(err)
+            return user_token_generation.get_last_known(user_id)
+
+    @staticmethod
+    async def is_token_revoked(payload: dict, redis: Redis) -> bool:
+        """
+        a token is revoked if it's blacklisted, or its "gen" is older than
+        its user's current generation. whatever can't be answered locally
+        (local blacklist-mirror & cached generations) is asked from Redis
+        in one pipeline (single round-trip)
+        """
+        [is_revoked] = await TokenRevocation.are_tokens_revoked(
+            [payload], redis
+        )
+        return is_revoked
+
+    @staticmethod
+    async def are_tokens_revoked(
+        payloads: list[dict], redis: Redis, blacklist: bool = False
+    ) -> list[bool]:
+        """
+        same as `is_token_revoked` for many tokens (still one round-trip).
+        with `blacklist=True` all tokens are blacklisted too, in the same
+        pipeline (e.g. logout) -> returned flags show the statement of
+        tokens *before* this call (re-blacklisting a token is harmless)
+        """
+        is_blacklisted: list[Optional[bool]] = []
+        generations: dict[Any, Optional[int]] = {}
+        for payload in payloads:
+            is_blacklisted.append(
+                TokenRevocation._lookup_mirror(payload.get("jti"))
+            )
+            user_id = payload.get("user_id")
+            if user_id not in generations:
+                generations[user_id] = user_token_generation.get_local(
+                    user_id
+                )
+        missing_generations = [
+            user_id for user_id, gen in generations.items() if gen is None
+        ]
+
+        to_apply: list[dict] = []
+        pending: list[dict] = []
+        if (
+            blacklist or missing_generations
+            or any(flag is None for flag in is_blacklisted)
+        ):
+            try:
+                async with redis.pipeline(transaction=False) as pipe:
+                    checks = [
+                        TokenRevocation._queue_blacklist_check(
+                            pipe, payload.get("jti"), payload.get("exp")
+                        ) if flag is None else 0
+                        for payload, flag in zip(payloads, is_blacklisted)
+                    ]
+                    for user_id in missing_generations:
+                        pipe.get(
+                            user_token_generation.generation_key(user_id)
+                        )
+                    if blacklist:
+                        to_apply = TokenRevocation._queue_blacklisting_many(
+                            pipe, payloads
+                        )
+                    pending = TokenRevocation._queue_pending(pipe)
+                    results = await pipe.execute()
+            except RedisError as err:
+                TokenRevocation._degrade(err, pending)
+                TokenRevocation._apply_blacklisting_locally(to_apply, True)
+                return [
+                    bool(flag)
+                    or recent_revocations.contains(payload.get("jti"))
+                    or payload.get("gen", 0)
+                    < user_token_generation.get_last_known(
+                        payload.get("user_id")
+                    )
+                    for payload, flag in zip(payloads, is_blacklisted)
+                ]
+
+            position = 0
+            for i, count in enumerate(checks):
+                if count:
+                    is_blacklisted[i] = any(
+                        results[position:position + count]
+                    )
+                    position += count
+            for user_id in missing_generations:
+                generations[user_id] = user_token_generation.cache_result(
+                    user_id, results[position]
+                )
+                position += 1
+        TokenRevocation._apply_blacklisting_locally(to_apply)
+
+        return [
+            bool(flag)
+            or payload.get("gen", 0) < generations[payload.get("user_id")]
+            for payload, flag in zip(payloads, is_blacklisted)
+        ]
+
+    @staticmethod
+    def is_token_revoked_locally(payload: dict) -> bool:
+        """ check revocation only by data of this worker (no Redis) """
+        if settings.TOKEN_BLACKLIST_LOCAL_MIRROR:
+            if blacklist_mirror.lookup(payload.get("jti")):
+                return True
+        generation = user_token_generation.get_local(payload.get("user_id"))
+        return generation is not None and payload.get("gen", 0) < generation
+
+    @staticmethod
+    async def migrate_legacy_keys(redis: Redis, batch_size: int = 1000) -> int:
+        """
+        move blacklisted tokens of "keys" backend (one key per token) into
+        expiry-buckets of "buckets" backend. (the exp of each token is
+        estimated from its key's PTTL) -> returns number of moved tokens
+        NOTE: run it after switching to "buckets"; until then keep
+        `TOKEN_REVOCATION_LEGACY_FALLBACK=True` so old keys are checked too
+        NOTE: a key's TTL was set from "exp - now" in whole seconds -> the
+        real exp is within ~1s of the estimate; near a bucket's boundary
+        the jti is added to both buckets (a check looks in the bucket of
+        the real exp). keys without TTL (-1) aren't ours -> left as is
+        """
+        moved = 0
+        batch: list[str] = []
+
+        async def move_batch() -> int:
+            async with redis.pipeline(transaction=False) as pipe:
+                for key in batch:
+                    pipe.pttl(key)
+                pttls = await pipe.execute()
+            now = time.time()
+            count = 0
+            async with redis.pipeline(transaction=False) as pipe:
+                for key, pttl in zip(batch, pttls):
+                    if pttl <= 0:  # -2: expired meanwhile / -1: not ours
+                        continue
+                    jti = key.removeprefix(TokenRevocation.KEY_PREFIX)
+                    exp = now + pttl / 1000
+                    bucket_exps: dict[str, int] = {}  # bucket: an exp in it
+                    for delta in (-1.5, 0, 1.5):
+                        bucket_exp = int(exp + delta)
+                        bucket_key, _ = TokenRevocation._bucket(bucket_exp)
+                        bucket_exps.setdefault(bucket_key, bucket_exp)
+                    for bucket_exp in bucket_exps.values():
+                        TokenRevocation._queue_bucket_add(
+                            pipe, jti, bucket_exp
+                        )
+                    pipe.delete(key)
+                    count += 1
+                await pipe.execute()
+            batch.clear()
+            return count
+
+        pattern = f"{TokenRevocation.KEY_PREFIX}*"
+        async for key in redis.scan_iter(match=pattern, count=batch_size):
+            batch.append(key)
+            if len(batch) >= batch_size:
+                moved += await move_batch()
+        if batch:
+            moved += await move_batch()
+        return moved
+
+    # ----------------------------------------------------------------
+    # private methods:
+
+    @staticmethod
+    def _queue_blacklisting(
+        pipe: Pipeline, jti: str, exp: int, ttl: int, user_id: Any
+    ) -> None:
+        if settings.TOKEN_REVOCATION_BACKEND == "buckets":
+            TokenRevocation._queue_bucket_add(pipe, jti, exp)
+        else:
+            pipe.set(TokenRevocation._blacklist_key(jti), str(user_id), ex=ttl)
+
+    @staticmethod
+    def _queue_blacklisting_many(
+        pipe: Pipeline, payloads: list[dict]
+    ) -> list[dict]:
+        """
+        queue blacklisting (+ publishing) of non-expired tokens
+        -> returns payloads of queued ones
         """
-        exp_ts = payload.get("exp")
         now = int(time.time())
-        ttl = exp_ts - now
-        if ttl <= 0:
-            return  # nothing to do, token already expired
+        queued = []
+        for payload in payloads:
+            jti, exp_ts = payload.get("jti"), payload.get("exp")
+            ttl = exp_ts - now
+            if ttl <= 0:
+                continue  # nothing to do, token already expired
+            TokenRevocation._queue_blacklisting(
+                pipe, jti, exp_ts, ttl, payload.get("user_id")
+            )
+            if settings.TOKEN_BLACKLIST_LOCAL_MIRROR:
+                pipe.publish(blacklist_mirror.CHANNEL, f"{jti}:{exp_ts}")
+            queued.append(payload)
+        return queued
+
+    @staticmethod
+    def _apply_blacklisting_locally(
+        blacklisted: list[dict], pending: bool = False
+    ) -> None:
+        """
+        after blacklisting in Redis: update data of this worker
+        (`pending=True` -> couldn't be written to Redis; it's retried later)
+        """
+        for payload in blacklisted:
+            if settings.TOKEN_BLACKLIST_LOCAL_MIRROR:
+                blacklist_mirror.add(payload["jti"], payload["exp"])
+            verified_token_cache.discard_jti(payload["jti"])
+        recent_revocations.add(blacklisted, pending)
+
+    @staticmethod
+    def _queue_pending(pipe: Pipeline) -> list[dict]:
+        """ queue revocations which couldn't be written to Redis before """
+        pending = recent_revocations.pop_pending()
+        if pending:
+            TokenRevocation._queue_blacklisting_many(pipe, pending)
+            metrics.incr("recent_revocations.flushed", len(pending))
+        return pending
 
-        jti = payload.get("jti")
-        key = TokenRevocation._blacklist_key(jti)
-        value = payload.get("user_id")
-        await redis.set(key, str(value), ex=ttl)
+    @staticmethod
+    def _degrade(
+        err: RedisError, pending: Optional[list[dict]] = None
+    ) -> None:
+        """
+        Redis is unavailable -> re-raise `err` (in "fail" mode), or let
+        the caller answer by local data (in "local" mode)
+        """
+        recent_revocations.add(pending or [], pending=True)  # retry later
+        if settings.REDIS_DEGRADED_AUTH_MODE != "local":
+            raise err
+        metrics.incr("token_revocation.degraded")
+
+    @staticmethod
+    def _lookup_mirror(jti: str) -> Optional[bool]:
+        """ blacklisting statement from local mirror (None: ask Redis) """
+        if not settings.TOKEN_BLACKLIST_LOCAL_MIRROR:
+            return None
+        is_blacklisted = blacklist_mirror.lookup(jti)
+        metrics.incr(
+            "blacklist_mirror.redis_fallbacks" if is_blacklisted is None
+            else "blacklist_mirror.local_answers"
+        )
+        return is_blacklisted
+
+    @staticmethod
+    def _queue_bucket_add(pipe: Pipeline, jti: str, exp: int) -> None:
+        bucket_key, bucket_end = TokenRevocation._bucket(exp)
+        pipe.sadd(bucket_key, jti)
+        pipe.expireat(bucket_key, bucket_end)  # >= exp of all its members
+
+    @staticmethod
+    def _queue_blacklist_check(
+        pipe: Pipeline, jti: str, exp: Optional[int]
+    ) -> int:
+        """ queue the check command(s) -> returns number of queued ones """
+        if settings.TOKEN_REVOCATION_BACKEND != "buckets":
+            pipe.exists(TokenRevocation._blacklist_key(jti))
+            return 1
+        if exp is None:
+            raise ValueError("'exp' of token is needed to find its bucket")
+        pipe.sismember(TokenRevocation._bucket(exp)[0], jti)
+        if settings.TOKEN_REVOCATION_LEGACY_FALLBACK:
+            pipe.exists(TokenRevocation._blacklist_key(jti))
+            return 2
+        return 1
 
     @staticmethod
-    async def is_token_blacklisted(jti: str, redis: Redis) -> bool:
-        key = TokenRevocation._blacklist_key(jti)
-        return await redis.exists(key) == 1
+    def _bucket(exp: int) -> tuple[str, int]:
+        """ returns (key, end-timestamp) of the expiry-bucket of `exp` """
+        size = settings.TOKEN_REVOCATION_BUCKET_SECONDS
+        bucket_start = int(exp) - int(exp) % size
+        key = f"{TokenRevocation.BUCKET_KEY_PREFIX}{bucket_start}"
+        return key, bucket_start + size
 
     @staticmethod
     def _blacklist_key(jti: str) -> str:
@@ -0,0 +1,4 @@
+from .user import UserCache
+
+
+__all__ = ["UserCache"]
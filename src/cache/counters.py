@@ -0,0 +1,144 @@
+import time
+import uuid
+from typing import Optional
+
+from redis.asyncio import Redis
+
+from src.core.metrics import metrics
+
+
+class PostCounterBuffer:
+    """
+    write-behind buffer of counters of posts in Redis (shared by all
+    workers) -> hot posts don't lock-contend on their 'posts' rows
+
+    keys:
+        counters:pending        : hash {"<post_id>:<column>": delta} of
+                                  increments which aren't flushed yet
+        counters:pending-since  : time of the first pending increment (lag)
+        counters:batch:<id>     : a claimed batch (renamed pending-hash)
+        counters:batches        : set of claimed batch IDs (not applied or
+                                  not cleaned up yet)
+        counters:flush-lock     : one flusher at a time (all workers)
+
+    methods:
+        incr()          : add an increment (one round-trip)
+        claim_batch()   : pending-hash -> a new batch (atomic RENAME)
+        claimed_batches(): IDs of batches which are claimed and not done
+        read_batch()    : deltas of a batch -> {column: [(post_id, delta)]}
+        finish_batch()  : delete an applied batch
+        acquire_lock() / release_lock()
+        pending_size()  : number of pending (post, column) fields
+
+    NOTE: a batch is applied to database with its ID (`PostCrud.
+    apply_counter_deltas`) -> if a flusher crashes after the commit and
+    before `finish_batch()`, the batch is skipped on retry (not doubled)
+    """
+
+    PENDING_KEY = "counters:pending"
+    PENDING_SINCE_KEY = "counters:pending-since"
+    BATCH_KEY_PREFIX = "counters:batch:"
+    BATCHES_KEY = "counters:batches"
+    LOCK_KEY = "counters:flush-lock"
+
+    # KEYS: pending, pending-since, batch, batches | ARGV: batch_id
+    # -> pending-since (or false if there's nothing to claim)
+    _CLAIM_SCRIPT = """
+    if redis.call('EXISTS', KEYS[1]) == 0 then
+        return false
+    end
+    redis.call('RENAME', KEYS[1], KEYS[3])
+    redis.call('SADD', KEYS[4], ARGV[1])
+    local since = redis.call('GET', KEYS[2])
+    redis.call('DEL', KEYS[2])
+    return since or '0'
+    """
+    # KEYS: lock | ARGV: token
+    _RELEASE_SCRIPT = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """
+
+    @staticmethod
+    async def incr(
+        post_id: int, column: str, redis: Redis, amount: int = 1
+    ) -> None:
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.hincrby(
+                PostCounterBuffer.PENDING_KEY, f"{post_id}:{column}", amount
+            )
+            pipe.set(PostCounterBuffer.PENDING_SINCE_KEY, time.time(), nx=True)
+            await pipe.execute()
+        metrics.incr("counters.buffered")
+
+    @staticmethod
+    async def claim_batch(redis: Redis) -> Optional[tuple[str, float]]:
+        """ -> (batch_id, pending-since) or None if nothing is pending """
+        batch_id = uuid.uuid4().hex
+        since = await redis.eval(
+            PostCounterBuffer._CLAIM_SCRIPT,
+            4,
+            PostCounterBuffer.PENDING_KEY,
+            PostCounterBuffer.PENDING_SINCE_KEY,
+            PostCounterBuffer._batch_key(batch_id),
+            PostCounterBuffer.BATCHES_KEY,
+            batch_id,
+        )
+        if since is None:
+            return None
+        return batch_id, float(since)
+
+    @staticmethod
+    async def claimed_batches(redis: Redis) -> set[str]:
+        return await redis.smembers(PostCounterBuffer.BATCHES_KEY)
+
+    @staticmethod
+    async def read_batch(
+        batch_id: str, redis: Redis
+    ) -> dict[str, list[tuple[int, int]]]:
+        fields = await redis.hgetall(PostCounterBuffer._batch_key(batch_id))
+        deltas: dict[str, list[tuple[int, int]]] = {}
+        for field, delta in fields.items():
+            post_id, _, column = field.partition(":")
+            if int(delta):  # e.g. like + unlike -> 0
+                deltas.setdefault(column, []).append(
+                    (int(post_id), int(delta))
+                )
+        return deltas
+
+    @staticmethod
+    async def finish_batch(batch_id: str, redis: Redis) -> None:
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.delete(PostCounterBuffer._batch_key(batch_id))
+            pipe.srem(PostCounterBuffer.BATCHES_KEY, batch_id)
+            await pipe.execute()
+
+    @staticmethod
+    async def acquire_lock(redis: Redis, ttl_seconds: float) -> Optional[str]:
+        """ -> a token (to release the lock) or None if it's taken """
+        token = uuid.uuid4().hex
+        acquired = await redis.set(
+            PostCounterBuffer.LOCK_KEY, token, nx=True,
+            px=int(ttl_seconds * 1000)
+        )
+        return token if acquired else None
+
+    @staticmethod
+    async def release_lock(token: str, redis: Redis) -> None:
+        await redis.eval(
+            PostCounterBuffer._RELEASE_SCRIPT, 1,
+            PostCounterBuffer.LOCK_KEY, token
+        )
+
+    @staticmethod
+    async def pending_size(redis: Redis) -> int:
+        return await redis.hlen(PostCounterBuffer.PENDING_KEY)
+
+    # ----------------------------------------------------------------
+    # private methods:
+
+    @staticmethod
+    def _batch_key(batch_id: str) -> str:
+        return f"{PostCounterBuffer.BATCH_KEY_PREFIX}{batch_id}"
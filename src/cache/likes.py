@@ -0,0 +1,147 @@
+import uuid
+from typing import Iterable, Literal, Optional
+
+from redis.asyncio import Redis
+
+from src.core.config import settings
+from src.core.metrics import metrics
+
+
+class LikedPostsCache:
+    """
+    IDs of posts which are liked by a user (viewer-state of `liked_by_
+    viewer`) in Redis -> for a page of posts: one SMISMEMBER
+
+    keys:
+        liked:<user_id>       : set of liked post IDs (+ sentinel members)
+        liked-build:<user_id> : guard-token of a running build
+
+    methods:
+        lookup()       : which of the posts are liked -> set of IDs, or
+                         `MISSING` (not built) / `TOO_LARGE` (ask database)
+        start_build()  : a guard-token, before reading IDs from database
+        build()        : (re)build the set of a user from database's IDs
+                         (only if no like/unlike is applied since its
+                         `start_build()`)
+        add()          : a new like (only into a built set)
+        remove()       : an unlike
+        invalidate()   : delete the set (e.g. a failed `add()`/`remove()`)
+
+    NOTE: a built set always has the sentinel member "0" (so an empty set
+    exists too); users with more than `LIKED_POSTS_CACHE_MAX_SIZE` likes
+    get a set of only "-1" (`TOO_LARGE`) -> database is asked for them.
+    a like/unlike while a set is being built deletes the guard -> that
+    build isn't written (rebuilt on a next lookup). the TTL (`LIKED_POSTS_
+    CACHE_TTL_SECONDS`) is set once by `build()` (not extended by lookups)
+    -> a change which is missed anyway (e.g. a crash after commit) is
+    fixed when the set expires
+    """
+
+    KEY_PREFIX = "liked:"
+    BUILD_KEY_PREFIX = "liked-build:"
+    BUILD_GUARD_SECONDS = 60  # longer than a build
+    MISSING = "missing"
+    TOO_LARGE = "too-large"
+    _BUILT = "0"
+    _TOO_LARGE = "-1"
+
+    # KEYS: set, guard | ARGV: post_id
+    _ADD_SCRIPT = """
+    redis.call('DEL', KEYS[2])
+    if redis.call('SISMEMBER', KEYS[1], '0') == 1 then
+        return redis.call('SADD', KEYS[1], ARGV[1])
+    end
+    return 0
+    """
+    # KEYS: set, guard | ARGV: token, ttl, members... -> 1 if it's built
+    _BUILD_SCRIPT = """
+    if redis.call('GET', KEYS[2]) ~= ARGV[1] then
+        return 0
+    end
+    redis.call('DEL', KEYS[1], KEYS[2])
+    redis.call('SADD', KEYS[1], unpack(ARGV, 3))
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    return 1
+    """
+
+    @staticmethod
+    async def lookup(
+        user_id: int, post_ids: list[int], redis: Redis
+    ) -> set[int] | Literal["missing", "too-large"]:
+        is_built, is_too_large, *flags = await redis.smismember(
+            LikedPostsCache._key(user_id),
+            LikedPostsCache._BUILT, LikedPostsCache._TOO_LARGE, *post_ids
+        )
+        if is_too_large:
+            metrics.incr("liked_cache.too_large")
+            return LikedPostsCache.TOO_LARGE
+        if not is_built:
+            metrics.incr("liked_cache.misses")
+            return LikedPostsCache.MISSING
+        metrics.incr("liked_cache.hits")
+        return {post_id for post_id, flag in zip(post_ids, flags) if flag}
+
+    @staticmethod
+    async def start_build(user_id: int, redis: Redis) -> str:
+        token = uuid.uuid4().hex
+        await redis.set(
+            LikedPostsCache._build_key(user_id), token,
+            ex=LikedPostsCache.BUILD_GUARD_SECONDS
+        )
+        return token
+
+    @staticmethod
+    async def build(
+        user_id: int,
+        post_ids: Optional[Iterable[int]],
+        token: str,
+        redis: Redis
+    ) -> bool:
+        """
+        `post_ids`: all liked posts of the user (None -> too large), read
+        after `start_build()` -> False if a change raced it (not built)
+        """
+        if post_ids is None:
+            members = [LikedPostsCache._TOO_LARGE]
+        else:
+            members = [LikedPostsCache._BUILT, *post_ids]
+        is_built = await redis.eval(
+            LikedPostsCache._BUILD_SCRIPT, 2,
+            LikedPostsCache._key(user_id), LikedPostsCache._build_key(user_id),
+            token, settings.LIKED_POSTS_CACHE_TTL_SECONDS, *members
+        )
+        if not is_built:
+            metrics.incr("liked_cache.raced_builds")
+        return bool(is_built)
+
+    @staticmethod
+    async def add(user_id: int, post_id: int, redis: Redis) -> None:
+        await redis.eval(
+            LikedPostsCache._ADD_SCRIPT, 2,
+            LikedPostsCache._key(user_id), LikedPostsCache._build_key(user_id),
+            post_id
+        )
+
+    @staticmethod
+    async def remove(user_id: int, post_id: int, redis: Redis) -> None:
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.delete(LikedPostsCache._build_key(user_id))
+            pipe.srem(LikedPostsCache._key(user_id), post_id)
+            await pipe.execute()
+
+    @staticmethod
+    async def invalidate(user_id: int, redis: Redis) -> None:
+        await redis.delete(
+            LikedPostsCache._key(user_id), LikedPostsCache._build_key(user_id)
+        )
+
+    # ----------------------------------------------------------------
+    # private methods:
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"{LikedPostsCache.KEY_PREFIX}{user_id}"
+
+    @staticmethod
+    def _build_key(user_id: int) -> str:
+        return f"{LikedPostsCache.BUILD_KEY_PREFIX}{user_id}"
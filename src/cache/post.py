@@ -0,0 +1,138 @@
+import hashlib
+import logging
+from typing import Any, Optional
+
+import orjson
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.core.config import settings
+from src.core.metrics import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+class PostDetailCache:
+    """
+    read-through cache of the viewer-independent part of `PostDetailsOut`
+    (post, author's `UserOut`, tags, counters) of published posts
+
+    keys:
+        post-version:<id>       : version of a post (INCR on each change;
+                                  no TTL, only changed posts have it)
+        post:<id>:<version>     : orjson of an entry (`make_entry()`)
+
+    methods:
+        get()        : -> (version, entry or None) in one round-trip
+        set()        : cache an entry under the version read by `get()`
+        invalidate() : bump the version (after commit of a change)
+        make_entry() : entry of a post: json-compatible details + fields
+                       to check visibility + a hash of the details (ETag)
+        etag()       : strong ETag of a response (entry + viewer-state)
+
+    NOTE:
+    _ a reader which loaded a post before a change and caches it after
+      the change, writes it under the old version -> it's never read
+    _ counters (likes, views, comments) and author's username are cached
+      too -> they may lag up to `POST_CACHE_TTL_SECONDS`
+    _ Redis errors aren't raised (-> database), like `UserCache`
+    """
+
+    VERSION_KEY_PREFIX = "post-version:"
+    KEY_PREFIX = "post:"
+    VIEWER_FIELDS = {"liked_by_viewer", "saved_by_viewer"}
+
+    # KEYS: version | ARGV: prefix of entry keys -> [version, entry]
+    # NOTE: the entry's key is built in the script (its version is read
+    # there) -> one round-trip for both
+    _GET_SCRIPT = """
+    local version = redis.call('GET', KEYS[1]) or '0'
+    return {version, redis.call('GET', ARGV[1] .. version)}
+    """
+
+    @staticmethod
+    async def get(
+        pk: int, redis: Redis
+    ) -> tuple[Optional[str], Optional[dict[str, Any]]]:
+        if settings.POST_CACHE_TTL_SECONDS <= 0:
+            return None, None
+        try:
+            version, data = await redis.eval(
+                PostDetailCache._GET_SCRIPT, 1,
+                PostDetailCache._version_key(pk),
+                PostDetailCache._key_prefix(pk)
+            )
+        except RedisError as err:
+            PostDetailCache._log_error("get", err)
+            return None, None
+        if data is None:
+            metrics.incr("post_cache.misses")
+            return version, None
+        metrics.incr("post_cache.hits")
+        return version, orjson.loads(data)
+
+    @staticmethod
+    async def set(
+        pk: int, version: Optional[str], entry: dict[str, Any], redis: Redis
+    ) -> None:
+        if version is None:  # cache is disabled or unavailable
+            return
+        try:
+            await redis.set(
+                f"{PostDetailCache._key_prefix(pk)}{version}",
+                orjson.dumps(entry),
+                ex=settings.POST_CACHE_TTL_SECONDS
+            )
+        except RedisError as err:
+            PostDetailCache._log_error("set", err)
+
+    @staticmethod
+    async def invalidate(pk: int, redis: Redis) -> None:
+        key = PostDetailCache._version_key(pk)
+        try:
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.incr(key)
+                # never expires: a version which restarts from 0 would
+                # serve an old entry (e.g. before a change of `is_private`)
+                # if one is still alive under that number (PERSIST: keys
+                # which were written with a TTL before)
+                pipe.persist(key)
+                await pipe.execute()
+        except RedisError as err:
+            PostDetailCache._log_error("invalidate", err)
+
+    @staticmethod
+    def make_entry(
+        details: dict[str, Any], user_id: int, is_private: bool
+    ) -> dict[str, Any]:
+        """ `details`: json-compatible dump (without `VIEWER_FIELDS`) """
+        digest = hashlib.sha1(
+            orjson.dumps(details, option=orjson.OPT_SORT_KEYS)
+        ).hexdigest()
+        return {
+            "details": details,
+            "user_id": user_id,
+            "is_private": is_private,
+            "hash": digest,
+        }
+
+    @staticmethod
+    def etag(entry: dict[str, Any], is_liked: bool, is_saved: bool) -> str:
+        return f'"{entry["hash"][:20]}{int(is_liked)}{int(is_saved)}"'
+
+    # ----------------------------------------------------------------
+    # private methods:
+
+    @staticmethod
+    def _version_key(pk: int) -> str:
+        return f"{PostDetailCache.VERSION_KEY_PREFIX}{pk}"
+
+    @staticmethod
+    def _key_prefix(pk: int) -> str:
+        return f"{PostDetailCache.KEY_PREFIX}{pk}:"
+
+    @staticmethod
+    def _log_error(operation: str, err: RedisError) -> None:
+        metrics.incr("post_cache.redis_errors")
+        logger.warning("post-cache %s failed: %r", operation, err)
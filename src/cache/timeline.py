@@ -0,0 +1,193 @@
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from redis.asyncio import Redis
+
+from src.core.config import settings
+from src.core.metrics import metrics
+
+
+class Timeline:
+    """
+    home-timelines of users in Redis (fan-out on write)
+
+    keys:
+        timeline:<user_id>    : sorted-set of post IDs (score: published_at
+                                in microseconds), bounded by
+                                `TIMELINE_MAX_SIZE`
+        timeline-celebrities  : set of users whose posts aren't pushed
+                                (too many followers) -> pulled at read
+
+    methods:
+        push()                : push a post into timelines (only existing
+                                ones: inactive users' are rebuilt on read)
+        build()               : (re)build a timeline from given posts
+        add_posts()           : add posts to a timeline (follow backfill)
+        remove_posts()        : remove posts from a timeline (unfollow, or
+                                posts which aren't visible anymore)
+        read_page()           : a page of (post_id, score), newest first
+        set_celebrity()       : add/remove a user to/from celebrities
+        is_celebrity()        : whether a user is in celebrities
+        get_celebrities()     : IDs of all celebrities
+        score() / published_at() : published_at <-> score (exact)
+
+    NOTE: a built timeline always has a sentinel member ("0", score +inf)
+    -> an empty timeline is still "built" (the key exists). it's never
+    trimmed (highest score) and it's skipped by `read_page()`
+    """
+
+    KEY_PREFIX = "timeline:"
+    CELEBRITIES_KEY = "timeline-celebrities"
+    _SENTINEL = "0"
+    _EPOCH = datetime(1970, 1, 1)  # naive, like `Post.published_at`
+
+    # KEYS: timelines | ARGV: score, post_id, max_size, ttl
+    _PUSH_SCRIPT = """
+    local pushed = 0
+    for _, key in ipairs(KEYS) do
+        if redis.call('EXISTS', key) == 1 then
+            redis.call('ZADD', key, ARGV[1], ARGV[2])
+            redis.call('ZREMRANGEBYRANK', key, 0, -(tonumber(ARGV[3]) + 2))
+            redis.call('EXPIRE', key, ARGV[4])
+            pushed = pushed + 1
+        end
+    end
+    return pushed
+    """
+
+    @staticmethod
+    async def push(
+        user_ids: list[int], post_id: int, published_at: datetime,
+        redis: Redis
+    ) -> int:
+        """ one round-trip per call (a batch of followers); -> pushed """
+        if not user_ids:
+            return 0
+        pushed = await redis.eval(
+            Timeline._PUSH_SCRIPT,
+            len(user_ids),
+            *(Timeline._key(user_id) for user_id in user_ids),
+            Timeline.score(published_at),
+            post_id,
+            settings.TIMELINE_MAX_SIZE,
+            settings.TIMELINE_TTL_SECONDS,
+        )
+        metrics.incr("timeline.pushes", pushed)
+        return pushed
+
+    @staticmethod
+    async def build(
+        user_id: int, posts: Iterable[tuple[int, datetime]], redis: Redis
+    ) -> None:
+        key = Timeline._key(user_id)
+        mapping = {
+            str(post_id): Timeline.score(published_at)
+            for post_id, published_at in posts
+        }
+        mapping[Timeline._SENTINEL] = float("inf")
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            pipe.zadd(key, mapping)
+            pipe.zremrangebyrank(key, 0, -(settings.TIMELINE_MAX_SIZE + 2))
+            pipe.expire(key, settings.TIMELINE_TTL_SECONDS)
+            await pipe.execute()
+        metrics.incr("timeline.builds")
+
+    @staticmethod
+    async def add_posts(
+        user_id: int, posts: Iterable[tuple[int, datetime]], redis: Redis
+    ) -> None:
+        mapping = {
+            str(post_id): Timeline.score(published_at)
+            for post_id, published_at in posts
+        }
+        if not mapping:
+            return
+        key = Timeline._key(user_id)
+        # only into a built timeline (else it's built from db on next read)
+        if not await redis.exists(key):
+            return
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.zadd(key, mapping)
+            pipe.zremrangebyrank(key, 0, -(settings.TIMELINE_MAX_SIZE + 2))
+            await pipe.execute()
+
+    @staticmethod
+    async def remove_posts(
+        user_id: int, post_ids: Iterable[int], redis: Redis
+    ) -> None:
+        members = [str(post_id) for post_id in post_ids]
+        if members:
+            await redis.zrem(Timeline._key(user_id), *members)
+
+    @staticmethod
+    async def read_page(
+        user_id: int,
+        limit: int,
+        before: Optional[tuple[int, int]],
+        redis: Redis
+    ) -> Optional[list[tuple[int, int]]]:
+        """
+        up to `limit` (post_id, score) after the `before` position (score,
+        post_id), newest first -> None if the timeline isn't built
+        NOTE: posts with the same score (same microsecond) are ordered by
+        ID here (not by Redis) -> the bound is inclusive and a few more are
+        fetched to skip the ones which are already seen
+        """
+        key = Timeline._key(user_id)
+        max_score = "+inf" if before is None else before[0]
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.exists(key)
+            pipe.zrevrangebyscore(
+                key, max_score, "-inf", start=0, num=limit + 1 + 8,
+                withscores=True
+            )
+            pipe.expire(key, settings.TIMELINE_TTL_SECONDS)
+            exists, entries, _ = await pipe.execute()
+        if not exists:
+            return None
+        page = [
+            (int(member), int(score))
+            for member, score in entries
+            if member != Timeline._SENTINEL
+        ]
+        if before is not None:
+            page = [
+                (post_id, score) for post_id, score in page
+                if (score, post_id) < before
+            ]
+        page.sort(key=lambda item: (item[1], item[0]), reverse=True)
+        return page[:limit]
+
+    @staticmethod
+    async def set_celebrity(
+        user_id: int, is_celebrity: bool, redis: Redis
+    ) -> None:
+        if is_celebrity:
+            await redis.sadd(Timeline.CELEBRITIES_KEY, user_id)
+        else:
+            await redis.srem(Timeline.CELEBRITIES_KEY, user_id)
+
+    @staticmethod
+    async def is_celebrity(user_id: int, redis: Redis) -> bool:
+        return bool(await redis.sismember(Timeline.CELEBRITIES_KEY, user_id))
+
+    @staticmethod
+    async def get_celebrities(redis: Redis) -> set[int]:
+        members = await redis.smembers(Timeline.CELEBRITIES_KEY)
+        return {int(member) for member in members}
+
+    @staticmethod
+    def score(published_at: datetime) -> int:
+        return (published_at - Timeline._EPOCH) // timedelta(microseconds=1)
+
+    @staticmethod
+    def published_at(score: int) -> datetime:
+        return Timeline._EPOCH + timedelta(microseconds=score)
+
+    # ----------------------------------------------------------------
+    # private methods:
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"{Timeline.KEY_PREFIX}{user_id}"
@@ -0,0 +1,168 @@
+import time
+import logging
+from datetime import datetime
+from typing import Any, Optional
+
+import orjson
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy.orm import make_transient_to_detached
+
+from src.core.config import settings
+from src.core.metrics import metrics
+from src.models import User
+
+
+logger = logging.getLogger(__name__)
+
+
+class UserCache:
+    """
+    cache (compact) snapshots of User-objects to avoid querying database
+    for the current-user on every authenticated request.
+
+    layers:
+        L1 : per-worker dict (optional: `USER_CACHE_L1_TTL_SECONDS` > 0)
+        L2 : Redis, versioned like `PostDetailCache`:
+             user-version:<id>     : version of a user (INCR on each change;
+                                     no TTL)
+             user:<id>:<version>   : orjson array of `FIELDS`
+
+    methods:
+        get()        : -> (version, *detached* User-obj or None) in one
+                       round-trip -> attach the user to a session via
+                       `db.merge(load=False)`
+        set()        : cache snapshot of a User-obj under the version read
+                       by `get()` (before it's loaded from database)
+        invalidate() : bump the version of a user (after each change)
+
+    NOTE:
+    _ a request which loaded a user before a change and caches it after
+      the change's `invalidate()`, writes it under the old version -> it's
+      never read (no stale `is_active`/`is_superuser`)
+    _ 'password' isn't cached; it's lazy-loaded if it's needed
+      (`await user.awaitable_attrs.password`)
+    _ L1 is filled by reads of Redis only; L1 of other workers isn't
+      invalidated -> keep its TTL short
+    _ Redis errors aren't raised: `get()` returns (None, None) (-> database)
+      and failed writes are only logged (a missed invalidation is fixed by
+      TTL)
+    """
+
+    VERSION_KEY_PREFIX = "user-version:"
+    KEY_PREFIX = "user:"
+    FIELDS = (
+        "ID", "username", "email",
+        "is_active", "is_superuser", "created_at", "updated_at"
+    )
+    _DATETIME_FIELDS = {"created_at", "updated_at"}
+
+    _l1: dict[int, tuple[list[Any], float]] = {}  # id: (snapshot, expire)
+
+    # KEYS: version | ARGV: prefix of snapshot keys -> [version, snapshot]
+    _GET_SCRIPT = """
+    local version = redis.call('GET', KEYS[1]) or '0'
+    return {version, redis.call('GET', ARGV[1] .. version)}
+    """
+
+    @staticmethod
+    async def get(
+        user_id: int, redis: Redis
+    ) -> tuple[Optional[str], Optional[User]]:
+        if settings.USER_CACHE_TTL_SECONDS <= 0:
+            return None, None
+        started_at = time.perf_counter()
+        version = None
+        snapshot = UserCache._get_from_l1(user_id)
+        if snapshot is not None:
+            metrics.incr("user_cache.l1_hits")
+        else:
+            try:
+                version, data = await redis.eval(
+                    UserCache._GET_SCRIPT, 1,
+                    UserCache._version_key(user_id),
+                    UserCache._key_prefix(user_id)
+                )
+            except RedisError as err:
+                UserCache._log_error("get", err)
+                return None, None
+            if data is None:
+                metrics.incr("user_cache.misses")
+                return version, None
+            snapshot = orjson.loads(data)
+            UserCache._set_in_l1(user_id, snapshot)
+            metrics.incr("user_cache.hits")
+
+        metrics.observe(
+            "user_cache.get_latency_ms",
+            (time.perf_counter() - started_at) * 1000
+        )
+        return version, UserCache._build_user(snapshot)
+
+    @staticmethod
+    async def set(user: User, version: Optional[str], redis: Redis) -> None:
+        if version is None:  # cache is disabled or unavailable
+            return
+        snapshot = [getattr(user, field) for field in UserCache.FIELDS]
+        try:
+            await redis.set(
+                f"{UserCache._key_prefix(user.ID)}{version}",
+                orjson.dumps(snapshot),
+                ex=settings.USER_CACHE_TTL_SECONDS
+            )
+        except RedisError as err:
+            UserCache._log_error("set", err)
+
+    @staticmethod
+    async def invalidate(user_id: int, redis: Redis) -> None:
+        UserCache._l1.pop(user_id, None)
+        try:
+            await redis.incr(UserCache._version_key(user_id))
+        except RedisError as err:
+            UserCache._log_error("invalidate", err)
+
+    # ----------------------------------------------------------------
+    # private methods:
+
+    @staticmethod
+    def _version_key(user_id: int) -> str:
+        return f"{UserCache.VERSION_KEY_PREFIX}{user_id}"
+
+    @staticmethod
+    def _key_prefix(user_id: int) -> str:
+        return f"{UserCache.KEY_PREFIX}{user_id}:"
+
+    @staticmethod
+    def _log_error(operation: str, err: RedisError) -> None:
+        metrics.incr("user_cache.redis_errors")
+        logger.warning("user-cache %s failed: %r", operation, err)
+
+    @staticmethod
+    def _build_user(snapshot: list[Any]) -> User:
+        data = dict(zip(UserCache.FIELDS, snapshot))
+        for field in UserCache._DATETIME_FIELDS:
+            if data[field] is not None:
+                data[field] = datetime.fromisoformat(data[field])
+        user = User(**data)
+        make_transient_to_detached(user)  # as if it's loaded from database
+        return user
+
+    @staticmethod
+    def _get_from_l1(user_id: int) -> list[Any] | None:
+        cached = UserCache._l1.get(user_id)
+        if cached is None:
+            return None
+        snapshot, expires_at = cached
+        if time.monotonic() >= expires_at:
+            del UserCache._l1[user_id]
+            return None
+        return snapshot
+
+    @staticmethod
+    def _set_in_l1(user_id: int, snapshot: list[Any]) -> None:
+        ttl = settings.USER_CACHE_L1_TTL_SECONDS
+        if ttl <= 0:
+            return
+        if len(UserCache._l1) >= settings.USER_CACHE_L1_MAX_SIZE:
+            UserCache._l1.clear()  # simple bound; it's refilled from Redis
+        UserCache._l1[user_id] = (snapshot, time.monotonic() + ttl)
@@ -1,21 +1,138 @@
 """ basic settings of the database """
 
+from typing import Optional
+from uuid import uuid4
+
+from sqlalchemy.pool import NullPool
 from sqlalchemy.ext.asyncio import (
-    create_async_engine, async_sessionmaker, AsyncSession
+    create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
 )
 
 from .config import settings
+from .db_pool import instrumented_pool_class, instrument_pool
+from .query_stats import instrument_queries
+from .slow_query_log import register_engine
 
 
-engine = create_async_engine(
-    url=str(settings.SQLALCHEMY_DB_URL),
-    echo=True,
-    future=True,
-)
+def _create_engine(
+    url: str, metrics_prefix: str, pgbouncer_mode: Optional[bool] = None
+) -> AsyncEngine:
+    """ create an (instrumented) engine with configured pool & driver """
+    if pgbouncer_mode is None:
+        pgbouncer_mode = settings.DB_PGBOUNCER_MODE
+    _engine = create_async_engine(
+        url=url,
+        echo=settings.DB_ECHO,
+        future=True,
+        **_pool_options(metrics_prefix, pgbouncer_mode),
+    )
+    instrument_pool(_engine.sync_engine, metrics_prefix)
+    instrument_queries(_engine.sync_engine)
+    register_engine(_engine)
+    return _engine
+
+
+def _pool_options(metrics_prefix: str, pgbouncer_mode: bool) -> dict:
+    """
+    pool & driver options of an engine:
+    _ default : a pool of connections per worker + prepared-statement caches
+    _ PgBouncer (transaction pooling) mode : pooling is done by PgBouncer
+      -> `NullPool` (a connection per checkout, given back at its end) and
+      no prepared-statement caches (a statement prepared in a transaction
+      may not exist on the server-connection of the next one) and unique
+      names for prepared statements (no name collisions on a shared
+      server-connection)
+    """
+    connect_args = {
+        # asyncpg's own cache and SQLAlchemy's cache (of asyncpg dialect)
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "command_timeout": settings.DB_COMMAND_TIMEOUT,
+        "timeout": settings.DB_CONNECT_TIMEOUT,
+        "server_settings": {
+            "application_name": settings.DB_APPLICATION_NAME
+        },
+    }
+    if pgbouncer_mode:
+        connect_args.update({
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": _unique_statement_name,
+        })
+        return {"poolclass": NullPool, "connect_args": connect_args}
+    return {
+        "poolclass": instrumented_pool_class(metrics_prefix),
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "connect_args": connect_args,
+    }
+
+
+def _unique_statement_name() -> str:
+    return f"__asyncpg_{uuid4().hex}__"
+
+
+def _create_sessionmaker(bind: AsyncEngine) -> async_sessionmaker:
+    return async_sessionmaker(
+        bind=bind,
+        expire_on_commit=False,
+        class_=AsyncSession,
+        autoflush=False
+    )
+
+
+engine = _create_engine(str(settings.SQLALCHEMY_DB_URL), "db_pool")
+
+AsyncSessionLocal = _create_sessionmaker(engine)
+
+
+class ReplicaRouter:
+    """
+    choose a read-replica for read-only sessions (`deps.get_read_db`),
+    by smooth weighted round-robin (e.g. weights [5, 1, 1] -> a a b a c a a)
+    -> returns the primary's sessionmaker if there isn't any replica
+
+    methods:
+        choose()  : sessionmaker of the next replica
+        dispose() : close connections of all replicas (app's shutdown)
+    """
+
+    def __init__(self, urls: list[str], weights: list[int]):
+        if weights and len(weights) != len(urls):
+            raise ValueError(
+                "DB_REPLICA_WEIGHTS must have one weight per replica url"
+            )
+        self.engines = [
+            _create_engine(url, f"db_pool.replica{i}")
+            for i, url in enumerate(urls)
+        ]
+        self._sessionmakers = [
+            _create_sessionmaker(replica) for replica in self.engines
+        ]
+        self._weights = weights or [1] * len(urls)
+        self._current = [0] * len(urls)
+
+    def choose(self) -> async_sessionmaker:
+        if not self._sessionmakers:
+            return AsyncSessionLocal
+        total = 0
+        best = 0
+        for i, weight in enumerate(self._weights):
+            self._current[i] += weight
+            total += weight
+            if self._current[i] > self._current[best]:
+                best = i
+        self._current[best] -= total
+        return self._sessionmakers[best]
+
+    async def dispose(self) -> None:
+        for replica in self.engines:
+            await replica.dispose()
+
 
-AsyncSessionLocal = async_sessionmaker(
-    bind=engine,
-    expire_on_commit=False,
-    class_=AsyncSession,
-    autoflush=False
+replica_router = ReplicaRouter(
+    settings.DB_REPLICA_URLS, settings.DB_REPLICA_WEIGHTS
 )
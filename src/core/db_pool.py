@@ -0,0 +1,100 @@
+"""
+telemetry of the database connection-pool (per worker process)
+
+exported to the metrics registry (`GET /admin/metrics`):
+    _ db_pool.checkout_wait_ms       : time spent waiting for a connection
+    _ db_pool.checkout_timeouts      : checkouts failed by `DB_POOL_TIMEOUT`
+    _ db_pool.checked_out            : connections in use (gauge)
+    _ db_pool.saturation             : in use / (pool_size + max_overflow)
+    _ db_pool.connection_age_seconds : age of connections at checkout
+    _ db_pool.connects / invalidations : lifecycle counters
+-> to size `DB_POOL_SIZE` & `DB_MAX_OVERFLOW` of workers by real numbers
+(metrics of read-replicas' pools are prefixed by "db_pool.replica<N>")
+NOTE: in PgBouncer mode (`NullPool`) only `connects`/`invalidations` are
+recorded (every checkout opens a connection to PgBouncer)
+"""
+
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import (
+    AsyncAdaptedQueuePool, ConnectionPoolEntry, NullPool
+)
+
+from .config import settings
+from .metrics import metrics
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool which measures how long each checkout waits for
+    a connection (there isn't any pool event for it)
+    (use `instrumented_pool_class` to get one with a metrics-prefix)
+    NOTE: `_do_get` is the (internal) method of QueuePool which waits for
+    a free connection (or creates a new one)
+    """
+
+    metrics_prefix = "db_pool"
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        started_at = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            metrics.incr(f"{self.metrics_prefix}.checkout_timeouts")
+            raise
+        finally:
+            metrics.observe(
+                f"{self.metrics_prefix}.checkout_wait_ms",
+                (time.perf_counter() - started_at) * 1000
+            )
+
+
+def instrumented_pool_class(prefix: str) -> type[InstrumentedAsyncPool]:
+    """ pool-class (`poolclass` of engine) with its own metrics-prefix """
+    return type(
+        "InstrumentedAsyncPool", (InstrumentedAsyncPool,),
+        {"metrics_prefix": prefix}
+    )
+
+
+def instrument_pool(engine: Engine, prefix: str = "db_pool") -> None:
+    """ register pool-events of `engine` (sync engine of an AsyncEngine) """
+    pool = engine.pool
+    capacity = settings.DB_POOL_SIZE + max(settings.DB_MAX_OVERFLOW, 0)
+
+    def record_usage() -> None:
+        if isinstance(pool, NullPool):  # PgBouncer mode (no local pool)
+            return
+        checked_out = pool.checkedout()
+        metrics.set_gauge(f"{prefix}.checked_out", checked_out)
+        metrics.set_gauge(
+            f"{prefix}.saturation", round(checked_out / capacity, 3)
+        )
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record) -> None:
+        connection_record.info["connected_at"] = time.monotonic()
+        metrics.incr(f"{prefix}.connects")
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(
+        dbapi_connection, connection_record, connection_proxy
+    ) -> None:
+        connected_at = connection_record.info.get("connected_at")
+        if connected_at is not None:
+            metrics.observe(
+                f"{prefix}.connection_age_seconds",
+                time.monotonic() - connected_at
+            )
+        record_usage()
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record) -> None:
+        record_usage()
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception) -> None:
+        metrics.incr(f"{prefix}.invalidations")
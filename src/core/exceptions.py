@@ -9,6 +9,7 @@ class CustomException(Exception):
     """
 
     status: HTTPStatus
+    headers: Optional[dict[str, str]] = None  # extra headers of response
 
     def __init__(self, message: Optional[str] = None):
         if message:
@@ -54,7 +55,30 @@ class DuplicateValueException(CustomException):
         super().__init__(message)
 
 
+class TooManyRequestsException(CustomException):
+    """
+    custom exception for rate-limited operations (e.g. too many login
+    attempts) -> `Retry-After` header tells the client when to try again
+    """
+
+    status = HTTPStatus.TOO_MANY_REQUESTS  # 429
+
+    def __init__(self, retry_after: int, message: Optional[str] = None):
+        self.retry_after = retry_after
+        self.headers = {"Retry-After": str(retry_after)}
+        super().__init__(message)
+
+
 class InternalServerError(CustomException):
     """ custom exception for unpredicted server errors and problems """
 
     status = HTTPStatus.INTERNAL_SERVER_ERROR  # 500
+
+
+class ServiceUnavailableException(CustomException):
+    """
+    custom exception for temporary overloads of the server (e.g. too many
+    queued password-hashing operations) -> client can try again later
+    """
+
+    status = HTTPStatus.SERVICE_UNAVAILABLE  # 503
@@ -0,0 +1,73 @@
+"""
+in-process metrics registry (per worker process)
+
+a very small registry to collect counters, gauges and timing samples
+of hot-paths (token-cache, redis, db-pool, etc.) without any external
+dependency. admins can read a snapshot of it via `GET /admin/metrics`.
+"""
+
+import os
+import threading
+from typing import Any
+
+
+class Metrics:
+    """
+    collect metrics of the current worker
+
+    methods:
+        incr()      : increment a counter (e.g. cache hits)
+        set_gauge() : set a gauge to its current value (e.g. pool size)
+        observe()   : record a sample (e.g. a latency in milliseconds) ->
+                      keeps count/sum/max of samples (enough for avg & max)
+        snapshot()  : returns a copy of all recorded metrics
+
+    NOTE: values are kept per process. so with N workers there are N
+    separate registries (each request to `/admin/metrics` shows one worker)
+    """
+
+    def __init__(self):
+        # NOTE: some samples are recorded from threads (e.g. pool events)
+        self._lock = threading.Lock()
+        self._counters: dict[str, int] = {}
+        self._gauges: dict[str, float] = {}
+        self._samples: dict[str, list[float]] = {}  # name: [count, sum, max]
+
+    def incr(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            sample = self._samples.get(name)
+            if sample is None:
+                self._samples[name] = [1, value, value]
+                return
+            sample[0] += 1
+            sample[1] += value
+            if value > sample[2]:
+                sample[2] = value
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            samples = {
+                name: {
+                    "count": int(count),
+                    "avg": round(total / count, 3) if count else 0.0,
+                    "max": round(max_, 3),
+                }
+                for name, (count, total, max_) in self._samples.items()
+            }
+            return {
+                "pid": os.getpid(),
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "samples": samples,
+            }
+
+
+metrics = Metrics()
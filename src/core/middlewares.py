@@ -0,0 +1,138 @@
+""" ASGI middlewares of the app """
+
+import logging
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
+from .metrics import metrics
+from .query_stats import QueryStats, current_query_stats
+
+logger = logging.getLogger(__name__)
+
+
+class ReadYourWritesMiddleware:
+    """
+    read-your-writes guard for read-replica routing (`deps.get_read_db`):
+    after a successful write request (POST/PUT/PATCH/DELETE with status
+    < 400) of an authenticated user, a short-lived Redis key (`KEY_PREFIX`
+    <user_id>, `READ_YOUR_WRITES_SECONDS`) is set, and reads of that user
+    go to the primary until it expires -> the user sees its own writes
+    even if replicas are lagging behind (any client: no cookie needed).
+
+    methods:
+        mark()                 : pin reads of a user to the primary
+        is_pinned_to_primary() : whether reads of a user must go to the
+                                 primary
+    NOTE:
+    _ the user is taken from the request's state (`request.state.user_id`
+      is set by `deps.get_current_user_payload`)
+    _ the key is set before the response starts -> it's visible to the
+      next request of the user
+    _ Redis errors aren't raised: no marker -> replica (like no write)
+    """
+
+    KEY_PREFIX = "read-primary:"
+    WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in self.WRITE_METHODS
+            or settings.READ_YOUR_WRITES_SECONDS <= 0
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_marker(message: Message) -> None:
+            if (
+                message["type"] == "http.response.start"
+                and message["status"] < 400
+            ):
+                user_id = scope.get("state", {}).get("user_id")
+                if user_id is not None:
+                    await self.mark(user_id, scope["app"].state.redis)
+            await send(message)
+
+        await self.app(scope, receive, send_with_marker)
+
+    @staticmethod
+    async def mark(user_id: int, redis: Redis) -> None:
+        try:
+            await redis.set(
+                f"{ReadYourWritesMiddleware.KEY_PREFIX}{user_id}", 1,
+                ex=settings.READ_YOUR_WRITES_SECONDS
+            )
+        except RedisError as err:
+            metrics.incr("read_your_writes.redis_errors")
+            logger.warning("read-your-writes marker isn't set: %r", err)
+
+    @staticmethod
+    async def is_pinned_to_primary(user_id: int, redis: Redis) -> bool:
+        try:
+            return bool(await redis.exists(
+                f"{ReadYourWritesMiddleware.KEY_PREFIX}{user_id}"
+            ))
+        except RedisError as err:
+            metrics.incr("read_your_writes.redis_errors")
+            logger.warning("read-your-writes marker isn't read: %r", err)
+            return False
+
+
+class QueryStatsMiddleware:
+    """
+    collects SQL statistics of each request (`core/query_stats.py`):
+        _ `Server-Timing` header: db time & number of queries (up to the
+          start of the response; `SERVER_TIMING_HEADER`)
+        _ a log line per request (whole request, streamed bodies too)
+        _ N+1 warnings (dev mode: `SQL_N_PLUS_ONE_DETECTION`)
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not settings.SQL_STATS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(settings.SQL_N_PLUS_ONE_DETECTION)
+        token = current_query_stats.set(stats)
+
+        async def send_with_timing(message: Message) -> None:
+            if (
+                message["type"] == "http.response.start"
+                and settings.SERVER_TIMING_HEADER
+            ):
+                MutableHeaders(scope=message).append(
+                    "server-timing", stats.server_timing()
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_query_stats.reset(token)
+            self._report(scope, stats)
+
+    @staticmethod
+    def _report(scope: Scope, stats: QueryStats) -> None:
+        metrics.observe("db.queries_per_request", stats.count)
+        metrics.observe("db.time_per_request_ms", stats.total_ms)
+        if stats.count:
+            logger.info(
+                "%s %s -> %s", scope["method"], scope["path"], stats.summary()
+            )
+        for statement, repeats, stack in stats.n_plus_one_hits():
+            metrics.incr("db.n_plus_one_suspects")
+            logger.warning(
+                "possible N+1 in %s %s: statement repeated %d times "
+                "(called by: %s): %s",
+                scope["method"], scope["path"], repeats, stack, statement
+            )
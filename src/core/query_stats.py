@@ -0,0 +1,159 @@
+"""
+per-request SQL instrumentation
+
+engine events (`instrument_queries`) record every statement into the
+`QueryStats` of the current request (a contextvar, set by
+`QueryStatsMiddleware`): number of queries, total db time and the slowest
+statement -> logged at the end of each request and sent in the
+`Server-Timing` header (e.g. `db;dur=12.4;desc="5 queries"`)
+
+N+1 detector (dev mode: `SQL_N_PLUS_ONE_DETECTION=True`): statements are
+normalized (parameters & IN-lists removed) and if one of them is repeated
+`SQL_N_PLUS_ONE_THRESHOLD` times in a request, the stack of its caller
+(crud -> service -> route frames) is reported with the request's log
+
+(statements are passed to the slow-query log too: `core/slow_query_log`)
+"""
+
+import os
+import re
+import sys
+import time
+import logging
+import traceback
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from greenlet import getcurrent
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import settings
+from .metrics import metrics
+from .slow_query_log import record_statement
+
+logger = logging.getLogger(__name__)
+
+_SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_CORE_DIR = os.path.join(_SRC_DIR, "core")
+
+
+class QueryStats:
+    """
+    SQL statistics of one request
+
+    methods:
+        record()          : add an executed statement (by engine events)
+        server_timing()   : value of `Server-Timing` header
+        summary()         : one-line summary for logs
+        n_plus_one_hits() : repeated statements & stacks of their callers
+    """
+
+    def __init__(self, detect_n_plus_one: bool = False):
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.detect_n_plus_one = detect_n_plus_one
+        self._repeats: Counter[str] = Counter()
+        self._callers: dict[str, str] = {}  # normalized statement: stack
+
+    def record(self, statement: str, duration_ms: float) -> None:
+        self.count += 1
+        self.total_ms += duration_ms
+        if duration_ms > self.slowest_ms:
+            self.slowest_ms = duration_ms
+            self.slowest_statement = statement
+        if self.detect_n_plus_one:
+            key = normalize_statement(statement)
+            self._repeats[key] += 1
+            threshold = settings.SQL_N_PLUS_ONE_THRESHOLD
+            if self._repeats[key] == threshold:
+                self._callers[key] = caller_stack()
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.total_ms:.1f};desc="{self.count} queries"'
+
+    def summary(self) -> str:
+        text = f"{self.count} queries, {self.total_ms:.1f} ms db"
+        if self.slowest_statement is not None:
+            statement = " ".join(self.slowest_statement.split())[:200]
+            text += f", slowest {self.slowest_ms:.1f} ms: {statement}"
+        return text
+
+    def n_plus_one_hits(self) -> list[tuple[str, int, str]]:
+        """ [(normalized statement, repeats, caller stack), ...] """
+        return [
+            (key, self._repeats[key], stack)
+            for key, stack in self._callers.items()
+        ]
+
+
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    "current_query_stats", default=None
+)
+
+_PLACEHOLDERS = re.compile(r"\$\d+|%\(\w+\)s|\?")
+_IN_LISTS = re.compile(r"\bIN\s*\([^()]*\)", re.IGNORECASE)
+_NUMBERS = re.compile(r"\b\d+\b")
+
+
+def normalize_statement(statement: str) -> str:
+    """ statements which differ only in parameters -> same string """
+    statement = _PLACEHOLDERS.sub("?", statement)
+    statement = _IN_LISTS.sub("IN (...)", statement)
+    statement = _NUMBERS.sub("N", statement)
+    return " ".join(statement.split())
+
+
+def caller_stack(limit: int = 6) -> str:
+    """
+    app's frames (crud -> service -> route) which led to the statement.
+    NOTE: engine events of the async engine run in a greenlet (spawned by
+    SQLAlchemy for each awaited call) -> frames of the awaiting coroutines
+    are in the stack of its parent greenlet
+    """
+    parent = getcurrent().parent
+    frame = getattr(parent, "gr_frame", None) or sys._getframe(1)
+    frames = [
+        f"{os.path.relpath(f.filename, os.path.dirname(_SRC_DIR))}:"
+        f"{f.lineno} in {f.name}"
+        for f in traceback.extract_stack(frame)
+        if f.filename.startswith(_SRC_DIR)
+        and not f.filename.startswith(_CORE_DIR)
+    ]
+    return " <- ".join(reversed(frames[-limit:])) or "<unknown caller>"
+
+
+def instrument_queries(engine: Engine) -> None:
+    """ register statement-timing events of `engine` (sync engine) """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ) -> None:
+        conn.info.setdefault("query_started_at", []).append(
+            time.perf_counter()
+        )
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ) -> None:
+        started_at = conn.info["query_started_at"].pop()
+        duration_ms = (time.perf_counter() - started_at) * 1000
+        metrics.observe("db.query_ms", duration_ms)
+        record_statement(
+            conn.engine, statement, parameters, executemany, duration_ms
+        )
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.record(statement, duration_ms)
+
+    @event.listens_for(engine, "handle_error")
+    def on_error(exception_context) -> None:
+        # failed statements don't reach "after_cursor_execute"
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started_at"):
+            conn.info["query_started_at"].pop()
@@ -1,31 +1,201 @@
+import time
+import asyncio
+import logging
+from typing import Any, Optional
+
 from redis.asyncio import Redis, ConnectionPool
+from redis.asyncio.client import Pipeline
+from redis.asyncio.retry import Retry
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import ConnectionError, TimeoutError
 
 from .config import settings
+from .metrics import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+class RedisUnavailableError(ConnectionError):
+    """
+    raised (without touching the network) while the circuit-breaker is
+    open. it's a `redis.exceptions.ConnectionError`, so every fallback for
+    Redis errors (`except RedisError`) handles it too
+    """
+
+
+class RedisCircuitBreaker:
+    """
+    circuit-breaker of the Redis client of this worker:
+    _ closed : calls go to Redis; `REDIS_BREAKER_FAILURE_THRESHOLD`
+               consecutive connection/timeout errors -> open
+    _ open   : calls fail immediately (RedisUnavailableError) instead of
+               waiting for timeouts; a background task pings Redis every
+               `REDIS_BREAKER_RESET_SECONDS` and closes the breaker once
+               Redis answers again (background reconnect)
+
+    methods:
+        before_call()    : raise if the breaker is open
+        record_success() : reset consecutive failures
+        record_failure() : count a failure (and open the breaker)
+        trip()           : open the breaker (e.g. Redis is down at startup)
+        stop()           : cancel the reconnect task (shutdown)
+
+    NOTE: state is exposed in metrics: "redis.breaker_open" (gauge 0/1),
+    "redis.breaker_trips", "redis.breaker_rejected", "redis.failures"
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        metrics.set_gauge("redis.breaker_open", 0)
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def before_call(self) -> None:
+        if self._opened_at is not None:
+            metrics.incr("redis.breaker_rejected")
+            raise RedisUnavailableError("Redis circuit-breaker is open")
+
+    def record_success(self) -> None:
+        self._failures = 0
+
+    def record_failure(self) -> None:
+        metrics.incr("redis.failures")
+        self._failures += 1
+        if self._failures >= self.failure_threshold:
+            self.trip()
+
+    def trip(self) -> None:
+        if self._opened_at is not None:
+            return
+        self._opened_at = time.monotonic()
+        metrics.incr("redis.breaker_trips")
+        metrics.set_gauge("redis.breaker_open", 1)
+        logger.warning("Redis circuit-breaker opened")
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def stop(self) -> None:
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            try:
+                await self._reconnect_task
+            except asyncio.CancelledError:
+                pass
+            self._reconnect_task = None
+
+    # ----------------------------------------------------------------
+    # private methods:
+
+    def _close(self) -> None:
+        metrics.observe(
+            "redis.breaker_open_seconds", time.monotonic() - self._opened_at
+        )
+        self._opened_at = None
+        self._failures = 0
+        metrics.set_gauge("redis.breaker_open", 0)
+        logger.warning("Redis circuit-breaker closed (Redis is back)")
+
+    async def _reconnect(self) -> None:
+        while self._opened_at is not None:
+            await asyncio.sleep(self.reset_seconds)
+            try:
+                await ping_redis()
+            except Exception as err:
+                logger.warning("Redis is still unavailable: %r", err)
+            else:
+                self._close()
+
+
+redis_breaker = RedisCircuitBreaker(
+    failure_threshold=settings.REDIS_BREAKER_FAILURE_THRESHOLD,
+    reset_seconds=settings.REDIS_BREAKER_RESET_SECONDS
+)
+
+
+class ResilientPipeline(Pipeline):
+    """ pipeline which passes its (single) round-trip through the breaker """
+
+    async def execute(self, raise_on_error: bool = True) -> list[Any]:
+        if not self.command_stack:
+            return []
+        redis_breaker.before_call()
+        try:
+            result = await super().execute(raise_on_error)
+        except (ConnectionError, TimeoutError):
+            redis_breaker.record_failure()
+            raise
+        redis_breaker.record_success()
+        return result
+
+
+class ResilientRedis(Redis):
+    """
+    Redis client with `redis_breaker` in front of every command/pipeline
+    (+ timeouts & retries of the connection-pool: `redis_connection_poll`)
+    NOTE: pub/sub connections (BlacklistMirror) handle their own errors
+    """
+
+    async def execute_command(self, *args, **options) -> Any:
+        redis_breaker.before_call()
+        try:
+            result = await super().execute_command(*args, **options)
+        except (ConnectionError, TimeoutError):
+            redis_breaker.record_failure()
+            raise
+        redis_breaker.record_success()
+        return result
+
+    def pipeline(
+        self, transaction: bool = True, shard_hint: Any = None
+    ) -> ResilientPipeline:
+        return ResilientPipeline(
+            self.connection_pool, self.response_callbacks,
+            transaction, shard_hint
+        )
 
 
 redis_connection_poll = ConnectionPool.from_url(
     settings.REDIS_URL,
     max_connections=settings.MAX_CONNECTIONS_PER_PROCESS,
     decode_responses=True,
-    socket_connect_timeout=settings.TCP_CONNECTION_ESTABLISHMENT_TIMEOUT
+    socket_connect_timeout=settings.TCP_CONNECTION_ESTABLISHMENT_TIMEOUT,
+    socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+    retry=Retry(ExponentialBackoff(cap=0.1, base=0.01),
+                settings.REDIS_RETRIES),
+    retry_on_timeout=True,
+    health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL
 )
 
 
 async def init_redis() -> Redis:
-    """ Create a single Redis client (used in app's Startup) """
+    """
+    Create a single Redis client (used in app's Startup)
+    NOTE: if Redis is unavailable at startup, the app still starts (in
+    degraded mode) and the breaker reconnects to Redis in background
+    """
+    _redis = ResilientRedis(connection_pool=redis_connection_poll)
     try:
-        _redis = Redis(connection_pool=redis_connection_poll)
-        await _redis.ping()
-    except Exception as e:
-        print(e)  # ToDo: handle here later
-        await _redis.close()
-        _redis = None
-        raise  # a custom connection failed exception
-
+        await ping_redis()
+    except (ConnectionError, TimeoutError) as err:
+        logger.error("Redis is unavailable at startup: %r", err)
+        redis_breaker.trip()
     return _redis
 
 
+async def ping_redis() -> bool:
+    """ ping Redis without the breaker (startup & reconnect probes) """
+    return await Redis(connection_pool=redis_connection_poll).ping()
+
+
 async def close_redis(redis: Redis) -> None:
     """close redis-client and redis-connection-poll (used in app's shutdown)"""
+    await redis_breaker.stop()
     await redis.close()
     await redis_connection_poll.disconnect()
@@ -1,16 +1,26 @@
 """
 security utils:
     - JWTBearer
+    - PasswordHashingExecutor
     - PasswordHandler
 
 (each one explained in its docstring)
 """
 
+import time
+import asyncio
+from concurrent.futures import (
+    Executor, ThreadPoolExecutor, ProcessPoolExecutor
+)
+from typing import Callable, Any, Optional
+
 from fastapi import Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from passlib.context import CryptContext
 
-from .exceptions import UnauthenticatedException
+from .config import settings
+from .metrics import metrics
+from .exceptions import UnauthenticatedException, ServiceUnavailableException
 
 
 class JWTBearer(HTTPBearer):
@@ -34,6 +44,93 @@ class JWTBearer(HTTPBearer):
         return credentials
 
 
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def _timed_call(
+    func: Callable[..., Any], queued_at: float, *args
+) -> tuple[Any, float, float]:
+    """ runs in executor -> returns (result, queue_wait, latency) """
+    started_at = time.time()
+    result = func(*args)
+    return result, started_at - queued_at, time.time() - started_at
+
+
+class PasswordHashingExecutor:
+    """
+    run bcrypt operations (CPU-bound, tens of milliseconds) in a bounded
+    thread/process pool instead of blocking the event-loop of the worker.
+
+    - at most `PASSWORD_HASHING_MAX_WORKERS` operations run concurrently
+    - at most `PASSWORD_HASHING_MAX_QUEUE` operations wait for a free worker
+      -> more requests are rejected immediately (503) instead of piling up
+    - queue-wait and hashing latency (ms) are recorded in `metrics`
+
+    NOTE: bcrypt releases the GIL, so a thread-pool (default) hashes in
+    parallel too. a process-pool can be chosen by `PASSWORD_HASHING_EXECUTOR`
+    """
+
+    def __init__(self, kind: str, max_workers: int, max_queue: int):
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor: Optional[Executor] = None
+        self._in_flight = 0  # running + queued (changed only in event-loop)
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        if self._in_flight >= self.max_workers + self.max_queue:
+            metrics.incr("password_hashing.rejected")
+            raise ServiceUnavailableException(
+                "Server is busy right now. please try again later."
+            )
+
+        self._in_flight += 1
+        metrics.set_gauge("password_hashing.in_flight", self._in_flight)
+        try:
+            loop = asyncio.get_running_loop()
+            result, queue_wait, latency = await loop.run_in_executor(
+                self._get_executor(), _timed_call, func, time.time(), *args
+            )
+        finally:
+            self._in_flight -= 1
+            metrics.set_gauge("password_hashing.in_flight", self._in_flight)
+
+        metrics.observe("password_hashing.queue_wait_ms", queue_wait * 1000)
+        metrics.observe("password_hashing.latency_ms", latency * 1000)
+        return result
+
+    def shutdown(self) -> None:
+        """ is used in app's shutdown """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    self.max_workers, thread_name_prefix="password-hashing"
+                )
+        return self._executor
+
+
+password_hashing_executor = PasswordHashingExecutor(
+    kind=settings.PASSWORD_HASHING_EXECUTOR,
+    max_workers=settings.PASSWORD_HASHING_MAX_WORKERS,
+    max_queue=settings.PASSWORD_HASHING_MAX_QUEUE
+)
+
+
 class PasswordHandler:
     """
     enables saving hashed-passwords in database instead of plain-passwords
@@ -44,19 +141,23 @@ class PasswordHandler:
     - verify_password() :
         takes a plain-password and a hashed-password and checks
         whether the password verifies against the hash
+
+    NOTE: both methods are awaitable; hashing runs in
+    `password_hashing_executor` (doesn't block the event-loop)
     """
 
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    pwd_context = pwd_context
 
     @staticmethod
-    def hash_password(password: str) -> str:
-        return PasswordHandler.pwd_context.hash(password)
+    async def hash_password(password: str) -> str:
+        return await password_hashing_executor.run(_hash_password, password)
 
     @staticmethod
-    def verify_password(plain_password: str, hashed_password: str) -> bool:
-        return PasswordHandler.pwd_context.verify(
-            plain_password,
-            hashed_password
+    async def verify_password(
+        plain_password: str, hashed_password: str
+    ) -> bool:
+        return await password_hashing_executor.run(
+            _verify_password, plain_password, hashed_password
         )
 
 
@@ -0,0 +1,192 @@
+"""
+slow-query log with automatic EXPLAIN capture
+
+every CRUD operation (`handle_unexpected_db_error` of `crud/utils.py`) is
+timed by its operation name (`OperationTrace`), and its slowest statement
+is recorded by the engine events of `core/query_stats.py`. if an operation
+takes more than `SLOW_QUERY_THRESHOLD_MS`:
+    _ it's logged (name, duration, queries, slowest statement)
+    _ a sample (`SLOW_QUERY_EXPLAIN_SAMPLE_RATE`) of them is EXPLAINed in
+      the background (`EXPLAIN (ANALYZE, BUFFERS)` of the slowest
+      statement, on its own engine) and the plan is logged too
+all in a rotating log file (`SLOW_QUERY_LOG_PATH`) -> regressions can be
+found in production without attaching a profiler.
+
+NOTE: safety of EXPLAIN ANALYZE (it *executes* the statement):
+    _ only SELECT statements are analyzed (others: plain EXPLAIN)
+    _ in a READ ONLY transaction with a `statement_timeout`, rolled back
+    _ parameters are used to execute, but never written to the log
+    _ at most one EXPLAIN per worker at a time, and one per statement in
+      `SLOW_QUERY_EXPLAIN_COOLDOWN_SECONDS`
+"""
+
+import os
+import time
+import random
+import asyncio
+import logging
+from contextvars import Context, ContextVar
+from logging.handlers import RotatingFileHandler
+from typing import Any, Optional
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .config import settings
+from .metrics import metrics
+
+logger = logging.getLogger("slow_queries")
+
+_engines: dict[int, AsyncEngine] = {}  # id(sync engine): async engine
+_explained_at: dict[str, float] = {}  # statement: last EXPLAIN (monotonic)
+_background_tasks: set[asyncio.Task] = set()
+
+
+class OperationTrace:
+    """
+    timing of one CRUD operation (used as a context-manager by
+    `handle_unexpected_db_error`); statements executed inside it are
+    recorded by `record_statement()`
+    """
+
+    def __init__(self, operation_name: str):
+        self.operation_name = operation_name
+        self.count = 0
+        self.slowest_ms = 0.0
+        self.slowest: Optional[tuple[AsyncEngine, str, Any]] = None
+        self._started_at = 0.0
+        self._token = None
+
+    def __enter__(self) -> "OperationTrace":
+        self._started_at = time.perf_counter()
+        self._token = current_operation.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        current_operation.reset(self._token)
+        elapsed_ms = (time.perf_counter() - self._started_at) * 1000
+        if 0 < settings.SLOW_QUERY_THRESHOLD_MS <= elapsed_ms:
+            _report_slow_operation(self, elapsed_ms)
+
+    def record(
+        self, engine: Engine, statement: str, parameters: Any,
+        duration_ms: float
+    ) -> None:
+        self.count += 1
+        if duration_ms > self.slowest_ms and id(engine) in _engines:
+            self.slowest_ms = duration_ms
+            self.slowest = (_engines[id(engine)], statement, parameters)
+
+
+current_operation: ContextVar[Optional[OperationTrace]] = ContextVar(
+    "current_operation", default=None
+)
+
+
+def register_engine(engine: AsyncEngine) -> None:
+    """ engines whose statements can be EXPLAINed (`_create_engine`) """
+    _engines[id(engine.sync_engine)] = engine
+
+
+def record_statement(
+    engine: Engine, statement: str, parameters: Any, executemany: bool,
+    duration_ms: float
+) -> None:
+    """ called by "after_cursor_execute" event (`core/query_stats.py`) """
+    trace = current_operation.get()
+    if trace is not None and not executemany:
+        trace.record(engine, statement, parameters, duration_ms)
+
+
+def _report_slow_operation(trace: OperationTrace, elapsed_ms: float) -> None:
+    _setup_log_file()
+    metrics.incr("db.slow_operations")
+    statement = None
+    if trace.slowest is not None:
+        statement = " ".join(trace.slowest[1].split())
+    logger.warning(
+        "slow operation %r: %.1f ms (%d queries, slowest %.1f ms): %s",
+        trace.operation_name, elapsed_ms, trace.count, trace.slowest_ms,
+        statement
+    )
+    if trace.slowest is None or not _should_explain(statement):
+        return
+    try:
+        # NOTE: an empty context -> its statements aren't counted in the
+        # stats of the request (`current_query_stats`)
+        task = asyncio.get_running_loop().create_task(
+            _explain(trace.operation_name, *trace.slowest),
+            context=Context()
+        )
+    except RuntimeError:  # no running loop (e.g. sync scripts)
+        return
+    _background_tasks.add(task)  # keep a reference until it's done
+    task.add_done_callback(_background_tasks.discard)
+
+
+def _should_explain(statement: str) -> bool:
+    if _background_tasks:  # one EXPLAIN at a time (per worker)
+        metrics.incr("db.slow_explains_skipped")
+        return False
+    if random.random() >= settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE:
+        return False
+    now = time.monotonic()
+    last = _explained_at.get(statement)
+    if last is not None and now - last < (
+        settings.SLOW_QUERY_EXPLAIN_COOLDOWN_SECONDS
+    ):
+        return False
+    if len(_explained_at) >= 1000:
+        _explained_at.clear()
+    _explained_at[statement] = now
+    return True
+
+
+async def _explain(
+    operation_name: str, engine: AsyncEngine, statement: str,
+    parameters: Any
+) -> None:
+    analyze = statement.lstrip().upper().startswith("SELECT")
+    options = "ANALYZE, BUFFERS" if analyze else "VERBOSE"
+    try:
+        async with engine.connect() as conn:
+            # a transaction is begun automatically (and rolled back at end)
+            await conn.exec_driver_sql("SET TRANSACTION READ ONLY")
+            await conn.exec_driver_sql(
+                f"SET LOCAL statement_timeout = "
+                f"{int(settings.SLOW_QUERY_EXPLAIN_TIMEOUT_MS)}"
+            )
+            result = await conn.exec_driver_sql(
+                f"EXPLAIN ({options}) {statement}", tuple(parameters or ())
+            )
+            plan = "\n".join(row[0] for row in result)
+            await conn.rollback()
+    except Exception as err:  # never fails a request (background task)
+        metrics.incr("db.slow_explains_failed")
+        logger.warning("EXPLAIN of %r failed: %r", operation_name, err)
+        return
+    metrics.incr("db.slow_explains")
+    logger.warning(
+        "plan of %r (EXPLAIN %s):\n%s\n%s",
+        operation_name, options, " ".join(statement.split()), plan
+    )
+
+
+def _setup_log_file() -> None:
+    """ rotating file-handler of the slow-query log (once, lazily) """
+    if logger.handlers or not settings.SLOW_QUERY_LOG_PATH:
+        return
+    directory = os.path.dirname(settings.SLOW_QUERY_LOG_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    handler = RotatingFileHandler(
+        settings.SLOW_QUERY_LOG_PATH,
+        maxBytes=settings.SLOW_QUERY_LOG_MAX_BYTES,
+        backupCount=settings.SLOW_QUERY_LOG_BACKUP_COUNT,
+        encoding="utf-8",
+    )
+    handler.setFormatter(
+        logging.Formatter("%(asctime)s %(process)d %(message)s")
+    )
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
@@ -1,7 +1,8 @@
 from .user import UserCrud, FollowCrud
 from .profile import ProfileCrud, LinkCrud
-from .post import PostCrud, TagCrud, PostTagAssociation
+from .post import PostCrud, PostLikeCrud, TagCrud, PostTagAssociation
 from .comment import CommentCrud
+from .utils import UnitOfWork
 
 
 __all__ = [
@@ -10,7 +11,9 @@ __all__ = [
     "ProfileCrud",
     "LinkCrud",
     "PostCrud",
+    "PostLikeCrud",
     "TagCrud",
     "PostTagAssociation",
     "CommentCrud",
+    "UnitOfWork",
 ]
@@ -1,7 +1,7 @@
 from __future__ import annotations
 from typing import TYPE_CHECKING, Optional, Literal
 
-from sqlalchemy import insert, update, delete, and_
+from sqlalchemy import select, insert, update, delete, and_
 from sqlalchemy.exc import IntegrityError
 
 from src.models import Comment, CommentStatus
@@ -9,9 +9,11 @@ from src.core.exceptions import (
     NotFoundException, InternalServerError, BadRequestException
 )
 
-from .utils import handle_unexpected_db_error
+from .utils import handle_unexpected_db_error, UnitOfWork
+from .post import PostCrud
 
 if TYPE_CHECKING:
+    from sqlalchemy import Select
     from sqlalchemy.ext.asyncio import AsyncSession
 
 
@@ -26,8 +28,12 @@ class CommentCrud:
                 **data, user_id=user_id
             ).returning(Comment)
             result = await db.execute(query)
-            await db.commit()
             comment: Comment = result.scalar()
+            if comment.post_parent_id is not None:
+                await PostCrud.update_counters(
+                    comment.post_parent_id, db, comment_count=1
+                )
+            await UnitOfWork.save(db)
             return comment
         except IntegrityError as err:
             if 'constraint "fk_comments_reply_comments"' in str(err.orig):
@@ -52,7 +58,7 @@ class CommentCrud:
             Comment.status == CommentStatus.PB
         )).values(**data).returning(Comment)
         result = await db.execute(query)
-        await db.commit()
+        await UnitOfWork.save(db)
         comment: Optional[Comment] = result.scalars().one_or_none()
         return comment
 
@@ -93,17 +99,48 @@ class CommentCrud:
 
         query = update(Comment).where(
             and_clause
-        ).values(**data).returning(Comment.status)
-        result = await db.execute(query)
-        await db.commit()
-        status: Optional[CommentStatus] = result.scalar_one_or_none()
-        return status
+        ).values(**data).returning(Comment.status, Comment.post_parent_id)
+        row = (await db.execute(query)).one_or_none()
+        if row is None:
+            return None
+        if row.post_parent_id is not None:  # published <-> not published
+            delta = 1 if row.status == CommentStatus.PB else -1
+            await PostCrud.update_counters(
+                row.post_parent_id, db, comment_count=delta
+            )
+        await UnitOfWork.save(db)
+        return row.status
 
     @staticmethod  # NOTE: only "admin" access here
     @handle_unexpected_db_error("delete comment")
     async def delete(pk: int, db: AsyncSession) -> None:
-        query = delete(Comment).where(Comment.ID == pk).returning(Comment.ID)
-        result = await db.execute(query)
-        await db.commit()
-        if result.scalar_one_or_none() is None:
+        query = delete(Comment).where(Comment.ID == pk).returning(
+            Comment.status, Comment.post_parent_id
+        )
+        row = (await db.execute(query)).one_or_none()
+        if row is None:
             raise NotFoundException(f"Comment(ID={pk}) is not found!")
+        if row.post_parent_id is not None and row.status == CommentStatus.PB:
+            await PostCrud.update_counters(
+                row.post_parent_id, db, comment_count=-1
+            )
+        await UnitOfWork.save(db)
+
+    @staticmethod  # NOTE: only "admin" access here
+    def export_query(status: Optional[CommentStatus] = None) -> Select:
+        """
+        all comments (by `status`, if given) in order of creation ->
+        streamed (`utils/streaming.py`), not fetched here
+        """
+        query = select(
+            Comment.ID,
+            Comment.user_id,
+            Comment.post_parent_id,
+            Comment.comment_parent_id,
+            Comment.status,
+            Comment.content,
+            Comment.created_at,
+        )
+        if status is not None:
+            query = query.where(Comment.status == status)
+        return query.order_by(Comment.ID)
@@ -1,31 +1,49 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING, Optional, Literal
-from datetime import datetime
+from typing import TYPE_CHECKING, Iterable, Optional, Literal
+from datetime import datetime, timedelta
 
-from sqlalchemy import select, insert, update, delete, and_
+from sqlalchemy import (
+    select, insert, update, delete, and_, or_, values, column, literal,
+    BigInteger, func
+)
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 
-from src.models import Post, PostStatus, Tag, posts_tags
+from src.models import (
+    Post, PostStatus, Tag, User, List, posts_tags, post_likes, saved_posts,
+    counter_batches, counter_deltas
+)
 from src.core.exceptions import NotFoundException, InternalServerError
+from src.cache.post import PostDetailCache
+from src.utils.pagination import apply_keyset
 
-from .utils import handle_unexpected_db_error
+from .utils import handle_unexpected_db_error, UnitOfWork
 
 
 if TYPE_CHECKING:
+    from sqlalchemy import Row, Select, Update
     from sqlalchemy.ext.asyncio import AsyncSession
+    from redis.asyncio import Redis
 
-    from src.schemas.post import PostUpdateStatus
+    from src.schemas.post import PostUpdateStatus, LikeUnlikePost
 
 
 class PostCrud:
-    """ CRUD operations for Post model """
+    """
+    CRUD operations for Post model
+    NOTE: changes of a (published) post (`update`, `update_privacy`,
+    `update_status`, `delete`) invalidate its cached details too (check
+    `PostDetailCache`), after commit
+    """
+
+    COUNTER_COLUMNS = frozenset({"like_count", "comment_count", "view_count"})
 
     @staticmethod
     @handle_unexpected_db_error("create post")
     async def create(user_id: int, data: dict, db: AsyncSession) -> Post:
         query = insert(Post).values(**data, user_id=user_id).returning(Post)
         result = await db.execute(query)
-        await db.commit()
+        await UnitOfWork.save(db)
         return result.scalar()
 
     @staticmethod
@@ -41,14 +59,14 @@ class PostCrud:
             Post.status == PostStatus.DR  # avoid repetitive publish-requests!
         )).values(status=PostStatus.PB, published_at=now_).returning(Post)
         result = await db.execute(query)
-        await db.commit()
+        await UnitOfWork.save(db)
         post: Optional[Post] = result.scalars().one_or_none()
         return post
 
     @staticmethod
     @handle_unexpected_db_error("update post")
     async def update(
-        user_id: int, pk: int, data: dict, db: AsyncSession
+        user_id: int, pk: int, data: dict, db: AsyncSession, redis: Redis
     ) -> Post | None:
         query = update(Post).where(and_(
             Post.ID == pk,
@@ -56,14 +74,18 @@ class PostCrud:
             Post.status.in_({PostStatus.PB, PostStatus.DR})
         )).values(**data).returning(Post)
         result = await db.execute(query)
-        await db.commit()
+        await UnitOfWork.save(db)
         post: Optional[Post] = result.scalars().one_or_none()
+        if post is not None:
+            await UnitOfWork.after_commit(
+                db, lambda: PostDetailCache.invalidate(pk, redis)
+            )
         return post
 
     @staticmethod
     @handle_unexpected_db_error("update post's privacy")
     async def update_privacy(
-        user_id: int, pk: int, data: dict, db: AsyncSession
+        user_id: int, pk: int, data: dict, db: AsyncSession, redis: Redis
     ) -> bool | None:
         query = update(Post).where(and_(
             Post.ID == pk,
@@ -71,8 +93,12 @@ class PostCrud:
             Post.status.in_({PostStatus.PB, PostStatus.DR})
         )).values(**data).returning(Post.is_private)
         result = await db.execute(query)
-        await db.commit()
+        await UnitOfWork.save(db)
         privacy_statement: Optional[bool] = result.scalar_one_or_none()
+        if privacy_statement is not None:
+            await UnitOfWork.after_commit(
+                db, lambda: PostDetailCache.invalidate(pk, redis)
+            )
         return privacy_statement
 
     @staticmethod
@@ -81,6 +107,7 @@ class PostCrud:
         pk: int,
         data: PostUpdateStatus,
         db: AsyncSession,
+        redis: Redis,
         operation_is_requested_by: Literal["admin", "author"],
         user_id: Optional[int] = None
     ) -> PostStatus | None:
@@ -105,18 +132,25 @@ class PostCrud:
             and_clause
         ).values(**data.model_dump()).returning(Post.status)
         result = await db.execute(query)
-        await db.commit()
+        await UnitOfWork.save(db)
         status: Optional[PostStatus] = result.scalar_one_or_none()
+        if status is not None:
+            await UnitOfWork.after_commit(
+                db, lambda: PostDetailCache.invalidate(pk, redis)
+            )
         return status
 
     @staticmethod  # NOTE: only "admin" access here
     @handle_unexpected_db_error("delete post")
-    async def delete(pk: int, db: AsyncSession) -> None:
+    async def delete(pk: int, db: AsyncSession, redis: Redis) -> None:
         query = delete(Post).where(Post.ID == pk).returning(Post.ID)
         result = await db.execute(query)
-        await db.commit()
+        await UnitOfWork.save(db)
         if result.scalar_one_or_none() is None:
             raise NotFoundException(f"Post(ID={pk}) is not found!")
+        await UnitOfWork.after_commit(
+            db, lambda: PostDetailCache.invalidate(pk, redis)
+        )
 
     @staticmethod
     @handle_unexpected_db_error("get post by 'id'")
@@ -126,6 +160,315 @@ class PostCrud:
             raise NotFoundException(f"Post(ID={pk}) is not found!")
         return post
 
+    @staticmethod
+    async def update_counters(
+        pk: int, db: AsyncSession, **deltas: int
+    ) -> None:
+        """
+        add deltas to counters of a post (in the caller's transaction ->
+        the counter and its rows are committed/rolled back together)
+        `deltas`: {<one of COUNTER_COLUMNS>: delta} (e.g. like_count=1)
+        NOTE: called inside other CRUD operations (no error handler here)
+        """
+        query = PostCrud._counters_query(pk, deltas)
+        if query is not None:
+            await db.execute(query)
+
+    @staticmethod
+    def _counters_query(pk: int, deltas: dict[str, int]) -> Optional[Update]:
+        """
+        -> None if all deltas are 0
+        NOTE: counters aren't changes of the post -> `updated_at` is kept
+        (set to itself: no `onupdate` of the mixin)
+        """
+        values = {"updated_at": Post.updated_at}
+        for column_name, delta in deltas.items():
+            if column_name not in PostCrud.COUNTER_COLUMNS:
+                raise ValueError(f"{column_name!r} isn't a counter of posts")
+            if delta:
+                values[column_name] = getattr(Post, column_name) + delta
+        if len(values) == 1:
+            return None
+        return update(Post).where(Post.ID == pk).values(values)
+
+    @staticmethod
+    @handle_unexpected_db_error("apply a batch of counters")
+    async def apply_counter_deltas(
+        batch_id: str,
+        deltas: dict[str, list[tuple[int, int]]],
+        db: AsyncSession,
+        chunk_size: int = 1000
+    ) -> bool:
+        """
+        apply a batch of write-behind counters (`PostCounterBuffer`) ->
+        one `UPDATE posts ... FROM (VALUES (ID, delta), ...)` per column
+        (and per `chunk_size` posts), all in one transaction with the
+        batch's ID -> False if the batch is applied before (a retry)
+        NOTE: values are rendered inline (ints only): typed columns of a
+        VALUES list can't be inferred from bind parameters
+        """
+        query = pg_insert(counter_batches).values(batch_id=batch_id)
+        query = query.on_conflict_do_nothing().returning(
+            counter_batches.c.batch_id
+        )
+        if (await db.execute(query)).scalar_one_or_none() is None:
+            return False
+        await PostCrud._apply_deltas(deltas, db, chunk_size)
+        await UnitOfWork.save(db)
+        return True
+
+    @staticmethod
+    @handle_unexpected_db_error("add a counter delta")
+    async def add_counter_delta(
+        post_id: int, column_name: str, delta: int, db: AsyncSession
+    ) -> None:
+        """
+        a durable write-behind counter (e.g. a like) -> a row of the
+        'counter_deltas' outbox, in the transaction of its change
+        """
+        await db.execute(insert(counter_deltas).values(
+            post_id=post_id, counter=column_name, delta=delta
+        ))
+        await UnitOfWork.save(db)
+
+    @staticmethod
+    @handle_unexpected_db_error("apply outbox of counters")
+    async def apply_outbox_deltas(
+        db: AsyncSession, limit: int = 1000
+    ) -> int:
+        """
+        drain (up to `limit` rows of) the 'counter_deltas' outbox ->
+        its rows are deleted and their (summed) deltas are applied in one
+        transaction (exactly-once) -> number of drained rows
+        NOTE: SKIP LOCKED -> concurrent drains don't wait or double-apply
+        """
+        claimed = select(counter_deltas.c.ID).order_by(
+            counter_deltas.c.ID
+        ).limit(limit).with_for_update(skip_locked=True)
+        query = delete(counter_deltas).where(
+            counter_deltas.c.ID.in_(claimed)
+        ).returning(
+            counter_deltas.c.post_id,
+            counter_deltas.c.counter,
+            counter_deltas.c.delta
+        )
+        drained = (await db.execute(query)).all()
+        totals: dict[str, dict[int, int]] = {}
+        for post_id, column_name, delta in drained:
+            per_post = totals.setdefault(column_name, {})
+            per_post[post_id] = per_post.get(post_id, 0) + delta
+        deltas = {
+            column_name: [(pk, d) for pk, d in per_post.items() if d]
+            for column_name, per_post in totals.items()
+        }
+        await PostCrud._apply_deltas(deltas, db, limit)
+        await UnitOfWork.save(db)
+        return len(drained)
+
+    @staticmethod
+    async def _apply_deltas(
+        deltas: dict[str, list[tuple[int, int]]],
+        db: AsyncSession,
+        chunk_size: int
+    ) -> None:
+        for column_name, rows in deltas.items():
+            for i in range(0, len(rows), chunk_size):
+                await db.execute(PostCrud._counter_deltas_query(
+                    column_name, rows[i:i + chunk_size]
+                ))
+
+    @staticmethod
+    def _counter_deltas_query(
+        column_name: str, rows: list[tuple[int, int]]
+    ) -> Update:
+        """
+        UPDATE posts SET <column> = <column> + deltas.delta
+        FROM (VALUES (ID, delta), ...) AS deltas WHERE ...
+        NOTE: `updated_at` is set to itself -> no `onupdate` of the mixin
+        (views/likes aren't changes of the post, and its cached details
+        & ETag must not change on each flush)
+        """
+        data = values(
+            column("post_id", BigInteger),
+            column("delta", BigInteger),
+            name="deltas",
+            literal_binds=True
+        ).data(rows)
+        return update(Post).where(Post.ID == data.c.post_id).values({
+            column_name: getattr(Post, column_name) + data.c.delta,
+            "updated_at": Post.updated_at,
+        })
+
+    @staticmethod
+    @handle_unexpected_db_error("purge applied counter batches")
+    async def purge_counter_batches(
+        older_than: timedelta, db: AsyncSession
+    ) -> None:
+        """ IDs of old batches aren't needed (no retry after that long) """
+        await db.execute(delete(counter_batches).where(
+            counter_batches.c.applied_at < func.now() - older_than
+        ))
+        await UnitOfWork.save(db)
+
+    @staticmethod
+    @handle_unexpected_db_error("retrieve viewer's saved posts")
+    async def saved_among(
+        post_ids: Iterable[int], viewer_id: int, db: AsyncSession
+    ) -> set[int]:
+        """ (batched) which of `post_ids` are in (any) lists of the viewer """
+        post_ids = list(post_ids)
+        if not post_ids:
+            return set()
+        query = select(saved_posts.c.post_id).join(
+            List, List.ID == saved_posts.c.list_id
+        ).where(
+            List.user_id == viewer_id,
+            saved_posts.c.post_id.in_(post_ids)
+        ).distinct()
+        return set((await db.execute(query)).scalars().all())
+
+    @staticmethod
+    @handle_unexpected_db_error("get published post with its author")
+    async def get_published_with_author(
+        pk: int, db: AsyncSession
+    ) -> Optional[tuple[Post, User]]:
+        """ a published post and its author (one query) -> or None """
+        query = select(Post, User).join(User, Post.user_id == User.ID).where(
+            Post.ID == pk, Post.status == PostStatus.PB
+        )
+        row = (await db.execute(query)).one_or_none()
+        return None if row is None else (row[0], row[1])
+
+    @staticmethod
+    @handle_unexpected_db_error("retrieve published posts of users")
+    async def retrieve_published_ids(
+        author_ids: Iterable[int] | Select,
+        viewer_id: int,
+        db: AsyncSession,
+        limit: int,
+        before: Optional[tuple[datetime, int]] = None
+    ) -> list[tuple[int, datetime]]:  # [(ID, published_at), ...]
+        """
+        a page (`limit` rows) of published posts of `author_ids` (IDs or a
+        subquery of IDs) which are visible to the viewer, newest first
+        -> uses index (user_id, published_at) of 'posts'
+        """
+        query = select(Post.ID, Post.published_at).where(
+            Post.user_id.in_(author_ids),
+            Post.status == PostStatus.PB,
+            or_(Post.is_private.is_(False), Post.user_id == viewer_id)
+        )
+        query = apply_keyset(
+            query, (Post.published_at, Post.ID), before, limit
+        )
+        rows = (await db.execute(query)).all()
+        return rows
+
+    @staticmethod
+    @handle_unexpected_db_error("retrieve posts by ids")
+    async def retrieve_list_by_ids(
+        ids: list[int], viewer_id: int, db: AsyncSession
+    ) -> dict[int, Row]:
+        """
+        (bulk hydration) published posts of `ids` which are visible to the
+        viewer, with username of their authors -> {ID: row}
+        """
+        if not ids:
+            return {}
+        query = select(
+            Post.ID,
+            Post.title,
+            Post.reading_time,
+            Post.created_at,
+            Post.published_at,
+            Post.like_count,
+            Post.comment_count,
+            Post.user_id,
+            User.username,
+        ).join(User, Post.user_id == User.ID).where(
+            Post.ID.in_(ids),
+            Post.status == PostStatus.PB,
+            or_(Post.is_private.is_(False), Post.user_id == viewer_id)
+        )
+        rows = (await db.execute(query)).all()
+        return {row.ID: row for row in rows}
+
+
+class PostLikeCrud:
+    """ CRUD operations for 'post_likes' table """
+
+    @staticmethod
+    @handle_unexpected_db_error("add like")
+    async def create(
+        current_user_id: int, data: LikeUnlikePost, db: AsyncSession
+    ) -> Literal[1, 0]:
+        """
+        a user `likes` a post (only published posts which are visible to
+        the user) -> 0: already liked, or there's no such post
+        """
+        visible_post = select(Post.ID, literal(current_user_id, BigInteger))
+        visible_post = visible_post.where(
+            Post.ID == data.post_id,
+            Post.status == PostStatus.PB,
+            or_(Post.is_private.is_(False), Post.user_id == current_user_id)
+        )
+        query = pg_insert(post_likes).from_select(
+            ["post_id", "user_id"], visible_post
+        ).on_conflict_do_nothing(index_elements=["post_id", "user_id"])
+        try:
+            result = await db.execute(query)
+            await UnitOfWork.save(db)
+            return result.rowcount  # Literal[1, 0]
+        except IntegrityError as e:  # the post is deleted meanwhile
+            if 'constraint "post_likes_post_id_fkey"' in str(e.orig):
+                raise NotFoundException(
+                    f"Post(ID={data.post_id}) is not found!"
+                )
+            raise
+
+    @staticmethod
+    @handle_unexpected_db_error("delete like")
+    async def delete(
+        current_user_id: int, data: LikeUnlikePost, db: AsyncSession
+    ) -> Literal[1, 0]:
+        """ a user `unlikes` a post """
+        query = delete(post_likes).where(and_(
+            post_likes.c.post_id == data.post_id,
+            post_likes.c.user_id == current_user_id
+        ))
+        result = await db.execute(query)
+        await UnitOfWork.save(db)
+        return result.rowcount  # Literal[1, 0]
+
+    @staticmethod
+    @handle_unexpected_db_error("retrieve viewer's likes of posts")
+    async def liked_among(
+        post_ids: Iterable[int], viewer_id: int, db: AsyncSession
+    ) -> set[int]:
+        """ (batched) which of `post_ids` are liked by the viewer """
+        post_ids = list(post_ids)
+        if not post_ids:
+            return set()
+        query = select(post_likes.c.post_id).where(
+            post_likes.c.user_id == viewer_id,
+            post_likes.c.post_id.in_(post_ids)
+        )
+        return set((await db.execute(query)).scalars().all())
+
+    @staticmethod
+    @handle_unexpected_db_error("retrieve liked posts of user")
+    async def retrieve_liked_ids(
+        user_id: int, db: AsyncSession, limit: int
+    ) -> list[int]:
+        """
+        IDs of posts which are liked by the user (up to `limit`) -> to
+        build `LikedPostsCache` (index-only scan: (user_id, post_id))
+        """
+        query = select(post_likes.c.post_id).where(
+            post_likes.c.user_id == user_id
+        ).limit(limit)
+        return (await db.execute(query)).scalars().all()
+
 
 class TagCrud:
     """
@@ -180,7 +523,7 @@ class PostTagAssociation:
         q = pg_insert(posts_tags).values(rows)
         q = q.on_conflict_do_nothing(index_elements=["post_id", "tag_id"])
         await db.execute(q)
-        await db.commit()
+        await UnitOfWork.save(db)
 
     @staticmethod
     @handle_unexpected_db_error("dissociate post-tags")
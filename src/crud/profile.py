@@ -1,12 +1,14 @@
 from __future__ import annotations
 from typing import TYPE_CHECKING, Optional
 
-from sqlalchemy import insert, update, delete, and_
+from sqlalchemy import select, insert, update, delete, and_
+from sqlalchemy.orm import joinedload
 
 from src.models import Profile, Link
 from src.core.exceptions import BadRequestException, NotFoundException
+from src.utils.pagination import apply_keyset
 
-from .utils import handle_unexpected_db_error
+from .utils import handle_unexpected_db_error, UnitOfWork
 
 if TYPE_CHECKING:
     from sqlalchemy.ext.asyncio import AsyncSession
@@ -27,7 +29,7 @@ class ProfileCrud:
         """
         profile = Profile(user_id=user_id)
         db.add(profile)
-        await db.commit()
+        await UnitOfWork.save(db)
         # await db.refresh(profile)
         # return profile
 
@@ -43,7 +45,7 @@ class ProfileCrud:
             Profile.user_id == user_id
         ).values(**data).returning(Profile)
         result = await db.execute(query)
-        await db.commit()
+        await UnitOfWork.save(db)
         updated_profile: Optional[Profile] = result.scalars().one_or_none()
         # if updated_profile is None:  # ToDo: handle it later
         return updated_profile
@@ -58,8 +60,18 @@ class ProfileCrud:
         pass
 
     @staticmethod
-    async def retrieve_list(db: AsyncSession) -> list[Profile]:
-        pass
+    @handle_unexpected_db_error("retrieve profiles-list")
+    async def retrieve_list(
+        db: AsyncSession, limit: int, after: Optional[tuple[int]] = None
+    ) -> list[Profile]:
+        """
+        a page (`limit` profiles, with their users) newest first, after the
+        `after` position -> keyset on PK (`user_id`)
+        """
+        query = select(Profile).options(joinedload(Profile.user))
+        query = apply_keyset(query, (Profile.user_id,), after, limit)
+        profiles = (await db.execute(query)).scalars().all()
+        return profiles
 
 
 class LinkCrud:
@@ -73,7 +85,7 @@ class LinkCrud:
             dictionary["url"] = str(dictionary["url"])
         query = insert(Link).values(links).returning(Link)  # bulk insert
         result = await db.execute(query)
-        await db.commit()
+        await UnitOfWork.save(db)
         created_links: list[Link] = result.scalars().all()
         return created_links
 
@@ -91,7 +103,7 @@ class LinkCrud:
             and_(Link.ID == pk, Link.profile_id == user_id)
         ).values(**data).returning(Link)
         result = await db.execute(query)
-        await db.commit()
+        await UnitOfWork.save(db)
         updated_link: Optional[Link] = result.scalars().one_or_none()
         return updated_link  # Link | None
 
@@ -102,7 +114,7 @@ class LinkCrud:
             and_(Link.ID == pk, Link.profile_id == user_id)
         ).returning(Link.ID)
         result = await db.execute(query)
-        await db.commit()
+        await UnitOfWork.save(db)
         if result.scalar_one_or_none() is None:
             raise NotFoundException(
                 f"Requester(pk='{user_id}') is not owner of "
@@ -110,5 +122,15 @@ class LinkCrud:
             )
 
     @staticmethod
-    async def retrieve_list(db: AsyncSession) -> list[Link]:
-        pass
+    @handle_unexpected_db_error("retrieve links-list")
+    async def retrieve_list(
+        profile_id: int,
+        db: AsyncSession,
+        limit: int,
+        after: Optional[tuple[int]] = None
+    ) -> list[Link]:
+        """ a page (`limit` links) of a profile in order of creation """
+        query = select(Link).where(Link.profile_id == profile_id)
+        query = apply_keyset(query, (Link.ID,), after, limit, descending=False)
+        links = (await db.execute(query)).scalars().all()
+        return links
@@ -1,12 +1,14 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING, Literal, Optional
+from typing import TYPE_CHECKING, Iterable, Literal, Optional
 
-from sqlalchemy import select, delete, or_, and_, desc
+from sqlalchemy import select, delete, or_, and_, desc, func, literal
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import IntegrityError, MultipleResultsFound
 
 from src.models import User, follows
 from src.core.security import PasswordHandler
+from src.cache import UserCache
+from src.utils.pagination import apply_keyset
 from src.core.exceptions import (
     InternalServerError,
     NotFoundException,
@@ -14,10 +16,14 @@ from src.core.exceptions import (
     DuplicateValueException
 )
 
-from .utils import handle_unexpected_db_error
+from .utils import handle_unexpected_db_error, UnitOfWork
 
 if TYPE_CHECKING:
+    from datetime import datetime
+
+    from sqlalchemy import Column, Select
     from sqlalchemy.ext.asyncio import AsyncSession
+    from redis.asyncio import Redis
     from pydantic import EmailStr
 
     from src.schemas.user import (
@@ -31,17 +37,24 @@ if TYPE_CHECKING:
 
 
 class UserCrud:
-    """ CRUD operations for User model """
+    """
+    CRUD operations for User model
+    NOTE: methods which change a user (`update`, `set_new_password` and
+    `delete`) invalidate its cached snapshot too (check `UserCache`), after
+    the changes are committed (`UnitOfWork.after_commit`)
+    """
 
     @staticmethod
     @handle_unexpected_db_error("create user")
     async def create(data: UserCreate, db: AsyncSession) -> User:
         try:
             data = data.model_dump(exclude={"confirm_password"})
-            data["password"] = PasswordHandler.hash_password(data["password"])
+            data["password"] = await PasswordHandler.hash_password(
+                data["password"]
+            )
             user = User(**data)
             db.add(user)
-            await db.commit()
+            await UnitOfWork.save(db)
             await db.refresh(user)
             return user
 
@@ -57,14 +70,19 @@ class UserCrud:
 
     @staticmethod
     @handle_unexpected_db_error("update user")
-    async def update(user: User, data: UserUpdate, db: AsyncSession) -> User:
+    async def update(
+        user: User, data: UserUpdate, db: AsyncSession, redis: Redis
+    ) -> User:
         data = data.model_dump(exclude_none=True)
         if not data:
             raise BadRequestException("Empty field values to update.")
         try:
             for k, v in data.items():
                 setattr(user, k, v)  # 'None' values excluded before
-            await db.commit()
+            await UnitOfWork.save(db)
+            await UnitOfWork.after_commit(
+                db, lambda: UserCache.invalidate(user.ID, redis)
+            )
             await db.refresh(user)
             return user
 
@@ -81,11 +99,14 @@ class UserCrud:
     @staticmethod
     @handle_unexpected_db_error("set new password")
     async def set_new_password(
-        user: User, data: SetPassword, db: AsyncSession
+        user: User, data: SetPassword, db: AsyncSession, redis: Redis
     ) -> None:
-        new_password_hash = PasswordHandler.hash_password(data.password)
+        new_password_hash = await PasswordHandler.hash_password(data.password)
         user.password = new_password_hash
-        await db.commit()
+        await UnitOfWork.save(db)
+        await UnitOfWork.after_commit(
+            db, lambda: UserCache.invalidate(user.ID, redis)
+        )
 
     @staticmethod
     @handle_unexpected_db_error("verify user for login")
@@ -100,7 +121,7 @@ class UserCrud:
         if user is None:
             return
 
-        is_password_verified = PasswordHandler.verify_password(
+        is_password_verified = await PasswordHandler.verify_password(
             plain_password=data.password, hashed_password=user.password
         )
         if not is_password_verified:
@@ -110,9 +131,17 @@ class UserCrud:
 
     @staticmethod
     @handle_unexpected_db_error("delete user")
-    async def delete(user: User, db: AsyncSession) -> None:
+    async def delete(
+        user: User, db: AsyncSession, redis: Optional[Redis] = None
+    ) -> None:
+        """ `redis` can be None only if user is never cached (e.g. a
+        just-created user in `UserService.register_user`) """
         await db.delete(user)
-        await db.commit()
+        await UnitOfWork.save(db)
+        if redis is not None:
+            await UnitOfWork.after_commit(
+                db, lambda: UserCache.invalidate(user.ID, redis)
+            )
 
     @staticmethod
     @handle_unexpected_db_error("get user by 'id'")
@@ -133,11 +162,14 @@ class UserCrud:
         return await UserCrud._get_user_by_unique_field("email", email, db)
 
     @staticmethod
-    async def retrieve_list(db: AsyncSession) -> list[User]:
-        # query = select(User.ID, User.username).where(...)
-        # users = await db.execute(query)...
-        # ...
-        pass  # ToDo: implement later
+    @handle_unexpected_db_error("retrieve users-list")
+    async def retrieve_list(
+        db: AsyncSession, limit: int, after: Optional[tuple[int]] = None
+    ) -> list[User]:
+        """ a page (`limit` users) newest first, after the `after` position """
+        query = apply_keyset(select(User), (User.ID,), after, limit)
+        users = (await db.execute(query)).scalars().all()
+        return users
 
     # ----------------------------------------------------------------
     # private methods:
@@ -204,7 +236,7 @@ class FollowCrud:
         ).on_conflict_do_nothing(index_elements=["followed_by", "followed"])
         try:
             result = await db.execute(query)
-            await db.commit()
+            await UnitOfWork.save(db)
             return result.rowcount  # Literal[1, 0]
         except IntegrityError as e:
             if 'foreign key constraint "follows_followed_fkey"' in str(e.orig):
@@ -235,35 +267,154 @@ class FollowCrud:
                 raise BadRequestException("invalid operation-type input!")
         query = delete(follows).where(and_clause)
         result = await db.execute(query)
-        await db.commit()
+        await UnitOfWork.save(db)
         return result.rowcount  # Literal[1, 0]
 
     @staticmethod
     @handle_unexpected_db_error("get followers-list")
     async def retrieve_followers(
-        user_id: int, db: AsyncSession
-    ) -> list[tuple[int, str]]:  # [(id, username), (id, username), ...]
-        query = (
-            select(follows.c.followed_by, User.username)
-            .join(User, follows.c.followed_by == User.ID)
-            .where(follows.c.followed == user_id)
-            .order_by(desc(follows.c.follow_at))
+        user_id: int,
+        db: AsyncSession,
+        limit: int,
+        after: Optional[tuple[datetime, int]] = None
+    ) -> list[tuple[int, str, datetime]]:  # [(id, username, follow_at), ...]
+        """ a page (`limit` rows) of followers, after the `after` position """
+        return await FollowCrud._retrieve_page(
+            follows.c.followed, follows.c.followed_by,
+            user_id, db, limit, after
         )
-        rows = (await db.execute(query)).all()
-        await db.commit()
-        return rows
 
     @staticmethod
     @handle_unexpected_db_error("get followings-list")
     async def retrieve_followings(
-        user_id: int, db: AsyncSession
-    ) -> list[tuple[int, str]]:  # [(id, username), (id, username), ...]
-        query = (
-            select(follows.c.followed, User.username)
-            .join(User, follows.c.followed == User.ID)
-            .where(follows.c.followed_by == user_id)
-            .order_by(desc(follows.c.follow_at))
+        user_id: int,
+        db: AsyncSession,
+        limit: int,
+        after: Optional[tuple[datetime, int]] = None
+    ) -> list[tuple[int, str, datetime]]:  # [(id, username, follow_at), ...]
+        """ a page (`limit` rows) of followings, after the `after` position """
+        return await FollowCrud._retrieve_page(
+            follows.c.followed_by, follows.c.followed,
+            user_id, db, limit, after
+        )
+
+    @staticmethod
+    @handle_unexpected_db_error("get follower ids")
+    async def retrieve_follower_ids(
+        user_id: int,
+        db: AsyncSession,
+        limit: int,
+        after: Optional[tuple[datetime, int]] = None
+    ) -> list[tuple[int, datetime]]:  # [(follower_id, follow_at), ...]
+        """
+        a page of IDs of followers (e.g. timeline fan-out), newest first
+        -> index-only scan of (followed, follow_at, followed_by)
+        """
+        query = select(follows.c.followed_by, follows.c.follow_at).where(
+            follows.c.followed == user_id
+        )
+        query = apply_keyset(
+            query, (follows.c.follow_at, follows.c.followed_by), after, limit
         )
         rows = (await db.execute(query)).all()
-        await db.commit()
         return rows
+
+    @staticmethod
+    @handle_unexpected_db_error("count followers")
+    async def count_followers(
+        user_id: int, db: AsyncSession, up_to: int
+    ) -> int:
+        """ number of followers, counted up to `up_to` (bounded cost) """
+        subquery = select(literal(1)).where(
+            follows.c.followed == user_id
+        ).limit(up_to).subquery()
+        query = select(func.count()).select_from(subquery)
+        return (await db.execute(query)).scalar_one()
+
+    @staticmethod
+    @handle_unexpected_db_error("get followed users among candidates")
+    async def retrieve_followed_among(
+        user_id: int, candidate_ids: Iterable[int], db: AsyncSession
+    ) -> list[int]:
+        """ which of `candidate_ids` are followed by the user """
+        candidate_ids = list(candidate_ids)
+        if not candidate_ids:
+            return []
+        query = select(follows.c.followed).where(
+            follows.c.followed_by == user_id,
+            follows.c.followed.in_(candidate_ids)
+        )
+        return (await db.execute(query)).scalars().all()
+
+    @staticmethod
+    def followings_ids_query(user_id: int) -> Select:
+        """ subquery of IDs of followings of a user """
+        return select(follows.c.followed).where(
+            follows.c.followed_by == user_id
+        )
+
+    @staticmethod
+    def followers_export_query(user_id: int) -> Select:
+        """
+        all followers (newest first) -> streamed (`utils/streaming.py`),
+        not fetched here
+        """
+        query = FollowCrud._list_query(
+            follows.c.followed, follows.c.followed_by, user_id
+        )
+        return query.order_by(
+            desc(follows.c.follow_at), desc(follows.c.followed_by)
+        )
+
+    # ----------------------------------------------------------------
+    # private methods:
+
+    @staticmethod
+    async def _retrieve_page(
+        owner_column: Column,
+        listed_column: Column,
+        user_id: int,
+        db: AsyncSession,
+        limit: int,
+        after: Optional[tuple[datetime, int]]
+    ) -> list[tuple[int, str, datetime]]:
+        """
+        keyset pagination on (follow_at, listed-user-id), newest first
+        -> uses index (owner, follow_at, listed) of 'follows' (no OFFSET)
+        """
+        query = FollowCrud._page_query(
+            owner_column, listed_column, user_id, limit, after
+        )
+        rows = (await db.execute(query)).all()
+        return rows
+
+    @staticmethod
+    def _page_query(
+        owner_column: Column,
+        listed_column: Column,
+        user_id: int,
+        limit: int,
+        after: Optional[tuple[datetime, int]]
+    ) -> Select:
+        """
+        NOTE: its plan must be an index-only scan on 'follows' without any
+        Sort node -> checked by `test_follow_lists_explain.py` (and, on a
+        realistic data set, by `benchmarks/explain_follow_lists.py`)
+        """
+        query = FollowCrud._list_query(owner_column, listed_column, user_id)
+        return apply_keyset(
+            query, (follows.c.follow_at, listed_column), after, limit
+        )
+
+    @staticmethod
+    def _list_query(
+        owner_column: Column, listed_column: Column, user_id: int
+    ) -> Select:
+        """ (ID, username, follow_at) of listed users (unordered) """
+        return (
+            select(
+                listed_column.label("ID"), User.username, follows.c.follow_at
+            )
+            .join(User, listed_column == User.ID)
+            .where(owner_column == user_id)
+        )
@@ -1,3 +1,4 @@
+import logging
 from functools import wraps
 from typing import Callable, Awaitable, Any
 
@@ -5,15 +6,94 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 
 from src.core.exceptions import InternalServerError
+from src.core.slow_query_log import OperationTrace
+
+logger = logging.getLogger(__name__)
+
+
+class UnitOfWork:
+    """
+    request-scoped unit of work: sessions of requests (`deps.get_db`) are
+    committed once at the end of the request, so all CRUD calls of a
+    service are done in one transaction (atomic & fewer round-trips).
+
+    methods:
+        begin()        : mark a session as a unit-of-work (`deps.get_db`)
+        save()         : end of a CRUD write -> flush in a unit-of-work,
+                         otherwise (e.g. scripts) commit right away
+        after_commit() : run a callback after the changes are committed
+                         (e.g. cache invalidation)
+        commit()       : commit the unit-of-work and run its callbacks
+
+    NOTE: a part of a unit-of-work which may fail without failing the
+    whole request must be wrapped in `db.begin_nested()` (a SAVEPOINT)
+    """
+
+    KEY = "unit_of_work"
+    _CALLBACKS_KEY = "after_commit"
+    _WRITES_KEY = "has_writes"
+
+    @staticmethod
+    def begin(db: AsyncSession) -> None:
+        db.info[UnitOfWork.KEY] = True
+        db.info[UnitOfWork._CALLBACKS_KEY] = []
+        db.info[UnitOfWork._WRITES_KEY] = False
+
+    @staticmethod
+    def is_active(db: AsyncSession) -> bool:
+        return db.info.get(UnitOfWork.KEY, False)
+
+    @staticmethod
+    async def save(db: AsyncSession) -> None:
+        if UnitOfWork.is_active(db):
+            await db.flush()
+            db.info[UnitOfWork._WRITES_KEY] = True
+        else:
+            await db.commit()
+
+    @staticmethod
+    async def after_commit(
+        db: AsyncSession, callback: Callable[[], Awaitable[Any]]
+    ) -> None:
+        if UnitOfWork.is_active(db):
+            db.info[UnitOfWork._CALLBACKS_KEY].append(callback)
+        else:
+            await callback()  # already committed by `save()`
+
+    @staticmethod
+    async def commit(db: AsyncSession) -> None:
+        """ NOTE: read-only units are just closed (no COMMIT round-trip) """
+        has_writes = db.info.get(UnitOfWork._WRITES_KEY) or (
+            db.new or db.dirty or db.deleted
+        )
+        if has_writes:
+            try:
+                await db.commit()
+            except SQLAlchemyError as err:
+                await db.rollback()
+                logger.error("failed to commit unit-of-work: %r", err)
+                raise InternalServerError(
+                    "Failed to save changes! unexpected database error."
+                ) from err
+        callbacks = db.info.get(UnitOfWork._CALLBACKS_KEY, [])
+        while callbacks:
+            await callbacks.pop(0)()
 
 
 def handle_unexpected_db_error(operation_name: str):
+    """
+    wraps a CRUD operation:
+        _ unexpected database errors -> rollback & `InternalServerError`
+        _ the operation is timed by its name (slow-query log ->
+          `core/slow_query_log.py`)
+    """
 
     def decorator(func: Callable[..., Awaitable[Any]]):
         @wraps(func)
         async def wrapper(*args, **kwargs):
             try:
-                return await func(*args, **kwargs)
+                with OperationTrace(operation_name):
+                    return await func(*args, **kwargs)
             except SQLAlchemyError as err:
                 db: AsyncSession | None = kwargs.get("db")
                 if db is None:
@@ -26,8 +106,11 @@ def handle_unexpected_db_error(operation_name: str):
                             "db (AsyncSession) not found in function arguments"
                         ) from err
 
-                await db.rollback()
-                # TODO: proper logging here
+                # NOTE: a SAVEPOINT (`begin_nested`) is rolled back by its
+                # own context-manager -> the outer transaction stays usable
+                if not db.in_nested_transaction():
+                    await db.rollback()
+                logger.error("failed to %s: %r", operation_name, err)
                 raise InternalServerError(
                     f"Failed to {operation_name}! unexpected database error."
                 ) from err
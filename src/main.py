@@ -1,23 +1,47 @@
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from redis.exceptions import RedisError
 
+from src.core.config import settings
 from src.core.redis import init_redis, close_redis
+from src.core.database import engine, replica_router
+from src.core.middlewares import (
+    ReadYourWritesMiddleware, QueryStatsMiddleware
+)
+from src.core.security import password_hashing_executor
 from src.core.exceptions import CustomException
-from src.utils.exception_handlers import custom_exception_handler
-from src.routes import user, post, comment
+from src.utils.exception_handlers import (
+    custom_exception_handler, redis_exception_handler
+)
+from src.routes import user, post, comment, feed
 from src.routes.admin import admin_router
+from src.auth.blacklist_mirror import blacklist_mirror
+from src.utils.background import wait_for_background_jobs
+from src.services.counters import counter_flusher
 
 
-all_routers = [user.router, post.router, comment.router, admin_router]
+all_routers = [
+    user.router, post.router, comment.router, feed.router, admin_router
+]
 
 
 @asynccontextmanager
 async def lifespan(application: FastAPI):
     redis_ = await init_redis()
     application.state.redis = redis_  # is used as a dependency
+    if settings.TOKEN_BLACKLIST_LOCAL_MIRROR:
+        await blacklist_mirror.start(redis_)
+    if settings.COUNTER_WRITE_BEHIND:
+        counter_flusher.start(redis_)
     yield
+    await wait_for_background_jobs(timeout=10)  # e.g. timeline fan-outs
+    await counter_flusher.stop(redis_)
+    await blacklist_mirror.stop()
     await close_redis(redis_)
+    await engine.dispose()  # close all connections of the pool
+    await replica_router.dispose()
+    password_hashing_executor.shutdown()
 
 
 app = FastAPI(
@@ -29,7 +53,11 @@ app = FastAPI(
     swagger_ui_parameters={"syntaxHighlight.theme": "monokai"}
 )
 
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(QueryStatsMiddleware)  # outermost -> whole request
+
 app.add_exception_handler(CustomException, custom_exception_handler)
+app.add_exception_handler(RedisError, redis_exception_handler)
 
 
 @app.get("/")
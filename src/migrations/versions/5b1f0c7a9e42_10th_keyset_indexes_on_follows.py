@@ -0,0 +1,80 @@
+"""10th: keyset-pagination indexes on 'follows'
+
+Revision ID: 5b1f0c7a9e42
+Revises: 98771d1828af
+Create Date: 2026-10-17 10:12:40.215337
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1f0c7a9e42'
+down_revision: Union[str, Sequence[str], None] = '98771d1828af'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # cursors are (follow_at, user_id) -> follow_at can't be NULL anymore
+    # NOTE: each statement commits on its own (autocommit), so no lock is
+    # held longer than its statement:
+    # _ UPDATE: row locks of the NULL rows only (reads/other writes go on)
+    # _ SET NOT NULL alone would scan the whole table under an ACCESS
+    #   EXCLUSIVE lock (blocks reads & writes) -> a CHECK is added NOT
+    #   VALID (ACCESS EXCLUSIVE, no scan: instant), then VALIDATEd (scan
+    #   under SHARE UPDATE EXCLUSIVE: doesn't block reads/writes); SET NOT
+    #   NULL uses the valid CHECK instead of a scan (PostgreSQL 12+) and
+    #   takes its ACCESS EXCLUSIVE lock only for an instant
+    with op.get_context().autocommit_block():
+        op.execute(
+            "UPDATE follows SET follow_at = now() WHERE follow_at IS NULL"
+        )
+        op.execute(
+            "ALTER TABLE follows ADD CONSTRAINT ck_follows_follow_at_not_null"
+            " CHECK (follow_at IS NOT NULL) NOT VALID"
+        )
+        op.execute(
+            "ALTER TABLE follows VALIDATE CONSTRAINT "
+            "ck_follows_follow_at_not_null"
+        )
+        op.alter_column(
+            'follows', 'follow_at', existing_type=sa.DateTime(),
+            nullable=False
+        )
+        op.drop_constraint(
+            'ck_follows_follow_at_not_null', 'follows', type_='check'
+        )
+    # NOTE: built CONCURRENTLY (SHARE UPDATE EXCLUSIVE: doesn't block
+    # writes of 'follows') -> can't run inside the migration's transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_follows_followed_follow_at', 'follows',
+            ['followed', 'follow_at', 'followed_by'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'ix_follows_followed_by_follow_at', 'follows',
+            ['followed_by', 'follow_at', 'followed'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_follows_followed_by_follow_at', table_name='follows',
+            postgresql_concurrently=True, if_exists=True
+        )
+        op.drop_index(
+            'ix_follows_followed_follow_at', table_name='follows',
+            postgresql_concurrently=True, if_exists=True
+        )
+    op.alter_column(
+        'follows', 'follow_at', existing_type=sa.DateTime(), nullable=True
+    )
@@ -0,0 +1,38 @@
+"""11th: (user_id, published_at) index on 'posts' for home-timelines
+
+Revision ID: 7c3d2e1f4a90
+Revises: 5b1f0c7a9e42
+Create Date: 2026-10-17 15:40:12.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3d2e1f4a90'
+down_revision: Union[str, Sequence[str], None] = '5b1f0c7a9e42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NOTE: built CONCURRENTLY (no lock on writes of 'posts') -> can't
+    # run inside the migration's transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_posts_user_id_published_at', 'posts',
+            ['user_id', 'published_at'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_posts_user_id_published_at', table_name='posts',
+            postgresql_concurrently=True, if_exists=True
+        )
@@ -0,0 +1,56 @@
+"""12th: 'like_count' & 'comment_count' counters on 'posts'
+
+Revision ID: 9a4e6b2d1c35
+Revises: 7c3d2e1f4a90
+Create Date: 2026-10-17 17:05:44.107391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4e6b2d1c35'
+down_revision: Union[str, Sequence[str], None] = '7c3d2e1f4a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NOTE: a constant server-default -> no rewrite of 'posts' (metadata
+    # only); then counters of existing posts are initialized (backfill)
+    op.add_column(
+        'posts',
+        sa.Column(
+            'like_count', sa.Integer(), server_default='0', nullable=False
+        )
+    )
+    op.add_column(
+        'posts',
+        sa.Column(
+            'comment_count', sa.Integer(), server_default='0',
+            nullable=False
+        )
+    )
+    op.execute(
+        'UPDATE posts SET like_count = counted.n '
+        'FROM (SELECT post_id, count(*) AS n FROM post_likes '
+        'GROUP BY post_id) AS counted '
+        'WHERE posts."ID" = counted.post_id'
+    )
+    op.execute(
+        'UPDATE posts SET comment_count = counted.n '
+        'FROM (SELECT post_parent_id, count(*) AS n FROM comments '
+        "WHERE status = 'PB' AND post_parent_id IS NOT NULL "
+        'GROUP BY post_parent_id) AS counted '
+        'WHERE posts."ID" = counted.post_parent_id'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('posts', 'comment_count')
+    op.drop_column('posts', 'like_count')
@@ -0,0 +1,38 @@
+"""14th: (user_id, post_id) index on 'post_likes' for liked-posts cache
+
+Revision ID: b3d71f9e0a58
+Revises: e5f8a3c7b214
+Create Date: 2026-10-17 19:48:31.772064
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d71f9e0a58'
+down_revision: Union[str, Sequence[str], None] = 'e5f8a3c7b214'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NOTE: built CONCURRENTLY (no lock on writes of 'post_likes') -> can't
+    # run inside the migration's transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_post_likes_user_id_post_id', 'post_likes',
+            ['user_id', 'post_id'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_post_likes_user_id_post_id', table_name='post_likes',
+            postgresql_concurrently=True, if_exists=True
+        )
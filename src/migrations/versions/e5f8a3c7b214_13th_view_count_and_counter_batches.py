@@ -0,0 +1,44 @@
+"""13th: 'view_count' on 'posts' & 'counter_batches' (write-behind counters)
+
+Revision ID: e5f8a3c7b214
+Revises: 9a4e6b2d1c35
+Create Date: 2026-10-17 18:22:09.640517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5f8a3c7b214'
+down_revision: Union[str, Sequence[str], None] = '9a4e6b2d1c35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'posts',
+        sa.Column(
+            'view_count', sa.BigInteger(), server_default='0',
+            nullable=False
+        )
+    )
+    op.create_table(
+        'counter_batches',
+        sa.Column('batch_id', sa.String(length=32), nullable=False),
+        sa.Column(
+            'applied_at', sa.DateTime(), server_default=sa.text('now()'),
+            nullable=False
+        ),
+        sa.PrimaryKeyConstraint('batch_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('counter_batches')
+    op.drop_column('posts', 'view_count')
@@ -0,0 +1,38 @@
+"""15th: 'counter_deltas' (outbox of durable write-behind counters)
+
+Revision ID: f1c9d4a7b362
+Revises: b3d71f9e0a58
+Create Date: 2026-10-17 21:14:52.308716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c9d4a7b362'
+down_revision: Union[str, Sequence[str], None] = 'b3d71f9e0a58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'counter_deltas',
+        sa.Column('ID', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('post_id', sa.BigInteger(), nullable=False),
+        sa.Column('counter', sa.String(length=16), nullable=False),
+        sa.Column('delta', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ['post_id'], ['posts.ID'], ondelete='CASCADE'
+        ),
+        sa.PrimaryKeyConstraint('ID')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('counter_deltas')
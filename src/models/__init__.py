@@ -7,7 +7,9 @@ from .post import Post, PostStatus
 from .tag import Tag, posts_tags
 from .comment import Comment, CommentStatus
 from .lists import List, saved_posts, user_saved_lists
-from .interactions import follows, post_likes
+from .interactions import (
+    follows, post_likes, counter_batches, counter_deltas
+)
 
 __all__ = [
     "Base",
@@ -23,6 +25,8 @@ __all__ = [
     "user_saved_lists",
     "follows",
     "post_likes",
+    "counter_batches",
+    "counter_deltas",
     # Enums (Choice Fields):
     "Gender",
     "PostStatus",
@@ -1,4 +1,6 @@
-from sqlalchemy import Table, Column, ForeignKey, BigInteger, DateTime, func
+from sqlalchemy import (
+    Table, Column, ForeignKey, BigInteger, String, DateTime, Index, func
+)
 
 from .base import Base
 
@@ -25,8 +27,16 @@ follows = Table(
     Column(
         name="follow_at",
         type_=DateTime,
-        server_default=func.now()
-    )
+        server_default=func.now(),
+        nullable=False
+    ),
+    # keyset-pagination of followers/followings lists (newest first) ->
+    # WHERE <user> = ? AND (follow_at, <other-user>) < (?, ?) ORDER BY ...
+    # (all columns of 'follows' are in them -> index-only scans)
+    Index("ix_follows_followed_follow_at", "followed", "follow_at",
+          "followed_by"),
+    Index("ix_follows_followed_by_follow_at", "followed_by", "follow_at",
+          "followed"),
 )
 # NOTE: 'primary_key=True' in both columns --> makes a composite_key of them
 
@@ -54,5 +64,44 @@ post_likes = Table(
         name="liked_at",
         type_=DateTime,
         server_default=func.now()
+    ),
+    # liked posts of a user (`LikedPostsCache` is built from it)
+    Index("ix_post_likes_user_id_post_id", "user_id", "post_id"),
+)
+
+
+# 'counter_batches' -> IDs of applied batches of write-behind counters
+# (`PostCounterBuffer`): a batch and its ID are committed together -> a
+# batch which is retried (e.g. after a crash) isn't applied twice.
+# NOTE: old rows are deleted by the flusher (`CounterService.flush`)
+counter_batches = Table(
+    "counter_batches",
+    Base.metadata,
+    Column("batch_id", String(length=32), primary_key=True),
+    Column(
+        name="applied_at",
+        type_=DateTime,
+        server_default=func.now(),
+        nullable=False
     )
 )
+
+
+# 'counter_deltas' -> outbox of durable write-behind counters (likes): a
+# delta is inserted in the same transaction as its change (e.g. a row of
+# 'post_likes') -> nothing is lost between commit and Redis; the flusher
+# (`CounterService.flush`) deletes and applies them in one transaction.
+# NOTE: insert-only -> no lock-contention on rows of hot posts
+counter_deltas = Table(
+    "counter_deltas",
+    Base.metadata,
+    Column("ID", BigInteger, primary_key=True, autoincrement=True),
+    Column(
+        "post_id",
+        BigInteger,
+        ForeignKey("posts.ID", ondelete="CASCADE"),
+        nullable=False
+    ),
+    Column("counter", String(length=16), nullable=False),
+    Column("delta", BigInteger, nullable=False),
+)
@@ -4,8 +4,8 @@ from enum import Enum as PythonEnum
 from datetime import datetime
 
 from sqlalchemy import (
-    String, Text, SmallInteger, BigInteger, DateTime,
-    Boolean, ForeignKey, Enum as SqlEnum
+    String, Text, SmallInteger, Integer, BigInteger, DateTime,
+    Boolean, ForeignKey, Index, Enum as SqlEnum
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -32,9 +32,17 @@ class Post(Base, CreatedAtFieldMixin, UpdateAtFieldMixin):
     Fields:
         ID (PK), title, content, reading_time, status, is_private
         created_at, published_at, updated_at, user_id (FK)
+        like_count, comment_count, view_count
 
     Points/Notes:
         _ 'reading_time' is generated via 'content' [calculated_field]
+        _ 'like_count' & 'comment_count' are counters (denormalized) ->
+          changed in the same transaction as 'post_likes' / 'comments'
+          (no COUNT(*) on each view). 'comment_count': published comments
+          directly on the post (not replies)
+        _ 'like_count' & 'view_count' are written behind (hot posts): their
+          increments are buffered in Redis and flushed in batches
+          (`CounterService`) -> they may lag for a few seconds
 
     Relations:
     _ N:1 (Many to One) with 'User' -> Post.author / User.posts
@@ -65,6 +73,15 @@ class Post(Base, CreatedAtFieldMixin, UpdateAtFieldMixin):
     published_at: Mapped[datetime] = mapped_column(
         DateTime, nullable=True, index=True
     )
+    like_count: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0", nullable=False
+    )
+    comment_count: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0", nullable=False
+    )
+    view_count: Mapped[int] = mapped_column(
+        BigInteger, default=0, server_default="0", nullable=False
+    )
 
     # N:1 with User (backref: author)
     user_id: Mapped[int] = mapped_column(
@@ -103,5 +120,11 @@ class Post(Base, CreatedAtFieldMixin, UpdateAtFieldMixin):
         back_populates="liked_posts"
     )
 
+    __table_args__ = (
+        # recent published posts of some users (home-timelines: backfill
+        # on follow, pull of celebrities' posts, rebuild) -> newest first
+        Index("ix_posts_user_id_published_at", "user_id", "published_at"),
+    )
+
     # ToDo: add 'pin' column with limitation=10 (for example)
     # ToDo: if for a user: is_active=False --> his posts should be hidden too.
@@ -1,8 +1,11 @@
-from typing import Annotated
-from fastapi import status, Depends, Path
-from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Annotated, Optional
+from fastapi import status, Depends, Path, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from src.utils import dependencies as deps
+from src.utils.streaming import ExportFormat
+from src.models import CommentStatus
 from src.schemas.GENERAL import Message
 from src.services import CommentService
 
@@ -37,3 +40,24 @@ async def delete_comment(
     db: Annotated[AsyncSession, Depends(deps.get_db)]
 ):
     await CommentService.delete_comment(pk, db)
+
+
+@admin_router.get(
+    "/comments/export",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse
+)
+async def export_comments(
+    session_maker: Annotated[
+        async_sessionmaker, Depends(deps.get_read_sessionmaker)
+    ],
+    comment_status: Annotated[Optional[CommentStatus], Query(
+        alias="status", description="only comments with this status"
+    )] = None,
+    export_format: Annotated[ExportFormat, Query(
+        alias="format", description="'ndjson' (default) or 'json' (array)"
+    )] = "ndjson"
+) -> StreamingResponse:
+    return CommentService.export_comments(
+        comment_status, export_format, session_maker
+    )
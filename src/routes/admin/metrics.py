@@ -0,0 +1,11 @@
+from fastapi import status
+
+from src.core.metrics import metrics
+
+from ._admin_router import admin_router
+
+
+@admin_router.get("/metrics", status_code=status.HTTP_200_OK)
+async def get_metrics() -> dict:
+    """ in-process metrics of the worker which handles this request """
+    return metrics.snapshot()
@@ -1,6 +1,7 @@
 from typing import Annotated
 from fastapi import status, Depends, Path
 from sqlalchemy.ext.asyncio import AsyncSession
+from redis.asyncio import Redis
 
 from src.utils import dependencies as deps
 from src.schemas.GENERAL import Message
@@ -12,9 +13,10 @@ from ._admin_router import admin_router
 @admin_router.patch("/posts/reject/{pk}", status_code=status.HTTP_202_ACCEPTED)
 async def reject_post(
     pk: Annotated[int, Path(..., gt=0, description="unique ID of post")],
-    db: Annotated[AsyncSession, Depends(deps.get_db)]
+    db: Annotated[AsyncSession, Depends(deps.get_db)],
+    redis: Annotated[Redis, Depends(deps.get_redis)]
 ) -> Message:
-    await PostService.reject_post(pk, db)
+    await PostService.reject_post(pk, db, redis)
     return Message(message="post rejected successfully.")
 
 
@@ -24,15 +26,17 @@ async def reject_post(
 )
 async def publish_rejected_post(
     pk: Annotated[int, Path(..., gt=0, description="unique ID of post")],
-    db: Annotated[AsyncSession, Depends(deps.get_db)]
+    db: Annotated[AsyncSession, Depends(deps.get_db)],
+    redis: Annotated[Redis, Depends(deps.get_redis)]
 ) -> Message:
-    await PostService.publish_rejected_post(pk, db)
+    await PostService.publish_rejected_post(pk, db, redis)
     return Message(message="rejection removed successfully.")
 
 
 @admin_router.delete("/posts/{pk}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_post(
     pk: Annotated[int, Path(..., gt=0, description="unique ID of post")],
-    db: Annotated[AsyncSession, Depends(deps.get_db)]
+    db: Annotated[AsyncSession, Depends(deps.get_db)],
+    redis: Annotated[Redis, Depends(deps.get_redis)]
 ):
-    await PostService.delete_post(pk, db)
+    await PostService.delete_post(pk, db, redis)
@@ -0,0 +1,19 @@
+from typing import Annotated
+from fastapi import status, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.utils import dependencies as deps
+from src.utils.pagination import PageParams
+from src.schemas.GENERAL import Page
+from src.schemas.admin import UserListOut
+from src.services import UserService
+
+from ._admin_router import admin_router
+
+
+@admin_router.get("/users", status_code=status.HTTP_200_OK)
+async def users_list(
+    page: Annotated[PageParams, Depends()],
+    db: Annotated[AsyncSession, Depends(deps.get_read_db)]
+) -> Page[UserListOut]:
+    return await UserService.get_users_list(page, db)
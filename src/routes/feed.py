@@ -0,0 +1,27 @@
+""" home-timeline routes | gets service from TimelineService """
+
+from typing import Annotated
+
+from fastapi import APIRouter, status, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from redis.asyncio import Redis
+
+from src.utils import dependencies as deps
+from src.utils.pagination import PageParams
+from src.schemas.GENERAL import Page
+from src.schemas.post import PostListOut
+from src.services import TimelineService
+
+
+router = APIRouter(prefix="/feed")
+
+
+@router.get("", status_code=status.HTTP_200_OK)
+async def feed(
+    current_user_id: Annotated[int, Depends(deps.get_current_user_id)],
+    page: Annotated[PageParams, Depends()],
+    db: Annotated[AsyncSession, Depends(deps.get_read_db)],
+    redis: Annotated[Redis, Depends(deps.get_redis)]
+) -> Page[PostListOut]:
+    """ home-timeline: posts of followings (and own), newest first """
+    return await TimelineService.get_feed(current_user_id, page, db, redis)
@@ -2,11 +2,12 @@
 
 from typing import Annotated
 
-from fastapi import APIRouter, status, Depends, Path
+from fastapi import APIRouter, status, Depends, Path, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-# from redis.asyncio import Redis
+from redis.asyncio import Redis
 
 from src.utils import dependencies as deps
+from src.utils.etag import json_response_with_etag
 from src.schemas import post as post_sch
 from src.schemas.GENERAL import Message
 from src.services import PostService
@@ -25,13 +26,35 @@ async def add_draft_post(
     return {"draft_post": draft, "tags": tags}
 
 
+# NOTE: database is the primary (not a replica) -> a cache-miss after a
+# change doesn't cache a lagging replica's (old) post under its new version
+@router.get(
+    "/{pk}",
+    status_code=status.HTTP_200_OK,
+    response_model=post_sch.PostDetailsOut,
+    responses={304: {"description": "Not Modified (`If-None-Match`)"}}
+)
+async def get_post(
+    pk: Annotated[int, Path(..., gt=0, description="unique ID of post")],
+    request: Request,
+    current_user_id: Annotated[int, Depends(deps.get_current_user_id)],
+    db: Annotated[AsyncSession, Depends(deps.get_db)],
+    redis: Annotated[Redis, Depends(deps.get_redis)]
+) -> Response:
+    etag, details = await PostService.get_post_details(
+        current_user_id, pk, db, redis
+    )
+    return json_response_with_etag(request, etag, details)
+
+
 @router.put("/publish/{pk}", status_code=status.HTTP_202_ACCEPTED)
 async def publish(
     pk: Annotated[int, Path(..., gt=0, description="unique ID of post")],
     current_user_id: Annotated[int, Depends(deps.get_current_user_id)],
-    db: Annotated[AsyncSession, Depends(deps.get_db)]
+    db: Annotated[AsyncSession, Depends(deps.get_db)],
+    redis: Annotated[Redis, Depends(deps.get_redis)]
 ) -> post_sch.PostDetailsOut:
-    return await PostService.publish(current_user_id, pk, db)
+    return await PostService.publish(current_user_id, pk, db, redis)
 
 
 @router.put("/{pk}", status_code=status.HTTP_202_ACCEPTED)
@@ -39,9 +62,12 @@ async def update_post(
     pk: Annotated[int, Path(..., gt=0, description="unique ID of post")],
     current_user_id: Annotated[int, Depends(deps.get_current_user_id)],
     data: post_sch.PostUpdate,
-    db: Annotated[AsyncSession, Depends(deps.get_db)]
+    db: Annotated[AsyncSession, Depends(deps.get_db)],
+    redis: Annotated[Redis, Depends(deps.get_redis)]
 ) -> post_sch.PostOut:
-    return await PostService.update_post_fields(current_user_id, pk, data, db)
+    return await PostService.update_post_fields(
+        current_user_id, pk, data, db, redis
+    )
 
 
 @router.put("/tags/{pk}", status_code=status.HTTP_202_ACCEPTED)
@@ -49,9 +75,12 @@ async def update_post_tags(
     pk: Annotated[int, Path(..., gt=0, description="unique ID of post")],
     current_user_id: Annotated[int, Depends(deps.get_current_user_id)],
     data: post_sch.TagsIn,
-    db: Annotated[AsyncSession, Depends(deps.get_db)]
+    db: Annotated[AsyncSession, Depends(deps.get_db)],
+    redis: Annotated[Redis, Depends(deps.get_redis)]
 ) -> list[post_sch.TagOut]:
-    return await PostService.update_tags_of_post(current_user_id, pk, data, db)
+    return await PostService.update_tags_of_post(
+        current_user_id, pk, data, db, redis
+    )
 
 
 @router.patch("/privacy/{pk}", status_code=status.HTTP_202_ACCEPTED)
@@ -59,17 +88,52 @@ async def change_privacy_statement(
     pk: Annotated[int, Path(..., gt=0, description="unique ID of post")],
     current_user_id: Annotated[int, Depends(deps.get_current_user_id)],
     data: post_sch.ChangePostPrivacy,
-    db: Annotated[AsyncSession, Depends(deps.get_db)]
+    db: Annotated[AsyncSession, Depends(deps.get_db)],
+    redis: Annotated[Redis, Depends(deps.get_redis)]
 ) -> Message:
-    res = await PostService.change_privacy_stmt(current_user_id, pk, data, db)
+    res = await PostService.change_privacy_stmt(
+        current_user_id, pk, data, db, redis
+    )
     return Message(message=f"post's privacy successfully changed to: {res}")
 
 
+@router.post("/like", status_code=status.HTTP_201_CREATED)
+async def like(
+    data: post_sch.LikeUnlikePost,
+    current_user_id: Annotated[int, Depends(deps.get_current_user_id)],
+    db: Annotated[AsyncSession, Depends(deps.get_db)],
+    redis: Annotated[Redis, Depends(deps.get_redis)]
+) -> Message:
+    result = await PostService.like(current_user_id, data, db, redis)
+    if result == 1:
+        return Message(message="liked successfully.")
+    else:  # result == 0
+        return Message(message="already liked!!! nothing changed.")
+
+
+# NOTE: declared before "/{pk}" (its 'pk' path-parameter would match "like")
+@router.delete("/like", status_code=status.HTTP_202_ACCEPTED)
+async def unlike(
+    data: post_sch.LikeUnlikePost,
+    current_user_id: Annotated[int, Depends(deps.get_current_user_id)],
+    db: Annotated[AsyncSession, Depends(deps.get_db)],
+    redis: Annotated[Redis, Depends(deps.get_redis)]
+) -> Message:
+    result = await PostService.unlike(current_user_id, data, db, redis)
+    if result == 1:
+        return Message(message="unliked successfully.")
+    else:  # result == 0
+        return Message(message="NO like to delete!!!")
+
+
 @router.delete("/{pk}", status_code=status.HTTP_202_ACCEPTED)
 async def delete_post_at_user_request(
     pk: Annotated[int, Path(..., gt=0, description="unique ID of post")],
     current_user_id: Annotated[int, Depends(deps.get_current_user_id)],
-    db: Annotated[AsyncSession, Depends(deps.get_db)]
+    db: Annotated[AsyncSession, Depends(deps.get_db)],
+    redis: Annotated[Redis, Depends(deps.get_redis)]
 ) -> Message:
-    await PostService.delete_post_at_user_request(current_user_id, pk, db)
+    await PostService.delete_post_at_user_request(
+        current_user_id, pk, db, redis
+    )
     return Message(message="post deleted successfully.")
@@ -4,12 +4,17 @@
 
 from typing import Annotated
 
-from fastapi import APIRouter, status, Depends, Request, Response, Path
+from fastapi import (
+    APIRouter, status, Depends, Request, Response, Path, Query
+)
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPAuthorizationCredentials
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from redis.asyncio import Redis
 
 from src.utils import dependencies as deps
+from src.utils.pagination import PageParams
+from src.utils.streaming import ExportFormat
 from src.core.security import jwt_bearer
 from src.models import User
 from src.schemas import user as user_sch, profile as profile_sch
@@ -64,19 +69,24 @@ async def renew_tokens(
 async def update_user(
     data: user_sch.UserUpdate,
     current_user: Annotated[User, Depends(deps.get_current_user_object)],
+    redis: Annotated[Redis, Depends(deps.get_redis)],
     db: Annotated[AsyncSession, Depends(deps.get_db)]
 ) -> user_sch.UserOut:
-    return await UserService.update_user(current_user, data, db)
+    return await UserService.update_user(current_user, data, redis, db)
 
 
 @router.put("/password", status_code=status.HTTP_202_ACCEPTED)
 async def update_password(
     data: user_sch.UpdatePassword,
     current_user: Annotated[User, Depends(deps.get_current_user_object)],
+    redis: Annotated[Redis, Depends(deps.get_redis)],
     db: Annotated[AsyncSession, Depends(deps.get_db)]
 ) -> Message:
-    await UserService.update_password(current_user, data, db)
-    return Message(message="Password updated successfully.")
+    await UserService.update_password(current_user, data, redis, db)
+    return Message(
+        message="Password updated successfully. (all sessions are logged "
+                "out -> please login again)"
+    )
 
 
 # @router.put("/reset-password", status_code=status.HTTP_202_ACCEPTED)
@@ -133,9 +143,10 @@ async def delete_link(
 async def follow(
     data: user_sch.FollowCreate,
     current_user_id: Annotated[int, Depends(deps.get_current_user_id)],
-    db: Annotated[AsyncSession, Depends(deps.get_db)]
+    db: Annotated[AsyncSession, Depends(deps.get_db)],
+    redis: Annotated[Redis, Depends(deps.get_redis)]
 ) -> Message:
-    result = await UserService.follow(current_user_id, data, db)
+    result = await UserService.follow(current_user_id, data, db, redis)
     if result == 1:
         return Message(message="followed successfully.")
     else:  # result == 0
@@ -149,9 +160,12 @@ async def follow(
 async def unfollow_or_remove(
     data: user_sch.UnfollowOrRemoveFollowerSchema,
     current_user_id: Annotated[int, Depends(deps.get_current_user_id)],
-    db: Annotated[AsyncSession, Depends(deps.get_db)]
+    db: Annotated[AsyncSession, Depends(deps.get_db)],
+    redis: Annotated[Redis, Depends(deps.get_redis)]
 ) -> Message:
-    result = await UserService.unfollow_or_remove(current_user_id, data, db)
+    result = await UserService.unfollow_or_remove(
+        current_user_id, data, db, redis
+    )
     if result == 1:
         return Message(message="follow-relationship deleted successfully.")
     else:  # result == 0
@@ -167,9 +181,10 @@ async def followers_list(
         ..., gt=0,
         description="ID of the user whose followers-list is being requested"
     )],
-    db: Annotated[AsyncSession, Depends(deps.get_db)]
+    page: Annotated[PageParams, Depends()],
+    db: Annotated[AsyncSession, Depends(deps.get_read_db)]
 ) -> user_sch.FollowerOrFollowingListOut:
-    return await UserService.get_followers_list(user_id, db)
+    return await UserService.get_followers_list(user_id, page, db)
 
 
 # maybe path will change to: "/@{username}/followings"
@@ -179,6 +194,27 @@ async def followings_list(
         ..., gt=0,
         description="ID of the user whose followings-list is being requested"
     )],
-    db: Annotated[AsyncSession, Depends(deps.get_db)]
+    page: Annotated[PageParams, Depends()],
+    db: Annotated[AsyncSession, Depends(deps.get_read_db)]
 ) -> user_sch.FollowerOrFollowingListOut:
-    return await UserService.get_followings_list(user_id, db)
+    return await UserService.get_followings_list(user_id, page, db)
+
+
+@router.get(
+    "/followers-export",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse
+)
+async def export_followers(
+    current_user_id: Annotated[int, Depends(deps.get_current_user_id)],
+    session_maker: Annotated[
+        async_sessionmaker, Depends(deps.get_read_sessionmaker)
+    ],
+    export_format: Annotated[ExportFormat, Query(
+        alias="format", description="'ndjson' (default) or 'json' (array)"
+    )] = "ndjson"
+) -> StreamingResponse:
+    """ full followers-list of the current user (streamed) """
+    return UserService.export_followers(
+        current_user_id, export_format, session_maker
+    )
@@ -1,4 +1,8 @@
-from pydantic import BaseModel
+from typing import Annotated, Generic, Optional, TypeVar
+
+from pydantic import BaseModel, Field
+
+T = TypeVar("T")
 
 
 class Message(BaseModel):
@@ -9,4 +13,18 @@ class Token(BaseModel):
     access_token: str
 
 
+class Page(BaseModel, Generic[T]):
+    """
+    a page of a list endpoint (keyset pagination -> `utils/pagination.py`)
+    e.g. `Page[UserListOut]`
+    """
+    items: list[T]
+    next_cursor: Annotated[Optional[str], Field(
+        None, description="cursor of the next page (None -> last page)"
+    )]
+    next: Annotated[Optional[str], Field(
+        None, description="url of the next page (None -> last page)"
+    )]
+
+
 # Note: tests for 'Token' and 'Message' added in 'test_schemas/test_user.py'
@@ -145,6 +145,9 @@ class PostListOut(BaseModel):
         ..., description="Contains 'username' and 'id' of related user"
     )]
 
+    like_count: int
+    comment_count: int
+
     saved_by_viewer: Annotated[bool, Field(
         ...,
         description="indicates that the viewer (current user) "
@@ -157,9 +160,8 @@ class PostListOut(BaseModel):
 class PostDetailsOut(PostListOut):
     content: Optional[str] = None
     updated_at: datetime
+    view_count: int
 
-    like_count: int
-    comment_count: int
     tags: Optional[list[TagOut]] = None
 
     liked_by_viewer: Annotated[bool, Field(
@@ -133,5 +133,11 @@ class UnfollowOrRemoveFollowerSchema(BaseModel):
 
 class FollowerOrFollowingListOut(BaseModel):
     users_list: Annotated[Optional[list[UserOut]], Field(
-        None, description="list of followers or followings"
+        None, description="list of followers or followings (newest first)"
+    )]
+    next_cursor: Annotated[Optional[str], Field(
+        None, description="cursor of the next page (None -> last page)"
+    )]
+    next: Annotated[Optional[str], Field(
+        None, description="url of the next page (None -> last page)"
     )]
@@ -2,6 +2,8 @@ from .user import UserService
 from .authentication import AuthService
 from .post import PostService
 from .comment import CommentService
+from .timeline import TimelineService
+from .counters import CounterService
 
 
 __all__ = [
@@ -9,4 +11,6 @@ __all__ = [
     "AuthService",
     "PostService",
     "CommentService",
+    "TimelineService",
+    "CounterService",
 ]
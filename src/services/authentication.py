@@ -4,7 +4,7 @@ from datetime import datetime, timezone, timedelta
 
 from src.core.config import settings
 from src.core.exceptions import UnauthenticatedException
-from src.auth import JWTHandler, TokenRevocation
+from src.auth import JWTHandler, TokenRevocation, LoginRateLimiter
 from src.crud import UserCrud
 from src.schemas.user import LoginSuccessfulData, UserOut
 from src.schemas.GENERAL import Token
@@ -33,23 +33,33 @@ class AuthService:
         refresh_token = request.cookies.get("X-Auth-Token", None)
         if refresh_token is not None:
             try:
-                payload = await JWTHandler.get_token_payload(
-                    refresh_token, "refresh", redis
+                # check & blacklist the old token in one round-trip
+                await JWTHandler.get_tokens_payloads(
+                    [(refresh_token, "refresh")], redis, revoke=True
                 )
-                await TokenRevocation.put_in_blacklist(payload, redis)
                 # don't need to delete X-Auth-Token cookie, it'll be overridden
             except UnauthenticatedException:
                 pass
 
+        # throttle attempts before the (CPU-heavy) password verification
+        client_ip = request.client.host if request.client else "unknown"
+        await LoginRateLimiter.check(data.identifier, client_ip, redis)
+
         user = await UserCrud.verify_user_for_login(data, db)
         if user is None:
             raise UnauthenticatedException(
                 "Invalid username, email or password"
             )
 
+        claims = JWTHandler.authz_claims(user)
         user = UserOut.model_validate(user)
-        access_token = JWTHandler.generate_token(user.ID, "access")
-        refresh_token = JWTHandler.generate_token(user.ID, "refresh")
+        generation = await TokenRevocation.get_user_generation(user.ID, redis)
+        access_token = JWTHandler.generate_token(
+            user.ID, "access", generation, claims
+        )
+        refresh_token = JWTHandler.generate_token(
+            user.ID, "refresh", generation, claims
+        )
 
         AuthService._add_refresh_token_cookie(response, refresh_token)
         token = Token(access_token=access_token)
@@ -67,14 +77,11 @@ class AuthService:
         if refresh_token is None:
             raise UnauthenticatedException("Token Not provided.")
 
-        refresh_token_payload = await JWTHandler.get_token_payload(
-            refresh_token, "refresh", redis
+        # decode both tokens, check & blacklist them in one round-trip
+        await JWTHandler.get_tokens_payloads(
+            [(refresh_token, "refresh"), (access_token, "access")],
+            redis, revoke=True
         )
-        access_token_payload = await JWTHandler.get_token_payload(
-            access_token, "access", redis
-        )
-        await TokenRevocation.put_in_blacklist(refresh_token_payload, redis)
-        await TokenRevocation.put_in_blacklist(access_token_payload, redis)
         response.delete_cookie("X-Auth-Token")
 
     @staticmethod
@@ -85,22 +92,37 @@ class AuthService:
         if refresh_token is None:
             raise UnauthenticatedException("Token Not provided.")
 
-        refresh_token_payload = await JWTHandler.get_token_payload(
-            refresh_token, "refresh", redis
+        # NOTE: `old-refresh-token` is blacklisted in the same pipeline
+        # which checks its blacklisting statement (JWTHandler._decode_many)
+        # -> if it's already revoked: raises error (nothing new is issued)
+        [refresh_token_payload] = await JWTHandler.get_tokens_payloads(
+            [(refresh_token, "refresh")], redis, revoke=True
         )
         user_id = refresh_token_payload.get("user_id")
-        new_access_token = JWTHandler.generate_token(user_id, "access")
-        new_refresh_token = JWTHandler.generate_token(user_id, "refresh")
-
-        # NOTE: `old-refresh-token` must be blacklisted *after* calling
-        # JWTHandler.get_token_payload (actually calling JWTHandler._decode)
-        # because: to get the `payload` using JWTHandler.get_token_payload, its
-        # blacklisting statement is checked and -> if blacklisted: raises error
-        await TokenRevocation.put_in_blacklist(refresh_token_payload, redis)
+        # not-revoked refresh-token -> its "gen" is user's current generation
+        generation = refresh_token_payload.get("gen", 0)
+        # NOTE: authz-claims are changed only with revoking all tokens
+        claims = JWTHandler.authz_claims(refresh_token_payload)
+        new_access_token = JWTHandler.generate_token(
+            user_id, "access", generation, claims
+        )
+        new_refresh_token = JWTHandler.generate_token(
+            user_id, "refresh", generation, claims
+        )
 
         AuthService._add_refresh_token_cookie(response, new_refresh_token)
         return Token(access_token=new_access_token)
 
+    @staticmethod
+    async def revoke_all_sessions(user_id: int, redis: Redis) -> None:
+        """
+        log a user out everywhere: revokes all of its access/refresh tokens
+        (e.g. after changing password, or when an admin suspends the user)
+        NOTE: must be called after any change in `JWTHandler.AUTHZ_CLAIMS`
+        fields of a user (is_active, is_superuser) -> old claims are revoked
+        """
+        await TokenRevocation.revoke_all_user_tokens(user_id, redis)
+
     @staticmethod
     def _add_refresh_token_cookie(response: Response, token: str) -> None:
         utc_now = datetime.now(timezone.utc)
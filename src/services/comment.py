@@ -1,14 +1,17 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 from src.core.exceptions import NotFoundException, BadRequestException
 from src.crud.comment import CommentCrud
 from src.models import CommentStatus
 from src.schemas.comment import CommentOut
+from src.utils.streaming import stream_query
 
 if TYPE_CHECKING:
-    from sqlalchemy.ext.asyncio import AsyncSession
+    from fastapi.responses import StreamingResponse
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+    from src.utils.streaming import ExportFormat
     from src.schemas.comment import CommentCreate, CommentUpdate
 
 
@@ -89,3 +92,17 @@ class CommentService:
     @staticmethod  # NOTE: admin specific service
     async def delete_comment(pk: int, db: AsyncSession) -> None:
         await CommentCrud.delete(pk, db)
+
+    @staticmethod
+    def export_comments(
+        status: Optional[CommentStatus],
+        export_format: ExportFormat,
+        session_maker: async_sessionmaker
+    ) -> StreamingResponse:
+        """ (admin) stream all comments (NDJSON or JSON array) """
+        return stream_query(
+            CommentCrud.export_query(status),
+            session_maker,
+            export_format,
+            filename="comments"
+        )
@@ -0,0 +1,223 @@
+from __future__ import annotations
+import time
+import asyncio
+import logging
+from datetime import timedelta
+from typing import TYPE_CHECKING, Optional
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.core.config import settings
+from src.core.database import AsyncSessionLocal
+from src.core.metrics import metrics
+from src.cache.counters import PostCounterBuffer
+from src.crud import PostCrud
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+
+class CounterService:
+    """
+    write-behind counters of posts ('like_count', 'view_count')
+
+    steps:
+    1-  durable counters (likes): `record()` -> a row of the 'counter_
+        deltas' outbox in the transaction of the change (no row lock on
+        'posts'; nothing is lost or doubled around commit)
+    2-  lossy counters (views): `increment()` -> HINCRBY into the
+        pending-hash of Redis; dropped while Redis is unavailable
+    3-  `CounterFlusher` (every worker, every `COUNTER_FLUSH_INTERVAL_
+        SECONDS`) calls `flush()`
+    4-  flush: the outbox is drained (`PostCrud.apply_outbox_deltas`);
+        then, one flusher at a time (a Redis lock), batches which are
+        claimed before and not finished (crashed flushers) are applied,
+        then the pending-hash is claimed as a new batch and applied
+        (`PostCrud.apply_counter_deltas`)
+
+    metrics: counters.lag_seconds (age of the oldest increment of the
+    last flush), counters.pending (fields left to flush), counters.
+    flushed_rows, counters.flush_ms, counters.recovered_batches,
+    counters.outbox_rows
+    """
+
+    COUNTERS = {"like_count", "view_count"}
+    BATCH_IDS_RETENTION = timedelta(days=1)
+
+    @staticmethod
+    async def record(
+        post_id: int,
+        column: str,
+        amount: int,
+        db: AsyncSession
+    ) -> None:
+        """
+        a counter's change in a unit-of-work (e.g. a new like) -> written
+        behind through the outbox, or (`COUNTER_WRITE_BEHIND=False`)
+        updated in the same transaction
+        """
+        if column not in CounterService.COUNTERS:
+            raise ValueError(f"{column!r} isn't a write-behind counter")
+        if settings.COUNTER_WRITE_BEHIND:
+            await PostCrud.add_counter_delta(post_id, column, amount, db)
+        else:
+            await PostCrud.update_counters(post_id, db, **{column: amount})
+
+    @staticmethod
+    async def increment(
+        post_id: int,
+        column: str,
+        redis: Redis,
+        amount: int = 1
+    ) -> None:
+        """
+        a lossy counter (e.g. a view), out of any transaction
+        NOTE: on a Redis error it's dropped, not written directly: the
+        HINCRBY may be applied even if its reply is lost (-> no doubles)
+        """
+        if column not in CounterService.COUNTERS:
+            raise ValueError(f"{column!r} isn't a write-behind counter")
+        if settings.COUNTER_WRITE_BEHIND:
+            try:
+                await PostCounterBuffer.incr(post_id, column, redis, amount)
+            except RedisError as err:
+                metrics.incr("counters.dropped")
+                logger.warning("counter is dropped: %r", err)
+            return
+        metrics.incr("counters.direct_writes")
+        async with AsyncSessionLocal() as db:
+            await PostCrud.update_counters(post_id, db, **{column: amount})
+            await db.commit()
+
+    @staticmethod
+    async def flush(redis: Redis) -> int:
+        """ -> number of applied batches (0: nothing or locked) """
+        await CounterService._drain_outbox()
+        token = await PostCounterBuffer.acquire_lock(
+            redis, CounterService._lock_ttl()
+        )
+        if token is None:
+            return 0
+        try:
+            applied = 0
+            for batch_id in await PostCounterBuffer.claimed_batches(redis):
+                metrics.incr("counters.recovered_batches")
+                await CounterService._apply_batch(batch_id, redis)
+                applied += 1
+
+            claimed = await PostCounterBuffer.claim_batch(redis)
+            if claimed is not None:
+                batch_id, pending_since = claimed
+                await CounterService._apply_batch(batch_id, redis)
+                applied += 1
+                lag = time.time() - pending_since if pending_since else 0
+                metrics.set_gauge("counters.lag_seconds", round(lag, 3))
+            else:
+                metrics.set_gauge("counters.lag_seconds", 0)
+            metrics.set_gauge(
+                "counters.pending", await PostCounterBuffer.pending_size(redis)
+            )
+            return applied
+        finally:
+            await PostCounterBuffer.release_lock(token, redis)
+
+    @staticmethod
+    async def purge_applied_batches() -> None:
+        async with AsyncSessionLocal() as db:
+            await PostCrud.purge_counter_batches(
+                CounterService.BATCH_IDS_RETENTION, db
+            )
+
+    # ----------------------------------------------------------------
+    # private methods:
+
+    @staticmethod
+    async def _drain_outbox() -> None:
+        """ NOTE: no Redis lock (-> likes are flushed while it's down) """
+        limit = settings.COUNTER_FLUSH_CHUNK_SIZE
+        while True:
+            async with AsyncSessionLocal() as db:
+                drained = await PostCrud.apply_outbox_deltas(db, limit)
+            metrics.incr("counters.outbox_rows", drained)
+            if drained < limit:
+                return
+
+    @staticmethod
+    async def _apply_batch(batch_id: str, redis: Redis) -> None:
+        started_at = time.perf_counter()
+        deltas = await PostCounterBuffer.read_batch(batch_id, redis)
+        async with AsyncSessionLocal() as db:
+            is_applied = await PostCrud.apply_counter_deltas(
+                batch_id, deltas, db, settings.COUNTER_FLUSH_CHUNK_SIZE
+            )
+        # NOTE: a crash here -> the batch is retried, but it's skipped by
+        # database (its ID is committed with it) and then finished
+        await PostCounterBuffer.finish_batch(batch_id, redis)
+        if is_applied:
+            rows = sum(len(rows) for rows in deltas.values())
+            metrics.incr("counters.flushed_rows", rows)
+            metrics.observe(
+                "counters.flush_ms", (time.perf_counter() - started_at) * 1000
+            )
+        else:
+            metrics.incr("counters.skipped_batches")
+
+    @staticmethod
+    def _lock_ttl() -> float:
+        # longer than a normal flush; a crashed flusher's lock expires
+        return max(30.0, settings.COUNTER_FLUSH_INTERVAL_SECONDS * 6)
+
+
+class CounterFlusher:
+    """
+    background loop of a worker which flushes write-behind counters
+    (`CounterService.flush`) -> started/stopped by the app's lifespan
+    """
+
+    PURGE_INTERVAL_SECONDS = 3600
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, redis: Redis) -> None:
+        self._task = asyncio.create_task(self._run(redis))
+
+    async def stop(self, redis: Redis) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        try:  # last flush (nothing is lost without it: it's in Redis)
+            await CounterService.flush(redis)
+        except Exception as err:
+            logger.warning("last flush of counters failed: %r", err)
+
+    # ----------------------------------------------------------------
+    # private methods:
+
+    async def _run(self, redis: Redis) -> None:
+        last_purge = time.monotonic()
+        while True:
+            await asyncio.sleep(settings.COUNTER_FLUSH_INTERVAL_SECONDS)
+            try:
+                await CounterService.flush(redis)
+                if time.monotonic() - last_purge >= (
+                    self.PURGE_INTERVAL_SECONDS
+                ):
+                    await CounterService.purge_applied_batches()
+                    last_purge = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:  # e.g. Redis/database is down
+                metrics.incr("counters.flush_failures")
+                logger.warning("flush of counters failed: %r", err)
+
+
+counter_flusher = CounterFlusher()
@@ -1,25 +1,39 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING, Optional
+import logging
+from typing import TYPE_CHECKING, Literal, Optional
+
+from redis.exceptions import RedisError
 
 from src.core.exceptions import (
     NotFoundException, BadRequestException, InternalServerError
 )
-from src.crud import PostCrud, TagCrud, PostTagAssociation, UserCrud
+from src.core.config import settings
+from src.cache.likes import LikedPostsCache
+from src.cache.post import PostDetailCache
+from src.crud import (
+    PostCrud, PostLikeCrud, TagCrud, PostTagAssociation, UserCrud, UnitOfWork
+)
 from src.models import PostStatus
 from src.schemas.post import PostOut, PostDetailsOut, TagOut, PostUpdateStatus
 from src.schemas.user import UserOut
+from src.services.timeline import TimelineService
+from src.services.counters import CounterService
 
 if TYPE_CHECKING:
     from sqlalchemy.ext.asyncio import AsyncSession
+    from redis.asyncio import Redis
 
     from src.models import User, Post, Tag
     from src.schemas.post import (
         TagsIn,
         PostCreate,
         PostUpdate,
-        ChangePostPrivacy
+        ChangePostPrivacy,
+        LikeUnlikePost
     )
 
+logger = logging.getLogger(__name__)
+
 
 class PostService:
     """ Post and Tag services """
@@ -37,10 +51,12 @@ class PostService:
         if not tags:
             return draft_out, None
         try:
-            # 1: create non-existing tags and return + get existing tags
-            tag_objects = await TagCrud.get_or_create_tags_list(tags, db)
-            # 2: associate all tags with post
-            await PostTagAssociation.associate(post.ID, tag_objects, db)
+            # SAVEPOINT: failing to assign tags doesn't fail the draft itself
+            async with db.begin_nested():
+                # 1: create non-existing tags and return + get existing tags
+                tag_objects = await TagCrud.get_or_create_tags_list(tags, db)
+                # 2: associate all tags with post
+                await PostTagAssociation.associate(post.ID, tag_objects, db)
             tags_out = [
                 TagOut.model_validate(tag) for tag in tag_objects
             ] if tag_objects else None
@@ -53,7 +69,7 @@ class PostService:
 
     @staticmethod
     async def publish(
-        current_user_id: int, pk: int, db: AsyncSession
+        current_user_id: int, pk: int, db: AsyncSession, redis: Redis
     ) -> PostDetailsOut:
         post = await PostCrud.publish_draft(current_user_id, pk, db)
         if post is None:
@@ -65,23 +81,61 @@ class PostService:
 
         author: User = await UserCrud.get_by_id(post.user_id, db)
         tag_objects = await TagCrud.get_tags_of_a_post(post.ID, db)
+        # fan-out into home-timelines (in background, after commit)
+        await UnitOfWork.after_commit(
+            db, lambda: TimelineService.on_post_published(post, redis)
+        )
+
+        return PostService._build_post_details_out(post, author, tag_objects)
 
-        return PostService._build_post_details_out(
-            post, author, tag_objects, True
+    @staticmethod
+    async def get_post_details(
+        viewer_id: int, pk: int, db: AsyncSession, redis: Redis
+    ) -> tuple[str, dict]:
+        """
+        details of a published post (if it's visible to the viewer) ->
+        (ETag, json-compatible `PostDetailsOut`)
+
+        steps:
+        1-  viewer-independent part: from `PostDetailCache`, or from
+            database (then cached under the version which was read)
+        2-  viewer-state (liked/saved) is merged in
+        3-  a view is counted (write-behind; dropped if Redis is down)
+        """
+        version, entry = await PostDetailCache.get(pk, redis)
+        if entry is None:
+            entry = await PostService._load_post_entry(pk, db)
+            if entry is None:
+                raise NotFoundException(f"Post(ID={pk}) is not found!")
+            await PostDetailCache.set(pk, version, entry, redis)
+        if entry["is_private"] and entry["user_id"] != viewer_id:
+            raise NotFoundException(f"Post(ID={pk}) is not found!")
+
+        liked, saved = await PostService.get_viewer_states(
+            [pk], viewer_id, db, redis
         )
+        is_liked, is_saved = pk in liked, pk in saved
+        await CounterService.increment(pk, "view_count", redis)
+        details = {
+            **entry["details"],
+            "liked_by_viewer": is_liked,
+            "saved_by_viewer": is_saved,
+        }
+        return PostDetailCache.etag(entry, is_liked, is_saved), details
 
     @staticmethod
     async def update_post_fields(
         current_user_id: int,
         pk: int,
         data: PostUpdate,
-        db: AsyncSession
+        db: AsyncSession,
+        redis: Redis
     ) -> PostOut:
         data = data.model_dump(exclude_none=True)
         if not data:
             raise BadRequestException("Empty field values to update.")
 
-        post = await PostCrud.update(current_user_id, pk, data, db)
+        post = await PostCrud.update(current_user_id, pk, data, db, redis)
         if post is None:
             raise NotFoundException(
                 f"Requester(pk='{current_user_id}') is not owner of "
@@ -92,36 +146,43 @@ class PostService:
 
     @staticmethod
     async def update_tags_of_post(
-        current_user_id: int, post_id: int, tags: TagsIn, db: AsyncSession,
+        current_user_id: int,
+        post_id: int,
+        tags: TagsIn,
+        db: AsyncSession,
+        redis: Redis
     ) -> list[TagOut]:
         tags = {tag.lower() for tag in tags.tags}
         if not tags:
             raise BadRequestException("Empty field values to update.")
 
-        async with db.begin():
-            post = await PostCrud.get_by_id(post_id, db)
-            if not post.user_id == current_user_id:  # check ownership
-                raise NotFoundException(
-                    f"Requester(pk='{current_user_id}') is not owner of "
-                    f"any Post with pk='{post_id}'"
-                )
-            # check status
-            if post.status == PostStatus.RJ or post.status == PostStatus.DL:
-                raise BadRequestException("invalid operation.")
-                # reason: trying to update tags for DELETED or REJECTED post
-            try:
-                # 1: dissociate previous tags (if there is any)
-                await PostTagAssociation.dissociate(post_id, db)
-                # 2: create non-existing tags and return + get existing tags
-                tag_objects = await TagCrud.get_or_create_tags_list(tags, db)
-                # 3: associate all tags with post
-                await PostTagAssociation.associate(post_id, tag_objects, db)
-            except InternalServerError as err:
-                raise InternalServerError(
-                    "Failed to update tags (nothing changed)"
-                ) from err
-                # ToDo; log the reason (err.message)
+        # NOTE: all steps are done in the request's transaction (UnitOfWork)
+        post = await PostCrud.get_by_id(post_id, db)
+        if not post.user_id == current_user_id:  # check ownership
+            raise NotFoundException(
+                f"Requester(pk='{current_user_id}') is not owner of "
+                f"any Post with pk='{post_id}'"
+            )
+        # check status
+        if post.status == PostStatus.RJ or post.status == PostStatus.DL:
+            raise BadRequestException("invalid operation.")
+            # reason: trying to update tags for DELETED or REJECTED post
+        try:
+            # 1: dissociate previous tags (if there is any)
+            await PostTagAssociation.dissociate(post_id, db)
+            # 2: create non-existing tags and return + get existing tags
+            tag_objects = await TagCrud.get_or_create_tags_list(tags, db)
+            # 3: associate all tags with post
+            await PostTagAssociation.associate(post_id, tag_objects, db)
+        except InternalServerError as err:
+            raise InternalServerError(
+                "Failed to update tags (nothing changed)"
+            ) from err
+            # ToDo; log the reason (err.message)
 
+        await UnitOfWork.after_commit(
+            db, lambda: PostDetailCache.invalidate(post_id, redis)
+        )
         return [TagOut.model_validate(tag) for tag in tag_objects]
 
     @staticmethod
@@ -129,10 +190,11 @@ class PostService:
         current_user_id: int,
         pk: int,
         data: ChangePostPrivacy,
-        db: AsyncSession
+        db: AsyncSession,
+        redis: Redis
     ) -> bool:
         privacy_statement = await PostCrud.update_privacy(
-            current_user_id, pk, data.model_dump(), db
+            current_user_id, pk, data.model_dump(), db, redis
         )
         if privacy_statement is None:
             raise NotFoundException(
@@ -142,10 +204,10 @@ class PostService:
         return privacy_statement
 
     @staticmethod  # NOTE: admin specific service
-    async def reject_post(pk: int, db: AsyncSession) -> None:
+    async def reject_post(pk: int, db: AsyncSession, redis: Redis) -> None:
         data = PostUpdateStatus(status=PostStatus.RJ)
         result = await PostCrud.update_status(
-            pk, data, db, operation_is_requested_by="admin"
+            pk, data, db, redis, operation_is_requested_by="admin"
         )
         if result is None:
             raise BadRequestException(
@@ -153,9 +215,11 @@ class PostService:
             )
 
     @staticmethod  # NOTE: admin specific service
-    async def publish_rejected_post(pk: int, db: AsyncSession) -> None:
+    async def publish_rejected_post(
+        pk: int, db: AsyncSession, redis: Redis
+    ) -> None:
         data = PostUpdateStatus(status=PostStatus.PB)
-        result = await PostCrud.update_status(pk, data, db, "admin")
+        result = await PostCrud.update_status(pk, data, db, redis, "admin")
         if result is None:
             raise BadRequestException(
                 "invalid operation. only 'rejected' posts can be republished!"
@@ -163,11 +227,11 @@ class PostService:
 
     @staticmethod
     async def delete_post_at_user_request(
-        current_user_id: int, pk: int, db: AsyncSession
+        current_user_id: int, pk: int, db: AsyncSession, redis: Redis
     ) -> None:
         data = PostUpdateStatus(status=PostStatus.DL)
         result = await PostCrud.update_status(
-            pk, data, db, "author", current_user_id
+            pk, data, db, redis, "author", current_user_id
         )
         if result is None:
             raise NotFoundException(
@@ -176,27 +240,152 @@ class PostService:
             )
 
     @staticmethod  # NOTE: admin specific service
-    async def delete_post(pk: int, db: AsyncSession) -> None:
-        await PostCrud.delete(pk, db)
+    async def delete_post(pk: int, db: AsyncSession, redis: Redis) -> None:
+        await PostCrud.delete(pk, db, redis)
+
+    @staticmethod
+    async def like(
+        current_user_id: int,
+        data: LikeUnlikePost,
+        db: AsyncSession,
+        redis: Redis
+    ) -> Literal[1, 0]:
+        result = await PostLikeCrud.create(current_user_id, data, db)
+        if result == 0:
+            liked = await PostLikeCrud.liked_among(
+                [data.post_id], current_user_id, db
+            )
+            if not liked:  # not "already liked" -> no (visible) post
+                raise NotFoundException(
+                    f"Post(ID={data.post_id}) is not found!"
+                )
+            return result
+        await CounterService.record(data.post_id, "like_count", 1, db)
+        await UnitOfWork.after_commit(
+            db, lambda: PostService._update_liked_cache(
+                current_user_id, data.post_id, True, redis
+            )
+        )
+        return result
+
+    @staticmethod
+    async def unlike(
+        current_user_id: int,
+        data: LikeUnlikePost,
+        db: AsyncSession,
+        redis: Redis
+    ) -> Literal[1, 0]:
+        result = await PostLikeCrud.delete(current_user_id, data, db)
+        if result == 1:
+            await CounterService.record(data.post_id, "like_count", -1, db)
+            await UnitOfWork.after_commit(
+                db, lambda: PostService._update_liked_cache(
+                    current_user_id, data.post_id, False, redis
+                )
+            )
+        return result
+
+    @staticmethod
+    async def get_viewer_states(
+        post_ids: list[int], viewer_id: int, db: AsyncSession, redis: Redis
+    ) -> tuple[set[int], set[int]]:
+        """
+        (batched) viewer-state of a page of posts -> (liked, saved):
+        IDs of posts which are liked / saved by the viewer (liked: one
+        SMISMEMBER of `LikedPostsCache`, saved: one query for the page)
+        """
+        liked = await PostService._liked_among(post_ids, viewer_id, db, redis)
+        saved = await PostCrud.saved_among(post_ids, viewer_id, db)
+        return liked, saved
 
     # ----------------------------------------------------------------
 
+    @staticmethod
+    async def _liked_among(
+        post_ids: list[int], viewer_id: int, db: AsyncSession, redis: Redis
+    ) -> set[int]:
+        if not post_ids:
+            return set()
+        try:
+            liked = await LikedPostsCache.lookup(viewer_id, post_ids, redis)
+        except RedisError as err:
+            logger.warning("liked-posts cache isn't available: %r", err)
+            return await PostLikeCrud.liked_among(post_ids, viewer_id, db)
+        if liked == LikedPostsCache.TOO_LARGE:
+            return await PostLikeCrud.liked_among(post_ids, viewer_id, db)
+        if liked != LikedPostsCache.MISSING:
+            return liked
+
+        # build the set of the viewer (once per TTL) and answer from it
+        # NOTE: the guard is taken before reading -> a like/unlike which
+        # is missed by this read cancels the build
+        try:
+            token = await LikedPostsCache.start_build(viewer_id, redis)
+        except RedisError as err:
+            logger.warning("liked-posts cache isn't built: %r", err)
+            token = None
+        max_size = settings.LIKED_POSTS_CACHE_MAX_SIZE
+        liked_ids = await PostLikeCrud.retrieve_liked_ids(
+            viewer_id, db, limit=max_size + 1
+        )
+        is_too_large = len(liked_ids) > max_size
+        if token is not None:
+            try:
+                await LikedPostsCache.build(
+                    viewer_id, None if is_too_large else liked_ids, token,
+                    redis
+                )
+            except RedisError as err:
+                logger.warning("liked-posts cache isn't built: %r", err)
+        if is_too_large:
+            return await PostLikeCrud.liked_among(post_ids, viewer_id, db)
+        return set(liked_ids).intersection(post_ids)
+
+    @staticmethod
+    async def _load_post_entry(pk: int, db: AsyncSession) -> Optional[dict]:
+        """ a `PostDetailCache` entry of a published post (2 queries) """
+        row = await PostCrud.get_published_with_author(pk, db)
+        if row is None:
+            return None
+        post, author = row
+        tag_objects = await TagCrud.get_tags_of_a_post(pk, db)
+        details = PostService._build_post_details_out(
+            post, author, tag_objects
+        ).model_dump(mode="json", exclude=PostDetailCache.VIEWER_FIELDS)
+        return PostDetailCache.make_entry(
+            details, post.user_id, post.is_private
+        )
+
+    @staticmethod
+    async def _update_liked_cache(
+        user_id: int, post_id: int, is_liked: bool, redis: Redis
+    ) -> None:
+        """
+        (after commit) a failure deletes the set (rebuilt on next lookup);
+        if that fails too, it's fixed when the set expires (fixed TTL)
+        """
+        try:
+            if is_liked:
+                await LikedPostsCache.add(user_id, post_id, redis)
+            else:
+                await LikedPostsCache.remove(user_id, post_id, redis)
+        except RedisError as err:
+            logger.warning("liked-posts cache isn't updated: %r", err)
+            try:
+                await LikedPostsCache.invalidate(user_id, redis)
+            except RedisError as err_:
+                logger.warning("liked-posts cache isn't deleted: %r", err_)
+
     @staticmethod
     def _build_post_details_out(
         post: Post,
         author: User,
         tags: Optional[list[Tag]] = None,
-        is_first_published: bool = False
+        is_liked: bool = False,
+        is_saved: bool = False
     ) -> PostDetailsOut:
         tags_out = [TagOut.model_validate(t) for t in tags] if tags else None
         user_out = UserOut.model_validate(author)
-        if is_first_published:
-            cm_count, like_count, is_liked, is_saved = 0, 0, False, False
-        else:
-            cm_count = 0  # ToDo: implement later
-            like_count = 0  # ToDo: implement later
-            is_liked = False  # ToDo: implement later
-            is_saved = False  # ToDo: implement later
 
         return PostDetailsOut(
             ID=post.ID,
@@ -208,8 +397,9 @@ class PostService:
             published_at=post.published_at,
             tags=tags_out,
             user=user_out,
-            comment_count=cm_count,
-            like_count=like_count,
+            comment_count=post.comment_count,
+            like_count=post.like_count,
+            view_count=post.view_count,
             liked_by_viewer=is_liked,
             saved_by_viewer=is_saved
         )
@@ -0,0 +1,292 @@
+from __future__ import annotations
+import logging
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional
+
+from redis.exceptions import RedisError
+from sqlalchemy import select, literal
+
+from src.core.config import settings
+from src.core.database import AsyncSessionLocal
+from src.core.metrics import metrics
+from src.cache.timeline import Timeline
+from src.crud import PostCrud, FollowCrud
+from src.schemas.GENERAL import Page
+from src.schemas.post import PostListOut
+from src.schemas.user import UserOut
+from src.utils.background import run_in_background
+
+if TYPE_CHECKING:
+    from sqlalchemy import Select
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from redis.asyncio import Redis
+
+    from src.models import Post
+    from src.utils.pagination import PageParams
+
+logger = logging.getLogger(__name__)
+
+
+class TimelineService:
+    """
+    home-timeline (feed) services: hybrid fan-out
+
+    steps:
+    1-  publish -> the post ID is pushed into timelines (Redis sorted-sets:
+        `Timeline`) of the author and all followers, in background batches
+        (only timelines which exist; inactive users' ones are expired)
+    2-  authors with `TIMELINE_CELEBRITY_FOLLOWERS` followers or more
+        ("celebrities") aren't fanned-out: their posts are pulled from
+        database when a follower reads the feed, and merged
+    3-  feed -> a page of the timeline (+ celebrities' posts), hydrated by
+        one query (deleted/private/rejected posts are dropped & repaired)
+    4-  follow / unfollow -> recent posts of that user are added to /
+        removed from the follower's timeline (backfill / repair jobs);
+        a demoted celebrity's recent posts are backfilled into timelines
+        of its followers (on its next fan-out)
+    5-  a missing (expired) timeline is rebuilt from database on read;
+        while Redis is unavailable, the feed is read from database
+
+    cursor of feed pages: (score, post_id) of the last post (score:
+    published_at in microseconds -> `Timeline.score()`)
+    """
+
+    @staticmethod
+    async def get_feed(
+        viewer_id: int, page: PageParams, db: AsyncSession, redis: Redis
+    ) -> Page[PostListOut]:
+        before = page.after(int, int)
+        try:
+            entries = await TimelineService._read_entries(
+                viewer_id, page.fetch_size, before, db, redis
+            )
+            from_redis = True
+        except RedisError as err:
+            metrics.incr("timeline.db_fallbacks")
+            logger.warning("feed is read from database: %r", err)
+            entries = await TimelineService._pull(
+                TimelineService._authors_query(viewer_id),
+                viewer_id, page.fetch_size, before, db
+            )
+            from_redis = False
+
+        entries, next_cursor = page.trim(
+            entries, key=lambda entry: (entry[1], entry[0])
+        )
+        rows = await PostCrud.retrieve_list_by_ids(
+            [post_id for post_id, _ in entries], viewer_id, db
+        )
+        missing = [post_id for post_id, _ in entries if post_id not in rows]
+        if missing and from_redis:
+            await TimelineService._repair(viewer_id, missing, redis)
+        saved = await PostCrud.saved_among(rows, viewer_id, db)
+        items = [
+            TimelineService._build_post_list_out(
+                rows[post_id], post_id in saved
+            )
+            for post_id, _ in entries if post_id in rows
+        ]
+        return Page[PostListOut](
+            items=items,
+            next_cursor=next_cursor,
+            next=page.next_url(next_cursor)
+        )
+
+    @staticmethod
+    async def on_post_published(post: Post, redis: Redis) -> None:
+        """ (after commit) schedule the fan-out of a published post """
+        run_in_background(
+            TimelineService._fan_out(
+                post.ID, post.user_id, post.published_at, post.is_private,
+                redis
+            ),
+            name=f"timeline-fan-out:{post.ID}"
+        )
+
+    @staticmethod
+    async def on_follow(
+        follower_id: int, followed_id: int, redis: Redis
+    ) -> None:
+        """ (after commit) schedule backfill of the follower's timeline """
+        run_in_background(
+            TimelineService._backfill(follower_id, followed_id, redis),
+            name=f"timeline-backfill:{follower_id}:{followed_id}"
+        )
+
+    @staticmethod
+    async def on_unfollow(
+        follower_id: int, followed_id: int, redis: Redis
+    ) -> None:
+        """ (after commit) schedule cleanup of the follower's timeline """
+        run_in_background(
+            TimelineService._remove_author(follower_id, followed_id, redis),
+            name=f"timeline-cleanup:{follower_id}:{followed_id}"
+        )
+
+    @staticmethod
+    async def rebuild(user_id: int, db: AsyncSession, redis: Redis) -> None:
+        """ (re)build a timeline from database (missing or repair) """
+        posts = await PostCrud.retrieve_published_ids(
+            TimelineService._authors_query(user_id),
+            user_id, db, settings.TIMELINE_MAX_SIZE
+        )
+        await Timeline.build(user_id, posts, redis)
+
+    # ----------------------------------------------------------------
+    # private methods:
+
+    @staticmethod
+    async def _read_entries(
+        viewer_id: int,
+        limit: int,
+        before: Optional[tuple[int, int]],
+        db: AsyncSession,
+        redis: Redis
+    ) -> list[tuple[int, int]]:  # [(post_id, score), ...] newest first
+        entries = await Timeline.read_page(viewer_id, limit, before, redis)
+        if entries is None:  # never built or expired
+            await TimelineService.rebuild(viewer_id, db, redis)
+            entries = await Timeline.read_page(
+                viewer_id, limit, before, redis
+            ) or []
+
+        celebrities = await Timeline.get_celebrities(redis)
+        celebrities.discard(viewer_id)  # own posts are pushed always
+        followed = await FollowCrud.retrieve_followed_among(
+            viewer_id, celebrities, db
+        )
+        if not followed:
+            return entries
+        pulled = await TimelineService._pull(
+            followed, viewer_id, limit, before, db
+        )
+        merged = dict(entries)
+        merged.update(pulled)  # same post in both -> same score
+        return sorted(
+            merged.items(), key=lambda item: (item[1], item[0]), reverse=True
+        )[:limit]
+
+    @staticmethod
+    async def _pull(
+        author_ids: list[int] | Select,
+        viewer_id: int,
+        limit: int,
+        before: Optional[tuple[int, int]],
+        db: AsyncSession
+    ) -> list[tuple[int, int]]:
+        """ published posts of authors from database, as timeline entries """
+        after = None
+        if before is not None:
+            after = (Timeline.published_at(before[0]), before[1])
+        rows = await PostCrud.retrieve_published_ids(
+            author_ids, viewer_id, db, limit, after
+        )
+        return [
+            (post_id, Timeline.score(published_at))
+            for post_id, published_at in rows
+        ]
+
+    @staticmethod
+    async def _fan_out(
+        post_id: int,
+        author_id: int,
+        published_at: datetime,
+        is_private: bool,
+        redis: Redis
+    ) -> None:
+        await Timeline.push([author_id], post_id, published_at, redis)
+        if is_private:
+            return
+        threshold = settings.TIMELINE_CELEBRITY_FOLLOWERS
+        batch_size = settings.TIMELINE_FANOUT_BATCH_SIZE
+        async with AsyncSessionLocal() as db:
+            followers = await FollowCrud.count_followers(
+                author_id, db, up_to=threshold
+            )
+            if followers >= threshold:
+                await Timeline.set_celebrity(author_id, True, redis)
+                metrics.incr("timeline.celebrity_posts")
+                return
+            posts = [(post_id, published_at)]
+            is_demoted = await Timeline.is_celebrity(author_id, redis)
+            if is_demoted:
+                # its posts were pulled on read -> recent ones (public) are
+                # backfilled first, like a new follow; then it's removed
+                # from celebrities (no gap in followers' feeds)
+                metrics.incr("timeline.celebrity_demotions")
+                posts += await PostCrud.retrieve_published_ids(
+                    [author_id], 0, db, settings.TIMELINE_BACKFILL_POSTS
+                )
+            after = None
+            while True:
+                rows = await FollowCrud.retrieve_follower_ids(
+                    author_id, db, batch_size, after
+                )
+                follower_ids = [follower_id for follower_id, _ in rows]
+                for pk, post_published_at in posts:
+                    await Timeline.push(
+                        follower_ids, pk, post_published_at, redis
+                    )
+                if len(rows) < batch_size:
+                    break
+                last_follower_id, last_follow_at = rows[-1]
+                after = (last_follow_at, last_follower_id)
+        if is_demoted:
+            await Timeline.set_celebrity(author_id, False, redis)
+
+    @staticmethod
+    async def _backfill(
+        follower_id: int, followed_id: int, redis: Redis
+    ) -> None:
+        if followed_id in await Timeline.get_celebrities(redis):
+            return  # pulled on read
+        async with AsyncSessionLocal() as db:
+            posts = await PostCrud.retrieve_published_ids(
+                [followed_id], follower_id, db,
+                settings.TIMELINE_BACKFILL_POSTS
+            )
+        await Timeline.add_posts(follower_id, posts, redis)
+
+    @staticmethod
+    async def _remove_author(
+        follower_id: int, followed_id: int, redis: Redis
+    ) -> None:
+        async with AsyncSessionLocal() as db:
+            posts = await PostCrud.retrieve_published_ids(
+                [followed_id], follower_id, db, settings.TIMELINE_MAX_SIZE
+            )
+        await Timeline.remove_posts(
+            follower_id, [post_id for post_id, _ in posts], redis
+        )
+
+    @staticmethod
+    async def _repair(
+        viewer_id: int, post_ids: list[int], redis: Redis
+    ) -> None:
+        """ drop posts which aren't visible anymore from a timeline """
+        metrics.incr("timeline.repaired_entries", len(post_ids))
+        try:
+            await Timeline.remove_posts(viewer_id, post_ids, redis)
+        except RedisError as err:  # repaired on the next read
+            logger.warning("timeline repair failed: %r", err)
+
+    @staticmethod
+    def _authors_query(user_id: int) -> Select:
+        """ followings of a user + the user itself """
+        return FollowCrud.followings_ids_query(user_id).union_all(
+            select(literal(user_id))
+        )
+
+    @staticmethod
+    def _build_post_list_out(row, is_saved: bool) -> PostListOut:
+        return PostListOut(
+            ID=row.ID,
+            title=row.title,
+            reading_time=row.reading_time,
+            created_at=row.created_at,
+            published_at=row.published_at,
+            user=UserOut(ID=row.user_id, username=row.username),
+            like_count=row.like_count,
+            comment_count=row.comment_count,
+            saved_by_viewer=is_saved
+        )
@@ -1,23 +1,32 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING, Literal
+from datetime import datetime
+from typing import TYPE_CHECKING, Literal, Callable, Awaitable
 
 from src.core.security import PasswordHandler
 from src.core.exceptions import (
-    InternalServerError,
     ForbiddenException,
     BadRequestException,
     NotFoundException
 )
-from src.crud import UserCrud, FollowCrud, ProfileCrud, LinkCrud
+from src.crud import UserCrud, FollowCrud, ProfileCrud, LinkCrud, UnitOfWork
+from src.services.authentication import AuthService
+from src.services.timeline import TimelineService
 from src.schemas.user import (
     UserOut, SetPassword, FollowerOrFollowingListOut
 )
 from src.schemas.profile import ProfileOutAfterUpdate, LinkOut
+from src.schemas.admin.user import UserListOut
+from src.schemas.GENERAL import Page
+from src.utils.streaming import stream_query
 
 if TYPE_CHECKING:
-    from sqlalchemy.ext.asyncio import AsyncSession
+    from fastapi.responses import StreamingResponse
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+    from redis.asyncio import Redis
 
     from src.models import User
+    from src.utils.pagination import PageParams
+    from src.utils.streaming import ExportFormat
     from src.schemas.user import (
         UserCreate,
         UserUpdate,
@@ -34,38 +43,48 @@ class UserService:
     (interacts with `UserCrud`, `ProfileCrud` & `LinkCrud`)
     NOTE:
     _ the method `register_user()` creates both `User` and `Profile` object
+      (in one transaction -> check `UnitOfWork`)
     _ the method `delete_user()` deletes `User` (and then its related `Profile`
       would be deleted too)
     """
 
     @staticmethod
     async def register_user(data: UserCreate, db: AsyncSession) -> None:
+        # NOTE: if creating profile fails, the user isn't created either
+        # (both are committed together at the end of request)
         user = await UserCrud.create(data, db)
-        try:
-            await ProfileCrud.create(user_id=user.ID, db=db)
-        except InternalServerError as err:
-            await UserCrud.delete(user, db)
-            msg = err.message + " created-user was deleted too."
-            raise InternalServerError(msg) from err
+        await ProfileCrud.create(user_id=user.ID, db=db)
 
     @staticmethod
     async def update_user(
-        current_user: User, data: UserUpdate, db: AsyncSession
+        current_user: User, data: UserUpdate, redis: Redis, db: AsyncSession
     ) -> UserOut:
-        user = await UserCrud.update(current_user, data, db)
+        user = await UserCrud.update(current_user, data, db, redis)
         return UserOut.model_validate(user)
 
     @staticmethod
     async def update_password(
-        current_user: User, data: UpdatePassword, db: AsyncSession
+        current_user: User,
+        data: UpdatePassword,
+        redis: Redis,
+        db: AsyncSession
     ) -> None:
-        is_old_password_verified = PasswordHandler.verify_password(
-            data.old_password, current_user.password
+        # NOTE: 'password' isn't loaded if user-obj is from UserCache
+        password_hash = await current_user.awaitable_attrs.password
+        is_old_password_verified = await PasswordHandler.verify_password(
+            data.old_password, password_hash
         )
         if not is_old_password_verified:
             raise BadRequestException("Old password is invalid.")
         data = SetPassword(**data.model_dump())
-        await UserCrud.set_new_password(current_user, data, db)
+        await UserCrud.set_new_password(current_user, data, db, redis)
+        # tokens generated with the old password mustn't be useable anymore
+        # NOTE: after commit -> a failed commit doesn't log the user out
+        # while its password is unchanged
+        user_id = current_user.ID
+        await UnitOfWork.after_commit(
+            db, lambda: AuthService.revoke_all_sessions(user_id, redis)
+        )
 
     @staticmethod
     async def reset_password_by_email(
@@ -111,42 +130,113 @@ class UserService:
 
     @staticmethod
     async def follow(
-        current_user_id: int, data: FollowCreate, db: AsyncSession
+        current_user_id: int,
+        data: FollowCreate,
+        db: AsyncSession,
+        redis: Redis
     ) -> Literal[1, 0]:
         if current_user_id == data.intended_user_id:
             raise BadRequestException("impossible request...!")
-        return await FollowCrud.create(current_user_id, data, db)
+        result = await FollowCrud.create(current_user_id, data, db)
+        if result == 1:  # backfill home-timeline (in background)
+            await UnitOfWork.after_commit(
+                db, lambda: TimelineService.on_follow(
+                    current_user_id, data.intended_user_id, redis
+                )
+            )
+        return result
 
     @staticmethod
     async def unfollow_or_remove(
         current_user_id: int,
         data: UnfollowOrRemoveFollowerSchema,
-        db: AsyncSession
+        db: AsyncSession,
+        redis: Redis
     ) -> Literal[1, 0]:
         if current_user_id == data.intended_user_id:
             raise BadRequestException("impossible request...!")
-        return await FollowCrud.delete(current_user_id, data, db)
+        result = await FollowCrud.delete(current_user_id, data, db)
+        if result == 1:  # clean home-timeline of follower (in background)
+            if data.operation_type == "unfollow":
+                follower_id, followed_id = (
+                    current_user_id, data.intended_user_id
+                )
+            else:  # "remove"
+                follower_id, followed_id = (
+                    data.intended_user_id, current_user_id
+                )
+            await UnitOfWork.after_commit(
+                db, lambda: TimelineService.on_unfollow(
+                    follower_id, followed_id, redis
+                )
+            )
+        return result
 
     @staticmethod
     async def get_followers_list(
-        user_id: int, db: AsyncSession
+        user_id: int, page: PageParams, db: AsyncSession
     ) -> FollowerOrFollowingListOut:
-        result = await FollowCrud.retrieve_followers(user_id, db)
-        return FollowerOrFollowingListOut(users_list=list(
-            map(lambda row: UserOut(ID=row[0], username=row[1]), result)
-        ))
+        return await UserService._get_follow_list(
+            FollowCrud.retrieve_followers, user_id, page, db
+        )
 
     @staticmethod
     async def get_followings_list(
-        user_id: int, db: AsyncSession
+        user_id: int, page: PageParams, db: AsyncSession
     ) -> FollowerOrFollowingListOut:
-        result = await FollowCrud.retrieve_followings(user_id, db)
-        return FollowerOrFollowingListOut(users_list=list(
-            map(lambda row: UserOut(ID=row[0], username=row[1]), result)
-        ))
+        return await UserService._get_follow_list(
+            FollowCrud.retrieve_followings, user_id, page, db
+        )
+
+    @staticmethod
+    def export_followers(
+        user_id: int,
+        export_format: ExportFormat,
+        session_maker: async_sessionmaker
+    ) -> StreamingResponse:
+        """ stream the full followers-list (NDJSON or JSON array) """
+        return stream_query(
+            FollowCrud.followers_export_query(user_id),
+            session_maker,
+            export_format,
+            filename=f"followers-{user_id}"
+        )
+
+    @staticmethod
+    async def get_users_list(
+        page: PageParams, db: AsyncSession
+    ) -> Page[UserListOut]:
+        """ (admin) all users, newest first """
+        users = await UserCrud.retrieve_list(
+            db, page.fetch_size, page.after(int)
+        )
+        users, next_cursor = page.trim(users, key=lambda user: (user.ID,))
+        return Page[UserListOut](
+            items=[UserListOut.model_validate(user) for user in users],
+            next_cursor=next_cursor,
+            next=page.next_url(next_cursor)
+        )
 
     # @staticmethod
     # async def delete_user(current_user: User, db: AsyncSession) -> None:
     #     await UserCrud.delete(current_user, db)
     #     # user's related Profile would be deleted too (ondelete="CASCADE")
     # there's a big bug here :)))) when db tries to delete User (fix it later)
+
+    # ----------------------------------------------------------------
+
+    @staticmethod
+    async def _get_follow_list(
+        retrieve: Callable[..., Awaitable[list[tuple[int, str, datetime]]]],
+        user_id: int,
+        page: PageParams,
+        db: AsyncSession
+    ) -> FollowerOrFollowingListOut:
+        after = page.after(datetime, int)
+        rows = await retrieve(user_id, db, page.fetch_size, after)
+        rows, next_cursor = page.trim(rows, key=lambda row: (row[2], row[0]))
+        return FollowerOrFollowingListOut(
+            users_list=[UserOut(ID=row[0], username=row[1]) for row in rows],
+            next_cursor=next_cursor,
+            next=page.next_url(next_cursor)
+        )
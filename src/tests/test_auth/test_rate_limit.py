@@ -0,0 +1,83 @@
+""" `LoginRateLimiter` (GCRA in an in-memory Redis & local fallback) """
+
+import pytest
+from redis.exceptions import RedisError
+
+from src.core.config import settings
+from src.core.exceptions import TooManyRequestsException
+from src.auth.rate_limit import LoginRateLimiter
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+def limits(monkeypatch):
+    monkeypatch.setattr(settings, "LOGIN_RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "LOGIN_RATE_PERIOD_SECONDS", 60)
+    monkeypatch.setattr(settings, "LOGIN_RATE_PER_IDENTIFIER", 3)
+    monkeypatch.setattr(settings, "LOGIN_RATE_PER_IP", 5)
+    monkeypatch.setattr(LoginRateLimiter, "_local_tats", {})
+
+
+@pytest.fixture
+def redis_is_down(monkeypatch):
+    async def fail(*args):
+        raise RedisError("connection refused")
+
+    monkeypatch.setattr(LoginRateLimiter, "_check_in_redis", fail)
+
+
+async def attempts(count: int, identifier: str, ip: str, redis) -> None:
+    for _ in range(count):
+        await LoginRateLimiter.check(identifier, ip, redis)
+
+
+async def test_burst_up_to_the_rate_then_rejected(redis):
+    await attempts(3, "alice", "10.0.0.1", redis)
+
+    with pytest.raises(TooManyRequestsException) as exc_info:
+        await LoginRateLimiter.check("alice", "10.0.0.1", redis)
+    # one attempt per 20 seconds is emitted -> retry after ~20 seconds
+    assert 0 < exc_info.value.retry_after <= 20
+
+
+async def test_identifier_is_normalized(redis):
+    await attempts(3, "Alice ", "10.0.0.1", redis)
+
+    with pytest.raises(TooManyRequestsException):
+        await LoginRateLimiter.check("alice", "10.0.0.2", redis)
+
+
+async def test_limit_per_ip_across_identifiers(redis):
+    for i in range(5):
+        await LoginRateLimiter.check(f"user{i}", "10.0.0.1", redis)
+
+    with pytest.raises(TooManyRequestsException):
+        await LoginRateLimiter.check("user9", "10.0.0.1", redis)
+    await LoginRateLimiter.check("user9", "10.0.0.2", redis)  # other IP
+
+
+async def test_rejected_attempt_isnt_counted_for_other_keys(redis):
+    await attempts(3, "bob", "10.0.0.1", redis)
+    with pytest.raises(TooManyRequestsException):  # by identifier only
+        await LoginRateLimiter.check("bob", "10.0.0.1", redis)
+
+    # 2 attempts are left for the IP (the rejected one isn't counted)
+    await attempts(2, "carol", "10.0.0.1", redis)
+    with pytest.raises(TooManyRequestsException):
+        await LoginRateLimiter.check("carol", "10.0.0.1", redis)
+
+
+async def test_local_fallback_while_redis_is_down(redis, redis_is_down):
+    await attempts(3, "alice", "10.0.0.1", redis)
+
+    with pytest.raises(TooManyRequestsException) as exc_info:
+        await LoginRateLimiter.check("alice", "10.0.0.1", redis)
+    assert 0 < exc_info.value.retry_after <= 20
+
+
+async def test_disabled_limiter(redis, monkeypatch):
+    monkeypatch.setattr(settings, "LOGIN_RATE_LIMIT_ENABLED", False)
+
+    await attempts(10, "alice", "10.0.0.1", redis)
@@ -0,0 +1,88 @@
+""" `VerifiedTokenCache` (in-process cache of verified tokens) """
+
+import time
+
+from src.auth.token_cache import VerifiedTokenCache
+
+
+def payload(jti: str, expires_in: float = 600) -> dict:
+    return {"jti": jti, "user_id": 1, "exp": time.time() + expires_in}
+
+
+def test_hit_and_miss():
+    cache = VerifiedTokenCache(max_size=10, revocation_recheck_seconds=60)
+    cache.put("token-a", payload("a"))
+
+    cached, needs_recheck = cache.get("token-a")
+
+    assert cached["jti"] == "a" and not needs_recheck
+    assert cache.get("token-b") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cached_payload_is_a_copy():
+    cache = VerifiedTokenCache(max_size=10, revocation_recheck_seconds=60)
+    cache.put("token-a", payload("a"))
+
+    cache.get("token-a")[0]["user_id"] = 2
+
+    assert cache.get("token-a")[0]["user_id"] == 1
+
+
+def test_expired_token_isnt_served():
+    cache = VerifiedTokenCache(max_size=10, revocation_recheck_seconds=60)
+    cache.put("token-a", payload("a", expires_in=-1))
+
+    assert cache.get("token-a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_revocation_recheck_is_due_after_its_interval():
+    cache = VerifiedTokenCache(max_size=10, revocation_recheck_seconds=0)
+    cache.put("token-a", payload("a"))
+
+    assert cache.get("token-a")[1] is True
+
+
+def test_mark_checked_resets_the_recheck_timer(monkeypatch):
+    cache = VerifiedTokenCache(max_size=10, revocation_recheck_seconds=30)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    cache.put("token-a", payload("a"))
+    monkeypatch.setattr(time, "monotonic", lambda: now + 31)
+    assert cache.get("token-a")[1] is True
+
+    cache.mark_checked("token-a")
+
+    assert cache.get("token-a")[1] is False
+
+
+def test_least_recently_used_is_evicted():
+    cache = VerifiedTokenCache(max_size=2, revocation_recheck_seconds=60)
+    cache.put("token-a", payload("a"))
+    cache.put("token-b", payload("b"))
+    cache.get("token-a")  # -> "b" is the least recently used
+
+    cache.put("token-c", payload("c"))
+
+    assert cache.get("token-b") is None
+    assert cache.get("token-a") is not None
+    assert cache.get("token-c") is not None
+
+
+def test_discard_jti_drops_a_revoked_token():
+    cache = VerifiedTokenCache(max_size=10, revocation_recheck_seconds=60)
+    cache.put("token-a", payload("a"))
+
+    cache.discard_jti("a")
+    cache.discard_jti("unknown")
+
+    assert cache.get("token-a") is None
+
+
+def test_disabled_cache():
+    cache = VerifiedTokenCache(max_size=0, revocation_recheck_seconds=60)
+    cache.put("token-a", payload("a"))
+
+    assert not cache.enabled
+    assert cache.get("token-a") is None
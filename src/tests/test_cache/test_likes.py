@@ -0,0 +1,90 @@
+""" `LikedPostsCache` (in-memory Redis) """
+
+import pytest
+
+from src.core.config import settings
+from src.cache.likes import LikedPostsCache
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_build_and_lookup(redis):
+    token = await LikedPostsCache.start_build(1, redis)
+
+    assert await LikedPostsCache.build(1, [10, 11], token, redis)
+    assert await LikedPostsCache.lookup(1, [10, 12], redis) == {10}
+    assert await LikedPostsCache.lookup(2, [10], redis) == (
+        LikedPostsCache.MISSING
+    )
+
+
+async def test_lookup_keeps_the_ttl_of_build(redis):
+    token = await LikedPostsCache.start_build(1, redis)
+    await LikedPostsCache.build(1, [], token, redis)
+    await redis.expire(LikedPostsCache._key(1), 5)
+
+    await LikedPostsCache.lookup(1, [10], redis)
+
+    assert await redis.ttl(LikedPostsCache._key(1)) <= 5
+
+
+async def test_build_sets_a_fixed_ttl(redis):
+    token = await LikedPostsCache.start_build(1, redis)
+    await LikedPostsCache.build(1, [10], token, redis)
+
+    ttl = await redis.ttl(LikedPostsCache._key(1))
+    assert 0 < ttl <= settings.LIKED_POSTS_CACHE_TTL_SECONDS
+
+
+@pytest.mark.parametrize("is_liked", [True, False])
+async def test_a_change_while_building_cancels_the_build(redis, is_liked):
+    token = await LikedPostsCache.start_build(1, redis)
+    # (IDs are read from database here -> a like/unlike commits meanwhile)
+    if is_liked:
+        await LikedPostsCache.add(1, 12, redis)
+    else:
+        await LikedPostsCache.remove(1, 10, redis)
+
+    assert not await LikedPostsCache.build(1, [10], token, redis)
+    assert await LikedPostsCache.lookup(1, [10, 12], redis) == (
+        LikedPostsCache.MISSING
+    )
+
+
+async def test_add_and_remove_in_a_built_set(redis):
+    token = await LikedPostsCache.start_build(1, redis)
+    await LikedPostsCache.build(1, [10], token, redis)
+
+    await LikedPostsCache.add(1, 12, redis)
+    await LikedPostsCache.remove(1, 10, redis)
+
+    assert await LikedPostsCache.lookup(1, [10, 12], redis) == {12}
+
+
+async def test_add_doesnt_build_a_missing_set(redis):
+    await LikedPostsCache.add(1, 12, redis)
+
+    assert await LikedPostsCache.lookup(1, [12], redis) == (
+        LikedPostsCache.MISSING
+    )
+
+
+async def test_too_large(redis):
+    token = await LikedPostsCache.start_build(1, redis)
+    await LikedPostsCache.build(1, None, token, redis)
+
+    assert await LikedPostsCache.lookup(1, [10], redis) == (
+        LikedPostsCache.TOO_LARGE
+    )
+
+
+async def test_invalidate(redis):
+    token = await LikedPostsCache.start_build(1, redis)
+    await LikedPostsCache.build(1, [10], token, redis)
+
+    await LikedPostsCache.invalidate(1, redis)
+
+    assert await LikedPostsCache.lookup(1, [10], redis) == (
+        LikedPostsCache.MISSING
+    )
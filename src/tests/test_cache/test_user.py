@@ -0,0 +1,66 @@
+""" `UserCache` (in-memory Redis, without L1) """
+
+from datetime import datetime
+
+import pytest
+
+from src.core.config import settings
+from src.cache import UserCache
+from src.models import User
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+def no_l1(monkeypatch):
+    monkeypatch.setattr(settings, "USER_CACHE_L1_TTL_SECONDS", 0)
+    monkeypatch.setattr(settings, "USER_CACHE_TTL_SECONDS", 60)
+
+
+def make_user(is_active: bool = True) -> User:
+    return User(
+        ID=1, username="user1", email="user1@example.com",
+        is_active=is_active, is_superuser=False,
+        created_at=datetime(2026, 1, 1), updated_at=None
+    )
+
+
+async def test_set_and_get(redis):
+    version, user = await UserCache.get(1, redis)
+    assert user is None
+
+    await UserCache.set(make_user(), version, redis)
+
+    _, user = await UserCache.get(1, redis)
+    assert (user.ID, user.username, user.is_active) == (1, "user1", True)
+    assert user.created_at == datetime(2026, 1, 1)
+
+
+async def test_invalidate(redis):
+    version, _ = await UserCache.get(1, redis)
+    await UserCache.set(make_user(), version, redis)
+
+    await UserCache.invalidate(1, redis)
+
+    assert (await UserCache.get(1, redis))[1] is None
+
+
+async def test_stale_snapshot_after_invalidate_is_never_read(redis):
+    # a request reads the version and loads the user from database ...
+    version, _ = await UserCache.get(1, redis)
+    stale = make_user(is_active=True)
+    # ... meanwhile the user is suspended (committed & invalidated) ...
+    await UserCache.invalidate(1, redis)
+    # ... then the request caches its (stale) snapshot
+    await UserCache.set(stale, version, redis)
+
+    new_version, user = await UserCache.get(1, redis)
+    assert user is None
+    assert new_version != version
+
+
+async def test_nothing_is_cached_without_a_version(redis):
+    await UserCache.set(make_user(), None, redis)
+
+    assert await redis.keys("user:*") == []
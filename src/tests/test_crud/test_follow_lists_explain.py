@@ -0,0 +1,93 @@
+""" plans of followers/followings pages (`pg_db`: skipped without a db)
+
+the same check as `benchmarks/explain_follow_lists.py`, on a small data
+set: 'follows' must be read through the keyset index of the list, with
+no Sort node (seq-scans are disabled, a tiny table would use them anyway)
+"""
+
+from datetime import datetime
+from typing import Iterator
+
+import orjson
+import pytest
+from sqlalchemy import insert, text
+
+from src.crud.user import FollowCrud
+from src.models import User, follows
+
+
+pytestmark = pytest.mark.anyio
+
+USERS = 300
+PAGE_SIZE = 20
+CURSOR = (datetime(2026, 3, 1), 150)
+
+LISTS = {
+    "followers": (
+        follows.c.followed, follows.c.followed_by,
+        "ix_follows_followed_follow_at"
+    ),
+    "followings": (
+        follows.c.followed_by, follows.c.followed,
+        "ix_follows_followed_by_follow_at"
+    ),
+}
+
+
+@pytest.fixture
+async def seeded_db(pg_db):
+    await pg_db.execute(insert(User), [
+        {
+            "ID": i, "username": f"user{i}", "password": "-",
+            "email": f"user{i}@example.com"
+        }
+        for i in range(1, USERS + 1)
+    ])
+    # everyone follows user 1, user 2 follows everyone
+    await pg_db.execute(text(
+        "INSERT INTO follows (followed_by, followed, follow_at) "
+        "SELECT g, 1, timestamp '2026-01-01' + g * interval '1 hour' "
+        "FROM generate_series(2, :users) AS g "
+        "UNION ALL "
+        "SELECT 2, g, timestamp '2026-01-01' + g * interval '1 hour' "
+        "FROM generate_series(3, :users) AS g"
+    ), {"users": USERS})
+    await pg_db.execute(text("ANALYZE users"))
+    await pg_db.execute(text("ANALYZE follows"))
+    await pg_db.execute(text("SET LOCAL enable_seqscan = off"))
+    await pg_db.execute(text("SET LOCAL enable_bitmapscan = off"))
+    return pg_db
+
+
+async def explain(db, query) -> dict:
+    connection = await db.connection()
+    compiled = query.compile(dialect=connection.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    result = await connection.exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}", params
+    )
+    plan = result.scalar()
+    return (orjson.loads(plan) if isinstance(plan, str) else plan)[0]
+
+
+def walk(node: dict) -> Iterator[dict]:
+    yield node
+    for child in node.get("Plans", []):
+        yield from walk(child)
+
+
+@pytest.mark.parametrize("after", [None, CURSOR], ids=["first", "cursor"])
+@pytest.mark.parametrize("kind", LISTS)
+async def test_page_uses_keyset_index_without_sort(seeded_db, kind, after):
+    owner_column, listed_column, index_name = LISTS[kind]
+    user_id = 1 if kind == "followers" else 2
+    query = FollowCrud._page_query(
+        owner_column, listed_column, user_id, PAGE_SIZE + 1, after
+    )
+
+    nodes = list(walk((await explain(seeded_db, query))["Plan"]))
+
+    follows_nodes = [n for n in nodes if n.get("Relation Name") == "follows"]
+    assert follows_nodes
+    assert all(n.get("Index Name") == index_name for n in follows_nodes)
+    assert not [n for n in nodes if "Sort" in n["Node Type"]]
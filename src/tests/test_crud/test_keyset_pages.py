@@ -0,0 +1,87 @@
+""" keyset pages on PostgreSQL (`pg_db`: skipped without a database) """
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from src.crud import ProfileCrud
+from src.models import User, Profile, follows
+from src.services.user import UserService
+from src.tests.utils import make_page_params
+
+
+pytestmark = pytest.mark.anyio
+
+SAME_TIME = datetime(2026, 5, 1, 12, 0, 0)
+
+
+async def add_users(db, count: int) -> None:
+    await db.execute(insert(User), [
+        {
+            "ID": i, "username": f"user{i}", "password": "-",
+            "email": f"user{i}@example.com"
+        }
+        for i in range(1, count + 1)
+    ])
+
+
+async def test_followers_pages_with_ties_on_follow_at(pg_db):
+    await add_users(pg_db, 10)
+    # followers 2..7 at the same time (ties), 8..10 later (one per minute)
+    rows = [
+        {"followed": 1, "followed_by": i, "follow_at": SAME_TIME}
+        for i in range(2, 8)
+    ] + [
+        {
+            "followed": 1, "followed_by": i,
+            "follow_at": SAME_TIME + timedelta(minutes=i)
+        }
+        for i in range(8, 11)
+    ]
+    await pg_db.execute(insert(follows), rows)
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        page = await UserService.get_followers_list(
+            1, make_page_params(cursor, limit=4), pg_db
+        )
+        pages += 1
+        seen += [user.ID for user in page.users_list]
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    # newest first; ties on follow_at -> by follower ID (desc), no gaps
+    # and no duplicates at page boundaries inside the ties
+    assert seen == [10, 9, 8, 7, 6, 5, 4, 3, 2]
+    assert pages == 3
+
+
+async def test_exact_last_page_has_no_next_cursor(pg_db):
+    await add_users(pg_db, 5)
+    await pg_db.execute(insert(follows), [
+        {"followed": 1, "followed_by": i, "follow_at": SAME_TIME}
+        for i in range(2, 6)
+    ])
+
+    page = await UserService.get_followers_list(
+        1, make_page_params(limit=4), pg_db
+    )
+
+    assert [user.ID for user in page.users_list] == [5, 4, 3, 2]
+    assert page.next_cursor is None and page.next is None
+
+
+async def test_profiles_pages(pg_db):
+    await add_users(pg_db, 5)
+    await pg_db.execute(insert(Profile), [
+        {"user_id": i} for i in range(1, 6)
+    ])
+
+    first = await ProfileCrud.retrieve_list(pg_db, 3)
+    rest = await ProfileCrud.retrieve_list(pg_db, 3, (first[-1].user_id,))
+
+    assert [p.user_id for p in first] == [5, 4, 3]
+    assert [p.user_id for p in rest] == [2, 1]
+    assert first[0].user.username == "user5"  # loaded with its user
@@ -0,0 +1,51 @@
+""" statements of counters of posts (compiled, no database) """
+
+import pytest
+
+from src.crud.post import PostCrud
+from src.tests.utils import compile_sql, FakeSession
+
+
+def test_counter_deltas_query_keeps_updated_at():
+    sql = compile_sql(
+        PostCrud._counter_deltas_query("view_count", [(1, 3), (2, 5)])
+    )
+    set_clause = sql.split(" SET ", 1)[1].split(" FROM ", 1)[0]
+
+    assert "view_count=(posts.view_count + deltas.delta)" in set_clause
+    assert "now()" not in set_clause
+    assert set_clause.count("updated_at") == 2  # updated_at=posts.updated_at
+
+
+def test_counter_deltas_query_renders_values_inline():
+    sql = compile_sql(
+        PostCrud._counter_deltas_query("like_count", [(7, -1)])
+    )
+
+    assert "(VALUES (7, -1)) AS deltas" in sql
+
+
+@pytest.mark.parametrize("column_name", sorted(PostCrud.COUNTER_COLUMNS))
+def test_counters_query_of_each_counter(column_name):
+    sql = compile_sql(
+        PostCrud._counters_query(5, {column_name: 2}), literal_binds=True
+    )
+    set_clause = sql.split(" SET ", 1)[1].split(" WHERE ", 1)[0]
+
+    assert f"{column_name}=(posts.{column_name} + 2)" in set_clause
+    assert "updated_at=posts.updated_at" in set_clause
+    assert "now()" not in set_clause
+    assert sql.endswith("WHERE posts.\"ID\" = 5")
+
+
+def test_counters_query_without_changes():
+    assert PostCrud._counters_query(5, {"like_count": 0}) is None
+
+
+@pytest.mark.anyio
+async def test_update_counters_rejects_unknown_columns():
+    db = FakeSession()
+
+    with pytest.raises(ValueError):
+        await PostCrud.update_counters(5, db, title=1)
+    assert db.statements == []
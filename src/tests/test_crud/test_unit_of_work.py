@@ -0,0 +1,83 @@
+""" `UnitOfWork` (request-scoped transactions & after-commit callbacks) """
+
+import pytest
+
+from src.core.exceptions import InternalServerError
+from src.crud import UnitOfWork
+from src.tests.utils import FakeSession
+
+
+pytestmark = pytest.mark.anyio
+
+
+def recorder(calls: list[str], name: str):
+    async def callback() -> None:
+        calls.append(name)
+    return callback
+
+
+async def test_save_flushes_in_a_unit_and_commits_outside_of_it():
+    db = FakeSession()
+    await UnitOfWork.save(db)
+    assert db.commits == 1
+
+    unit = FakeSession()
+    UnitOfWork.begin(unit)
+    await UnitOfWork.save(unit)
+    assert unit.commits == 0
+
+
+async def test_callbacks_run_after_commit_in_order():
+    db, calls = FakeSession(), []
+    UnitOfWork.begin(db)
+    await UnitOfWork.save(db)
+    await UnitOfWork.after_commit(db, recorder(calls, "invalidate-cache"))
+    await UnitOfWork.after_commit(db, recorder(calls, "fan-out"))
+    assert calls == []
+
+    await UnitOfWork.commit(db)
+
+    assert db.commits == 1
+    assert calls == ["invalidate-cache", "fan-out"]
+
+
+async def test_callbacks_dont_run_if_commit_fails():
+    db, calls = FakeSession(fail_commit=True), []
+    UnitOfWork.begin(db)
+    await UnitOfWork.save(db)
+    await UnitOfWork.after_commit(db, recorder(calls, "invalidate-cache"))
+
+    with pytest.raises(InternalServerError):
+        await UnitOfWork.commit(db)
+
+    assert calls == []
+
+
+async def test_callbacks_run_once():
+    db, calls = FakeSession(), []
+    UnitOfWork.begin(db)
+    await UnitOfWork.after_commit(db, recorder(calls, "invalidate-cache"))
+
+    await UnitOfWork.commit(db)
+    await UnitOfWork.commit(db)
+
+    assert calls == ["invalidate-cache"]
+
+
+async def test_callback_runs_right_away_outside_of_a_unit():
+    db, calls = FakeSession(), []
+
+    await UnitOfWork.after_commit(db, recorder(calls, "invalidate-cache"))
+
+    assert calls == ["invalidate-cache"]
+
+
+async def test_read_only_unit_isnt_committed():
+    db, calls = FakeSession(), []
+    UnitOfWork.begin(db)
+    await UnitOfWork.after_commit(db, recorder(calls, "noop"))
+
+    await UnitOfWork.commit(db)
+
+    assert db.commits == 0
+    assert calls == ["noop"]
@@ -0,0 +1,49 @@
+""" `CounterService` without write-behind (write-through, no database) """
+
+import pytest
+
+from src.core.config import settings
+from src.services import counters
+from src.services.counters import CounterService
+from src.tests.utils import compile_sql, FakeSession
+
+
+@pytest.fixture
+def write_through(monkeypatch) -> FakeSession:
+    db = FakeSession()
+    monkeypatch.setattr(settings, "COUNTER_WRITE_BEHIND", False)
+    monkeypatch.setattr(counters, "AsyncSessionLocal", db)
+    return db
+
+
+@pytest.mark.anyio
+async def test_increment_of_a_view_updates_the_post(write_through):
+    await CounterService.increment(3, "view_count", redis=None)
+
+    [statement] = write_through.statements
+    sql = compile_sql(statement, literal_binds=True)
+    assert "view_count=(posts.view_count + 1)" in sql
+    assert "now()" not in sql
+    assert write_through.commits == 1
+
+
+@pytest.mark.anyio
+async def test_record_of_a_like_is_in_the_callers_transaction(
+    write_through
+):
+    db = FakeSession()
+
+    await CounterService.record(3, "like_count", -1, db)
+
+    [statement] = db.statements
+    sql = compile_sql(statement, literal_binds=True)
+    assert "like_count=(posts.like_count + -1)" in sql
+    assert db.commits == 0  # committed by the caller
+    assert write_through.statements == []
+
+
+@pytest.mark.anyio
+async def test_increment_rejects_other_columns(write_through):
+    with pytest.raises(ValueError):
+        await CounterService.increment(3, "comment_count", redis=None)
+    assert write_through.statements == []
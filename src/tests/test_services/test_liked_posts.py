@@ -0,0 +1,25 @@
+""" `PostService` & the liked-posts cache (in-memory Redis) """
+
+import pytest
+from redis.exceptions import RedisError
+
+from src.cache.likes import LikedPostsCache
+from src.services.post import PostService
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_failed_update_deletes_the_set(redis, monkeypatch):
+    token = await LikedPostsCache.start_build(1, redis)
+    await LikedPostsCache.build(1, [10], token, redis)
+
+    async def fail(*args):
+        raise RedisError("timeout")
+
+    monkeypatch.setattr(LikedPostsCache, "add", fail)
+    await PostService._update_liked_cache(1, 12, True, redis)
+
+    assert await LikedPostsCache.lookup(1, [10, 12], redis) == (
+        LikedPostsCache.MISSING
+    )
@@ -0,0 +1,76 @@
+""" `UserService.update_password` in a unit-of-work (no database) """
+
+from types import SimpleNamespace
+
+import pytest
+
+from src.core.exceptions import InternalServerError
+from src.crud import UnitOfWork, UserCrud
+from src.schemas.user import UpdatePassword
+from src.services import user as user_services
+from src.services.user import UserService
+from src.tests.utils import FakeSession
+
+
+pytestmark = pytest.mark.anyio
+
+
+class _AwaitableAttrs:
+    @property
+    def password(self):
+        async def load() -> str:
+            return "old-hash"
+        return load()
+
+
+@pytest.fixture
+def revoked(monkeypatch) -> list[int]:
+    revoked_user_ids = []
+
+    async def verify_password(plain_password, hashed_password) -> bool:
+        return True
+
+    async def set_new_password(user, data, db, redis) -> None:
+        await UnitOfWork.save(db)
+
+    async def revoke_all_sessions(user_id, redis) -> None:
+        revoked_user_ids.append(user_id)
+
+    monkeypatch.setattr(
+        user_services.PasswordHandler, "verify_password", verify_password
+    )
+    monkeypatch.setattr(UserCrud, "set_new_password", set_new_password)
+    monkeypatch.setattr(
+        user_services.AuthService, "revoke_all_sessions", revoke_all_sessions
+    )
+    return revoked_user_ids
+
+
+async def update_password(db: FakeSession) -> None:
+    UnitOfWork.begin(db)
+    user = SimpleNamespace(ID=7, awaitable_attrs=_AwaitableAttrs())
+    data = UpdatePassword(
+        old_password="old-password", password="new-password",
+        confirm_password="new-password"
+    )
+    await UserService.update_password(user, data, None, db)
+
+
+async def test_sessions_are_revoked_after_commit(revoked):
+    db = FakeSession()
+    await update_password(db)
+    assert revoked == []
+
+    await UnitOfWork.commit(db)
+
+    assert revoked == [7]
+
+
+async def test_failed_commit_doesnt_revoke_sessions(revoked):
+    db = FakeSession(fail_commit=True)
+    await update_password(db)
+
+    with pytest.raises(InternalServerError):
+        await UnitOfWork.commit(db)
+
+    assert revoked == []
@@ -0,0 +1,49 @@
+""" conditional GETs (`utils/etag.py`) """
+
+import pytest
+from starlette.requests import Request
+
+from src.utils.etag import etag_matches, json_response_with_etag
+
+
+ETAG = '"abc123"'
+
+
+@pytest.mark.parametrize("if_none_match, matches", [
+    (None, False),
+    ("", False),
+    ('"abc123"', True),
+    ('W/"abc123"', True),             # weak comparison
+    ('"other", "abc123"', True),      # any of a list
+    (' "other" ,W/"abc123" ', True),
+    ("*", True),
+    ('"other"', False),
+    ('"abc1234"', False),
+    ("abc123", False),                # unquoted isn't the same tag
+])
+def test_etag_matches(if_none_match, matches):
+    assert etag_matches(if_none_match, ETAG) is matches
+
+
+def make_request(if_none_match=None) -> Request:
+    headers = []
+    if if_none_match is not None:
+        headers.append((b"if-none-match", if_none_match.encode()))
+    return Request({"type": "http", "method": "GET", "headers": headers})
+
+
+def test_response_with_body_and_etag():
+    response = json_response_with_etag(make_request(), ETAG, {"ID": 1})
+
+    assert response.status_code == 200
+    assert response.body == b'{"ID":1}'
+    assert response.headers["etag"] == ETAG
+    assert response.headers["cache-control"] == "no-cache"
+
+
+def test_not_modified_without_body():
+    response = json_response_with_etag(make_request(ETAG), ETAG, {"ID": 1})
+
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["etag"] == ETAG
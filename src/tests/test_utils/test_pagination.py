@@ -0,0 +1,129 @@
+""" keyset pagination helpers (`utils/pagination.py`) """
+
+import base64
+from datetime import datetime
+
+import pytest
+
+from src.core.config import settings
+from src.core.exceptions import BadRequestException
+from src.models import follows
+from src.utils.pagination import apply_keyset, decode_cursor, encode_cursor
+from src.tests.utils import compile_sql, make_page_params
+
+
+FOLLOW_AT = datetime(2026, 5, 1, 12, 30, 15, 123456)
+
+
+# cursors:
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(FOLLOW_AT, 42)
+
+    assert decode_cursor(cursor, datetime, int) == (FOLLOW_AT, 42)
+
+
+def test_cursor_is_url_safe_and_unpadded():
+    cursor = encode_cursor(FOLLOW_AT, 2 ** 62)
+
+    assert "=" not in cursor
+    assert set(cursor) <= set(
+        "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+    )
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor!",                                       # not base64
+    "e30",                                                 # {} (not a list)
+    encode_cursor(42),                                     # too few values
+    encode_cursor(FOLLOW_AT, 42, 1),                       # too many values
+    encode_cursor("yesterday", 42),                        # not a datetime
+    encode_cursor(FOLLOW_AT, "42; DROP TABLE follows"),    # not an int
+    encode_cursor(FOLLOW_AT, 42)[:-3],                     # truncated
+    base64.urlsafe_b64encode(b"\xff\xfe").decode(),        # not json
+])
+def test_tampered_or_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(BadRequestException):
+        decode_cursor(cursor, datetime, int)
+
+
+# apply_keyset:
+
+def test_keyset_is_a_row_value_comparison_in_index_order():
+    keys = (follows.c.follow_at, follows.c.followed_by)
+    sql = compile_sql(apply_keyset(
+        follows.select().where(follows.c.followed == 1),
+        keys, (FOLLOW_AT, 42), 21
+    ))
+
+    assert "(follows.follow_at, follows.followed_by) < (" in sql
+    assert "ORDER BY follows.follow_at DESC, follows.followed_by DESC" in sql
+    assert "LIMIT" in sql
+    assert "OFFSET" not in sql
+
+
+def test_keyset_ascending():
+    sql = compile_sql(apply_keyset(
+        follows.select(), (follows.c.followed,), (3,), 5, descending=False
+    ))
+
+    assert "(follows.followed) > (" in sql
+    assert "ORDER BY follows.followed ASC" in sql
+
+
+def test_keyset_without_cursor_is_the_first_page():
+    sql = compile_sql(apply_keyset(
+        follows.select(), (follows.c.follow_at, follows.c.followed_by),
+        None, 5
+    ))
+
+    assert "WHERE" not in sql
+
+
+def test_keyset_rejects_a_cursor_of_other_keys():
+    with pytest.raises(BadRequestException):
+        apply_keyset(
+            follows.select(), (follows.c.follow_at, follows.c.followed_by),
+            (FOLLOW_AT,), 5
+        )
+
+
+# PageParams:
+
+def test_limit_defaults_and_is_capped():
+    assert make_page_params().limit == settings.PAGE_SIZE_DEFAULT
+    assert make_page_params(limit=10 ** 6).limit == settings.PAGE_SIZE_MAX
+    assert make_page_params(limit=3).fetch_size == 4
+
+
+def test_trim_of_a_page_with_an_extra_row():
+    page = make_page_params(limit=2)
+    rows = [(3, FOLLOW_AT), (2, FOLLOW_AT), (1, FOLLOW_AT)]
+
+    items, next_cursor = page.trim(rows, key=lambda row: (row[1], row[0]))
+
+    assert items == rows[:2]
+    assert decode_cursor(next_cursor, datetime, int) == (FOLLOW_AT, 2)
+    assert page.next_url(next_cursor) == (
+        f"http://test/followers/1?cursor={next_cursor}&limit=2"
+    )
+
+
+@pytest.mark.parametrize("size", [0, 1, 2])
+def test_last_page_has_no_next_cursor(size):
+    page = make_page_params(limit=2)
+    rows = [(i, FOLLOW_AT) for i in range(size)]
+
+    items, next_cursor = page.trim(rows, key=lambda row: (row[1], row[0]))
+
+    assert items == rows
+    assert next_cursor is None
+    assert page.next_url(next_cursor) is None
+
+
+def test_after_decodes_the_cursor_of_the_request():
+    assert make_page_params().after(datetime, int) is None
+    page = make_page_params(encode_cursor(FOLLOW_AT, 7))
+    assert page.after(datetime, int) == (FOLLOW_AT, 7)
+    with pytest.raises(BadRequestException):
+        make_page_params("garbage").after(datetime, int)
@@ -0,0 +1,62 @@
+""" helpers of tests """
+
+from typing import Any
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import OperationalError
+from starlette.datastructures import URL
+
+from src.utils.pagination import PageParams
+
+
+def compile_sql(query, literal_binds: bool = False) -> str:
+    """ SQL of a statement for PostgreSQL (no database needed) """
+    # NOTE: no `literal_binds=False` -> it'd override the ones of a query
+    compile_kwargs = {"literal_binds": True} if literal_binds else {}
+    return str(query.compile(
+        dialect=postgresql.dialect(), compile_kwargs=compile_kwargs
+    ))
+
+
+def make_page_params(cursor=None, limit=None) -> PageParams:
+    """ `PageParams` of a request to a list endpoint (no app needed) """
+    request = type("Request", (), {"url": URL("http://test/followers/1")})
+    return PageParams(request, cursor, limit)
+
+
+class FakeSession:
+    """
+    stand-in of an `AsyncSession` which records executed statements and
+    commits (no database) -> also its own sessionmaker & context-manager
+    `fail_commit=True` -> its commits raise (e.g. a lost connection)
+    """
+
+    def __init__(self, fail_commit: bool = False):
+        self.statements: list[Any] = []
+        self.commits = 0
+        self.fail_commit = fail_commit
+        self.info: dict[str, Any] = {}
+        self.new = self.dirty = self.deleted = ()
+
+    def __call__(self) -> "FakeSession":
+        return self
+
+    async def __aenter__(self) -> "FakeSession":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        return None
+
+    async def execute(self, statement, *args, **kwargs) -> None:
+        self.statements.append(statement)
+
+    async def flush(self) -> None:
+        return None
+
+    async def commit(self) -> None:
+        if self.fail_commit:
+            raise OperationalError("COMMIT", None, Exception("lost"))
+        self.commits += 1
+
+    async def rollback(self) -> None:
+        return None
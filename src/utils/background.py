@@ -0,0 +1,45 @@
+"""
+fire-and-forget background jobs of a worker (e.g. timeline fan-out)
+
+jobs run in the worker's event loop after the request which scheduled
+them (usually from `UnitOfWork.after_commit`), with their own database
+sessions. failures are logged & counted, never raised.
+NOTE: jobs of a crashed worker are lost -> they must be repairable (e.g.
+timelines are rebuilt from database)
+"""
+
+import asyncio
+import logging
+from contextvars import Context
+from typing import Coroutine
+
+from src.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_tasks: set[asyncio.Task] = set()
+
+
+def run_in_background(job: Coroutine, name: str) -> None:
+    # NOTE: an empty context -> queries of the job aren't counted in the
+    # stats of the request which scheduled it (`current_query_stats`)
+    task = asyncio.get_running_loop().create_task(
+        _run(job, name), name=name, context=Context()
+    )
+    _tasks.add(task)  # keep a reference until it's done
+    task.add_done_callback(_tasks.discard)
+    metrics.set_gauge("background_jobs.running", len(_tasks))
+
+
+async def wait_for_background_jobs(timeout: float) -> None:
+    """ app's shutdown: let running jobs finish (up to `timeout`) """
+    if _tasks:
+        await asyncio.wait(set(_tasks), timeout=timeout)
+
+
+async def _run(job: Coroutine, name: str) -> None:
+    try:
+        await job
+    except Exception:
+        metrics.incr("background_jobs.failed")
+        logger.exception("background job %r failed", name)
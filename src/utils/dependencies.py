@@ -1,48 +1,115 @@
-from typing import AsyncGenerator, Annotated
+from typing import AsyncGenerator, Annotated, Any
 
 from fastapi import Depends, Request
 from fastapi.security import HTTPAuthorizationCredentials
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from redis.asyncio import Redis
 
-from src.core.database import AsyncSessionLocal
+from src.core.config import settings
+from src.core.database import AsyncSessionLocal, replica_router
+from src.core.middlewares import ReadYourWritesMiddleware
 from src.core.security import jwt_bearer
 from src.auth import JWTHandler
 from src.models.user import User
 from src.crud.user import UserCrud
+from src.crud.utils import UnitOfWork
+from src.cache import UserCache
 from src.core.exceptions import (
     NotFoundException, UnauthenticatedException, ForbiddenException
 )
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    request-scoped unit of work: CRUD methods only flush their changes,
+    and they're committed once here (after the endpoint returns). any
+    exception -> everything of the request is rolled back (`UnitOfWork`)
+    """
     async with AsyncSessionLocal() as db_session:
-        yield db_session
+        UnitOfWork.begin(db_session)
+        try:
+            yield db_session
+        except Exception:
+            await db_session.rollback()
+            raise
+        await UnitOfWork.commit(db_session)
 
 
 async def get_redis(request: Request) -> Redis:
     return request.app.state.redis
 
 
-async def get_current_user_id(
+async def get_read_sessionmaker(
+    request: Request, redis: Annotated[Redis, Depends(get_redis)]
+) -> async_sessionmaker:
+    """
+    sessionmaker of a read-replica (`DB_REPLICA_URLS`) for read-only work
+    -> primary, if there isn't any replica or the user wrote something
+    recently (read-your-writes: check `ReadYourWritesMiddleware`)
+    NOTE:
+    _ streaming responses open their session by it (`utils/streaming`)
+    _ the user is known if an auth-dependency is resolved before it
+      (declared before it in the endpoint, or by the router)
+    """
+    if not settings.DB_REPLICA_URLS:
+        return AsyncSessionLocal
+    user_id = getattr(request.state, "user_id", None)
+    if user_id is not None and (
+        await ReadYourWritesMiddleware.is_pinned_to_primary(user_id, redis)
+    ):
+        return AsyncSessionLocal
+    return replica_router.choose()
+
+
+async def get_read_db(
+    session_maker: Annotated[
+        async_sessionmaker, Depends(get_read_sessionmaker)
+    ]
+) -> AsyncGenerator[AsyncSession, None]:
+    """ session of a read-replica for read-only endpoints """
+    async with session_maker() as db_session:
+        yield db_session
+
+
+async def get_current_user_payload(
+    request: Request,
     credentials: Annotated[HTTPAuthorizationCredentials, Depends(jwt_bearer)],
     redis: Annotated[Redis, Depends(get_redis)],
-) -> int:
+) -> dict[str, Any]:
     access_token = credentials.credentials
     payload = await JWTHandler.get_token_payload(access_token, "access", redis)
+    # the authenticated user of the request (`ReadYourWritesMiddleware`)
+    request.state.user_id = payload.get("user_id")
+    return payload
+
+
+async def get_current_user_id(
+    payload: Annotated[dict[str, Any], Depends(get_current_user_payload)]
+) -> int:
+    # signed claim (if embedded) -> suspended users are rejected without db
+    if payload.get("is_active") is False:
+        raise ForbiddenException("The user is suspended.")
     user_id = payload.get("user_id")
     return user_id
 
 
 async def get_current_user_object(
     user_id: Annotated[int, Depends(get_current_user_id)],
+    redis: Annotated[Redis, Depends(get_redis)],
     db: Annotated[AsyncSession, Depends(get_db)]
 ) -> User:
-    try:
-        # user = ... (cache users in redis and get from redis)
-        user = await UserCrud.get_by_id(user_id, db)
-    except NotFoundException as err:
-        raise UnauthenticatedException(err.message) from err
+    # NOTE: the version is read before database -> a snapshot which is
+    # loaded before a change isn't cached under the new version
+    version, user = await UserCache.get(user_id, redis)
+    if user is not None:
+        # attach cached (detached) user-obj to session, without any query
+        user = await db.merge(user, load=False)
+    else:
+        try:
+            user = await UserCrud.get_by_id(user_id, db)
+        except NotFoundException as err:
+            raise UnauthenticatedException(err.message) from err
+        await UserCache.set(user, version, redis)
 
     if not user.is_active:
         raise ForbiddenException(f"The user {user.username!r} is suspended.")
@@ -51,7 +118,24 @@ async def get_current_user_object(
 
 
 async def authenticate_admin(
-    user: Annotated[User, Depends(get_current_user_object)]
-) -> User:
-    if not user.is_superuser:
+    payload: Annotated[dict[str, Any], Depends(get_current_user_payload)],
+    redis: Annotated[Redis, Depends(get_redis)],
+    db: Annotated[AsyncSession, Depends(get_db)]
+) -> int:
+    """
+    with `JWT_TRUST_AUTHZ_CLAIMS=True` the signed authorization claims of
+    the access-token are trusted (no db query). otherwise (or for tokens
+    without these claims) the user-obj is fetched from db to check them.
+    """
+    if settings.JWT_TRUST_AUTHZ_CLAIMS and "is_superuser" in payload:
+        user_id = await get_current_user_id(payload)
+        is_superuser = payload["is_superuser"]
+    else:
+        user = await get_current_user_object(
+            payload.get("user_id"), redis, db
+        )
+        user_id, is_superuser = user.ID, user.is_superuser
+
+    if not is_superuser:
         raise ForbiddenException("Forbidden access to endpoint.")
+    return user_id
@@ -0,0 +1,36 @@
+"""
+conditional GETs (`ETag` / `If-None-Match`)
+
+a route which knows the ETag of its response before building its body
+(e.g. from a cached hash) answers `304 Not Modified` without serializing
+it -> `json_response_with_etag()`
+"""
+
+from typing import Any, Optional
+
+import orjson
+from fastapi import Request, Response, status
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """ weak comparison (RFC 9110: If-None-Match), "*" matches any """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def json_response_with_etag(
+    request: Request, etag: str, body: Any, cache_control: str = "no-cache"
+) -> Response:
+    """ 304 if the client has this version, else `body` (orjson) """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers=headers
+        )
+    return Response(
+        orjson.dumps(body), media_type="application/json", headers=headers
+    )
@@ -1,13 +1,35 @@
+import logging
+from http import HTTPStatus
+
 from fastapi import Request
 from fastapi.responses import JSONResponse
+from redis.exceptions import RedisError
 
 from src.core.exceptions import CustomException
 
 
+logger = logging.getLogger(__name__)
+
+
 async def custom_exception_handler(
     request: Request, err: CustomException
 ):
     return JSONResponse(
         content={"message": err.message},
-        status_code=err.status.value
+        status_code=err.status.value,
+        headers=err.headers
+    )
+
+
+async def redis_exception_handler(request: Request, err: RedisError):
+    """
+    Redis is unavailable (e.g. circuit-breaker is open) and the operation
+    can't be done without it -> 503 (instead of an unhandled error: 500)
+    """
+    logger.warning("%s %s failed (Redis): %r",
+                   request.method, request.url.path, err)
+    return JSONResponse(
+        content={"message": "Service temporarily unavailable."},
+        status_code=HTTPStatus.SERVICE_UNAVAILABLE.value,
+        headers={"Retry-After": "1"}
     )
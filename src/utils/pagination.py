@@ -0,0 +1,136 @@
+"""
+keyset (cursor) pagination helpers
+
+a page is fetched by `WHERE (sort_key, id) < (last_sort_key, last_id)
+ORDER BY sort_key DESC, id DESC LIMIT size + 1` (instead of OFFSET) ->
+every page costs the same, however deep it is. the position of the last
+item is sent to clients as an *opaque* cursor (url-safe base64 of json)
+
+usage (every list CRUD/service builds on these; no OFFSET, no unbounded
+fetch):
+    crud    : `apply_keyset(query, keys, after, limit)` -> WHERE/ORDER/LIMIT
+    service : `page.after(*types)` -> position to fetch after (or None)
+              `page.fetch_size`    -> rows to fetch (`limit` + 1)
+              `page.trim(rows, key)` -> (rows of the page, next cursor)
+    schema  : `Page[T]` (schemas/GENERAL.py) -> items, next_cursor, next
+NOTE: keys must be unique together (e.g. end with the primary-key) and be
+covered by an index, in the same order -> a stable order & no Sort node
+"""
+
+import base64
+import binascii
+from datetime import datetime
+from typing import Annotated, Any, Callable, Optional, Sequence, TypeVar
+
+import orjson
+from fastapi import Query, Request
+from sqlalchemy import Select, ColumnElement, tuple_
+
+from src.core.config import settings
+from src.core.exceptions import BadRequestException
+
+T = TypeVar("T")
+
+
+def encode_cursor(*values: Any) -> str:
+    """ e.g. (follow_at, user_id) of the last item -> opaque cursor """
+    raw = orjson.dumps(values)  # datetimes -> ISO-8601 strings
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, *types: type) -> tuple[Any, ...]:
+    """ opaque cursor -> values (converted to `types`) or raise 400 """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = orjson.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("unexpected number of values")
+        return tuple(
+            datetime.fromisoformat(value) if type_ is datetime
+            else type_(value)
+            for value, type_ in zip(values, types)
+        )
+    except (binascii.Error, ValueError, TypeError) as err:
+        # NOTE: orjson.JSONDecodeError is a subclass of ValueError
+        raise BadRequestException("Invalid pagination cursor.") from err
+
+
+def apply_keyset(
+    query: Select,
+    keys: Sequence[ColumnElement],
+    after: Optional[tuple[Any, ...]],
+    limit: int,
+    descending: bool = True
+) -> Select:
+    """
+    a page of `query` ordered by `keys` (all DESC or all ASC), which starts
+    after the `after` position (values of `keys` of the last item) ->
+    `(k1, k2) < (v1, v2)` is a row-value comparison which postgres can
+    answer by one index range-scan
+    """
+    if after is not None:
+        if len(after) != len(keys):
+            raise BadRequestException("Invalid pagination cursor.")
+        position = tuple_(*keys)
+        bound = tuple_(*after)
+        query = query.where(
+            position < bound if descending else position > bound
+        )
+    return query.order_by(
+        *(key.desc() if descending else key.asc() for key in keys)
+    ).limit(limit)
+
+
+class PageParams:
+    """
+    pagination query-parameters of a list endpoint (used as a dependency)
+        - `cursor` : opaque cursor of the next page (from previous page)
+        - `limit`  : page size (capped by `PAGE_SIZE_MAX`)
+    methods:
+        after()    : decoded cursor (position to fetch after) or None
+        trim()     : cut the extra row of a fetch & build the next cursor
+        next_url() : url of the next page (same query, new cursor)
+    """
+
+    def __init__(
+        self,
+        request: Request,
+        cursor: Annotated[Optional[str], Query(
+            max_length=512, description="cursor of the page (`next_cursor`)"
+        )] = None,
+        limit: Annotated[Optional[int], Query(
+            ge=1, description="page size"
+        )] = None,
+    ):
+        self.cursor = cursor
+        self.limit = min(
+            limit or settings.PAGE_SIZE_DEFAULT, settings.PAGE_SIZE_MAX
+        )
+        self._url = request.url
+
+    @property
+    def fetch_size(self) -> int:
+        """ one extra row -> shows whether there's a next page or not """
+        return self.limit + 1
+
+    def after(self, *types: type) -> Optional[tuple[Any, ...]]:
+        if self.cursor is None:
+            return None
+        return decode_cursor(self.cursor, *types)
+
+    def trim(
+        self, rows: Sequence[T], key: Callable[[T], tuple[Any, ...]]
+    ) -> tuple[list[T], Optional[str]]:
+        """ (rows of this page, cursor of the next page or None) """
+        rows = list(rows)
+        if len(rows) <= self.limit:
+            return rows, None
+        rows = rows[:self.limit]
+        return rows, encode_cursor(*key(rows[-1]))
+
+    def next_url(self, next_cursor: Optional[str]) -> Optional[str]:
+        if next_cursor is None:
+            return None
+        return str(self._url.include_query_params(
+            cursor=next_cursor, limit=self.limit
+        ))
@@ -0,0 +1,90 @@
+"""
+streaming exports of large result sets
+
+rows are fetched by a server-side cursor (`AsyncSession.stream()` with
+`yield_per=EXPORT_BATCH_SIZE`) and each batch is serialized by orjson and
+sent as one chunk of a `StreamingResponse` -> memory of the worker stays
+flat (one batch) however many rows are exported.
+
+formats:
+    ndjson : one json object per line ("application/x-ndjson")
+    json   : one json array, sent chunk by chunk ("application/json")
+
+NOTE: the response body is sent *after* the endpoint (and its yield
+dependencies, e.g. `deps.get_db`) is finished -> the stream opens its own
+session from the given sessionmaker (`deps.get_read_sessionmaker`)
+"""
+
+import logging
+from typing import AsyncIterator, Literal, Optional
+
+import orjson
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.core.config import settings
+from src.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+ExportFormat = Literal["ndjson", "json"]
+
+MEDIA_TYPES: dict[str, str] = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+
+
+def stream_query(
+    query: Select,
+    session_maker: async_sessionmaker,
+    export_format: ExportFormat = "ndjson",
+    filename: Optional[str] = None
+) -> StreamingResponse:
+    """
+    response which streams all rows of `query` (as json objects keyed by
+    the column labels of the query)
+    """
+    headers = {"Cache-Control": "no-store"}
+    if filename is not None:
+        headers["Content-Disposition"] = (
+            f'attachment; filename="{filename}.{export_format}"'
+        )
+    return StreamingResponse(
+        _iter_chunks(query, session_maker, export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers=headers,
+    )
+
+
+async def _iter_chunks(
+    query: Select,
+    session_maker: async_sessionmaker,
+    export_format: ExportFormat
+) -> AsyncIterator[bytes]:
+    rows_count = 0
+    if export_format == "json":
+        yield b"["
+    try:
+        async with session_maker() as db:
+            result = await db.stream(
+                query.execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+            )
+            async for batch in result.mappings().partitions():
+                lines = [orjson.dumps(dict(row)) for row in batch]
+                if export_format == "ndjson":
+                    yield b"\n".join(lines) + b"\n"
+                else:
+                    yield (b"," if rows_count else b"") + b",".join(lines)
+                rows_count += len(lines)
+    except Exception:
+        # NOTE: status-code & headers are sent already -> the connection is
+        # closed (by re-raising) and the client gets a truncated body
+        metrics.incr("exports.failed")
+        logger.exception("export stream failed after %d rows", rows_count)
+        raise
+    finally:
+        metrics.incr("exports.rows", rows_count)
+    if export_format == "json":
+        yield b"]"